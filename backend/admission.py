@@ -0,0 +1,289 @@
+import asyncio
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import metrics
+
+
+class Rejected(Exception):
+    def __init__(self, lane: str, retry_after: int, reason: str):
+        self.lane = lane
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    """Bytes per second with one second of burst; `take` sleeps once the
+    budget is spent. A rate of 0 means unlimited."""
+
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self.tokens = bytes_per_second
+        self.updated = time.monotonic()
+
+    async def take(self, n: int):
+        if self.rate <= 0 or n <= 0:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= n
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class Lane:
+    """A class of expensive requests (uploads, imports, downloads) with a
+    concurrency limit overall and per client, a bounded wait queue and
+    optional bandwidth limits.
+
+    Requests over a limit wait in a per-client FIFO; freed slots go to the
+    waiting clients in turn, so one client's 500 queued uploads can't starve
+    another's one. Requests that would overflow the queue, or that wait
+    longer than `max_wait`, are rejected with a Retry-After estimate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        routes: Sequence[Tuple[str, str]],
+        concurrency: int,
+        client_concurrency: int,
+        queue: int = 64,
+        max_wait: float = 30.0,
+        mbps: float = 0,
+        client_mbps: float = 0,
+    ):
+        self.name = name
+        self.routes = [(method, re.compile(pattern + "$")) for method, pattern in routes]
+        self.concurrency = max(1, concurrency)
+        self.client_concurrency = max(1, min(client_concurrency or concurrency, self.concurrency))
+        self.queue = queue
+        self.max_wait = max_wait
+        self.client_rate = client_mbps * 1024 * 1024
+        self.bucket = TokenBucket(mbps * 1024 * 1024)
+        self.client_buckets: Dict[str, TokenBucket] = {}
+        self.active = 0
+        self.active_by_client: Dict[str, int] = {}
+        # client -> waiters, in the order clients get served
+        self.waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.queued = 0
+        self.rejected = 0
+        # smoothed seconds per request, for Retry-After
+        self.service_time = 1.0
+
+    def matches(self, method: str, path: str) -> bool:
+        return any(m == method and p.match(path) for m, p in self.routes)
+
+    def _can_run(self, client: str) -> bool:
+        return (self.active < self.concurrency
+                and self.active_by_client.get(client, 0) < self.client_concurrency)
+
+    def _start(self, client: str):
+        self.active += 1
+        self.active_by_client[client] = self.active_by_client.get(client, 0) + 1
+        metrics.ADMISSION_ACTIVE.labels(self.name).inc()
+
+    def retry_after(self) -> int:
+        backlog = self.queued + self.active + 1
+        return max(1, math.ceil(self.service_time * backlog / self.concurrency))
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        metrics.ADMISSION_REJECTED.labels(self.name).inc()
+        raise Rejected(self.name, self.retry_after(), reason)
+
+    async def acquire(self, client: str):
+        if client not in self.waiting and self._can_run(client):
+            self._start(client)
+            return
+        if self.queued >= self.queue and not self._evict_for(client):
+            self._reject("queue full")
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(client, deque()).append(waiter)
+        self.queued += 1
+        metrics.ADMISSION_QUEUED.labels(self.name).inc()
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            # client went away; give back a slot handed over meanwhile
+            # (an evicted waiter is done too, but never got one)
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self.release(client, None)
+            else:
+                self._forget(client, waiter)
+            raise
+        if not done:
+            self._forget(client, waiter)
+            self._reject(f"waited {self.max_wait:g} s")
+        waiter.result()  # raises if evicted
+
+    def _evict_for(self, client: str) -> bool:
+        """Make room in a full queue for a client with fewer waiters by
+        rejecting the newest waiter of the client with the most."""
+        if not self.waiting:
+            return False
+        own = len(self.waiting.get(client, ()))
+        victim = max(self.waiting, key=lambda c: len(self.waiting[c]))
+        if len(self.waiting[victim]) <= own + 1:
+            return False
+        waiter = self.waiting[victim].pop()
+        self.queued -= 1
+        metrics.ADMISSION_QUEUED.labels(self.name).dec()
+        self.rejected += 1
+        metrics.ADMISSION_REJECTED.labels(self.name).inc()
+        waiter.set_exception(Rejected(self.name, self.retry_after(), "queue full"))
+        return True
+
+    def _forget(self, client: str, waiter: asyncio.Future):
+        queue = self.waiting.get(client)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self.queued -= 1
+            metrics.ADMISSION_QUEUED.labels(self.name).dec()
+            if not queue:
+                del self.waiting[client]
+        waiter.cancel()
+
+    def release(self, client: str, seconds: Optional[float]):
+        self.active -= 1
+        metrics.ADMISSION_ACTIVE.labels(self.name).dec()
+        left = self.active_by_client.get(client, 1) - 1
+        if left:
+            self.active_by_client[client] = left
+        else:
+            self.active_by_client.pop(client, None)
+            self.client_buckets.pop(client, None)
+        if seconds is not None:
+            self.service_time = 0.8 * self.service_time + 0.2 * seconds
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting clients, round robin."""
+        while self.waiting and self.active < self.concurrency:
+            for client in list(self.waiting):
+                if self.active_by_client.get(client, 0) < self.client_concurrency:
+                    break
+            else:
+                return  # everyone waiting is at their own limit
+            queue = self.waiting.pop(client)
+            waiter = queue.popleft()
+            self.queued -= 1
+            metrics.ADMISSION_QUEUED.labels(self.name).dec()
+            if queue:
+                self.waiting[client] = queue  # back of the line
+            self._start(client)
+            waiter.set_result(None)
+
+    async def throttle(self, client: str, n: int):
+        if self.client_rate > 0:
+            bucket = self.client_buckets.get(client)
+            if bucket is None:
+                bucket = self.client_buckets[client] = TokenBucket(self.client_rate)
+            await bucket.take(n)
+        await self.bucket.take(n)
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "concurrency": self.concurrency,
+            "clientConcurrency": self.client_concurrency,
+            "queue": self.queue,
+            "maxWaitSeconds": self.max_wait,
+            "mbps": self.bucket.rate / 1024 / 1024,
+            "clientMbps": self.client_rate / 1024 / 1024,
+            "active": self.active,
+            "queued": self.queued,
+            "clients": len(set(self.active_by_client) | set(self.waiting)),
+            "rejected": self.rejected,
+        }
+
+
+def client_key(scope: Scope, trust_forwarded: bool = False) -> str:
+    if trust_forwarded:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    """Admits requests that match a lane through it; everything else (the
+    interactive API) passes straight through. Request bodies are throttled
+    on the way in and response bodies on the way out."""
+
+    def __init__(self, app: ASGIApp, lanes: List[Lane], trust_forwarded: bool = False) -> None:
+        self.app = app
+        self.lanes = lanes
+        self.trust_forwarded = trust_forwarded
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        lane = next((l for l in self.lanes if l.matches(scope["method"], scope["path"])), None)
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = client_key(scope, self.trust_forwarded)
+        try:
+            await lane.acquire(client)
+        except Rejected as e:
+            await self._reject(e, send)
+            return
+
+        async def throttled_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                await lane.throttle(client, len(message.get("body", b"")))
+            return message
+
+        async def throttled_send(message: Message) -> None:
+            if message["type"] == "http.response.body":
+                await lane.throttle(client, len(message.get("body", b"")))
+            await send(message)
+
+        start = time.perf_counter()
+        seconds = None
+        try:
+            await self.app(scope, throttled_receive, throttled_send)
+            seconds = time.perf_counter() - start
+        finally:
+            lane.release(client, seconds)
+
+    async def _reject(self, e: Rejected, send: Send):
+        body = orjson.dumps({
+            "detail": f"Too many {e.lane} requests ({e.reason}); retry later",
+            "lane": e.lane,
+            "retryAfter": e.retry_after,
+        })
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(e.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def reserve_threads(lanes: List[Lane], interactive: int):
+    """Grow the sync-endpoint threadpool so that, with every lane at its
+    limit, `interactive` threads are still free for everything else. Call
+    from the event loop."""
+    import anyio.to_thread
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    needed = sum(lane.concurrency for lane in lanes) + interactive
+    if limiter.total_tokens < needed:
+        limiter.total_tokens = needed
+    return limiter.total_tokens
@@ -4,28 +4,133 @@ import time
 import shutil
 import sqlite3
 import base64
+import hashlib
+import threading
+import logging
+import importlib
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from fastapi import (
     FastAPI,
     UploadFile,
     File,
     Form,
     HTTPException,
+    Query,
+    Request,
+    Response,
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 import json
+import orjson
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Union
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple, Union
+from urllib.parse import quote
 from pydantic import BaseModel
 
 
-from importers import makerworld, printables
+from compression import CompressionMiddleware
+from zipstream import stream_zip
+import archive_ingest
+import threemf
+import dropwatch
+import scrubber
+import coordination
+import stepmesh
+import metrics
+import admission
+import versions
+import thumbnails
+import readcache
+import db
+
+if TYPE_CHECKING:
+    # loaded on first use (NumPy); see warm_up()
+    import fingerprint
 
 DB_PATH = os.getenv("DB_PATH", "data.db")
+# WAL lets readers (and online backups) run alongside a writer; use "delete"
+# if the database lives on a network filesystem
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "wal")
 UPLOAD_DIR = Path(os.getenv("FILE_STORAGE", "./app/uploads"))
 MANUAL_DIR = Path(os.getenv("MANUAL_STORAGE", UPLOAD_DIR / "manuals"))
-MANUAL_DIR.mkdir(parents=True, exist_ok=True)
 WEBUI_URL = os.getenv("WEBUI_URL", "http://localhost:8989")
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+STREAM_BATCH_SIZE = 500
+EXPORT_COMPRESS_LEVEL = int(os.getenv("EXPORT_COMPRESS_LEVEL", "1"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(8, os.cpu_count() or 2))))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INGEST_DIR = UPLOAD_DIR / ".ingest"
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.03"))
+FINGERPRINT_WORKERS = int(os.getenv("FINGERPRINT_WORKERS", "2"))
+FINGERPRINT_CHUNK_SIZE = 100
+# STEP tessellation: concurrent child processes and per-job limits
+STEP_WORKERS = int(os.getenv("STEP_WORKERS", "2"))
+STEP_TIMEOUT_SECONDS = float(os.getenv("STEP_TIMEOUT_SECONDS", "300"))
+STEP_MEMORY_MB = int(os.getenv("STEP_MEMORY_MB", "2048"))
+MESH_DIR = UPLOAD_DIR / ".meshes"
+# replaced model files, content-addressed (see versions.py)
+VERSION_DIR = UPLOAD_DIR / ".versions"
+# previous versions kept per model, and for how long (0 = no limit)
+VERSION_KEEP = int(os.getenv("VERSION_KEEP", "10"))
+VERSION_MAX_AGE_DAYS = float(os.getenv("VERSION_MAX_AGE_DAYS", "0"))
+# grid thumbnail size encoded ahead of time, and ids per batch request
+THUMBNAIL_GRID_SIZE = int(os.getenv("THUMBNAIL_GRID_SIZE", "256"))
+THUMBNAIL_BATCH_MAX = 500
+# "/path=folderId;/other/path" directories to watch for new model files
+DROP_DIRS = os.getenv("DROP_DIRS", "")
+DROP_ACTION = os.getenv("DROP_ACTION", "move")  # move | link
+DROP_WATCH = os.getenv("DROP_WATCH", "auto")  # auto | inotify | poll
+DROP_SETTLE_SECONDS = float(os.getenv("DROP_SETTLE_SECONDS", "2"))
+DROP_POLL_INTERVAL = float(os.getenv("DROP_POLL_INTERVAL", "5"))
+SCRUB_INTERVAL_HOURS = float(os.getenv("SCRUB_INTERVAL_HOURS", "24"))  # 0 disables
+SCRUB_VERIFY_HASHES = os.getenv("SCRUB_VERIFY_HASHES", "").lower() in ("1", "true", "yes")
+SCRUB_IO_MBPS = float(os.getenv("SCRUB_IO_MBPS", "20"))
+# longest the scrubber waits for requests to finish before each step
+SCRUB_MAX_YIELD_MS = float(os.getenv("SCRUB_MAX_YIELD_MS", "500"))
+# seconds before a dead leader's lease can be taken over
+LEADER_LEASE_SECONDS = float(os.getenv("LEADER_LEASE_SECONDS", "30"))
+HOUSEKEEPING_INTERVAL = 60
+# admission control, per worker process: concurrent requests overall and per
+# client, and MB/s overall and per client (0 = unlimited) for each lane
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+UPLOAD_CLIENT_CONCURRENCY = int(os.getenv("UPLOAD_CLIENT_CONCURRENCY", "4"))
+UPLOAD_MBPS = float(os.getenv("UPLOAD_MBPS", "0"))
+UPLOAD_CLIENT_MBPS = float(os.getenv("UPLOAD_CLIENT_MBPS", "0"))
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "4"))
+IMPORT_CLIENT_CONCURRENCY = int(os.getenv("IMPORT_CLIENT_CONCURRENCY", "2"))
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "16"))
+DOWNLOAD_CLIENT_CONCURRENCY = int(os.getenv("DOWNLOAD_CLIENT_CONCURRENCY", "6"))
+DOWNLOAD_MBPS = float(os.getenv("DOWNLOAD_MBPS", "0"))
+DOWNLOAD_CLIENT_MBPS = float(os.getenv("DOWNLOAD_CLIENT_MBPS", "0"))
+# waiting requests per lane, and how long one may wait, before a 429
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", "64"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "30"))
+# sync-endpoint threads kept free for the rest of the API when lanes are full
+INTERACTIVE_THREADS = int(os.getenv("INTERACTIVE_THREADS", "16"))
+# key clients by X-Forwarded-For (only behind a proxy that sets it)
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "").lower() in ("1", "true", "yes")
+# URLs one batch options request resolves at once, and at most per request
+IMPORT_OPTIONS_WORKERS = int(os.getenv("IMPORT_OPTIONS_WORKERS", "8"))
+IMPORT_BATCH_MAX = 100
+# let the reverse proxy send model files: "x-accel-redirect" (nginx) or
+# "x-sendfile" (Apache, lighttpd); unset, they are sent from Python
+FILE_OFFLOAD = os.getenv("FILE_OFFLOAD", "").lower()
+# x-accel-redirect: the proxy's internal location that maps to FILE_STORAGE
+FILE_OFFLOAD_PREFIX = os.getenv("FILE_OFFLOAD_PREFIX", "/_files/")
+# x-sendfile: FILE_STORAGE as the proxy sees it, if mounted elsewhere
+FILE_OFFLOAD_ROOT = os.getenv("FILE_OFFLOAD_ROOT", "")
+# models whose metadata each worker keeps in memory (0 disables the read
+# caches), and how long an entry is trusted if workers can't share the
+# invalidation counter file
+READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", "2048"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "60"))
+# bump when init_db's schema changes, so the next start migrates again
+SCHEMA_VERSION = 5
+
+log = logging.getLogger(__name__)
 
 
 class FolderData(BaseModel):
@@ -33,31 +138,144 @@ class FolderData(BaseModel):
     parentId: Union[str, None] = None
 
 
-app = FastAPI(title="STLVault API")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # importing this module has no side effects; the database and storage
+    # are set up here, before the first request is accepted
+    start_app()
+    yield
+    stop_app()
+
+
+lanes = [
+    admission.Lane(
+        "upload",
+        [("POST", "/api/models/upload"), ("PUT", "/api/models/[^/]+/file"),
+         ("POST", "/api/models/ingest")],
+        UPLOAD_CONCURRENCY, UPLOAD_CLIENT_CONCURRENCY, ADMISSION_QUEUE, ADMISSION_MAX_WAIT,
+        UPLOAD_MBPS, UPLOAD_CLIENT_MBPS,
+    ),
+    admission.Lane(
+        "import",
+        [("POST", "/api/import/importid"), ("POST", "/api/printables/importid"),
+         ("POST", "/api/import/options/batch")],
+        IMPORT_CONCURRENCY, IMPORT_CLIENT_CONCURRENCY, ADMISSION_QUEUE, ADMISSION_MAX_WAIT,
+    ),
+    admission.Lane(
+        "download",
+        [("GET", "/api/models/[^/]+/download"), ("GET", "/api/models/[^/]+/mesh"),
+         ("GET", "/api/models/[^/]+/versions/[^/]+/download"),
+         ("GET", "/api/folders/[^/]+/export"), ("POST", "/api/models/export")],
+        DOWNLOAD_CONCURRENCY, DOWNLOAD_CLIENT_CONCURRENCY, ADMISSION_QUEUE, ADMISSION_MAX_WAIT,
+        DOWNLOAD_MBPS, DOWNLOAD_CLIENT_MBPS,
+    ),
+]
+
+app = FastAPI(title="STLVault API", lifespan=lifespan)
+# innermost, so 429s still get CORS headers
+app.add_middleware(admission.AdmissionMiddleware, lanes=lanes, trust_forwarded=TRUST_FORWARDED_FOR)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allow all origins for development, or use [WEBUI_URL] for production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+app.add_middleware(metrics.MetricsMiddleware)
 
 
-def get_db_conn():
-    conn = sqlite3.connect(DB_PATH)
+# advanced after every commit that changes cached data; see readcache.py
+read_generation = readcache.Generation()
+# the folder tree and library version, settings, per-model metadata
+library_cache = readcache.ReadCache(
+    "library", read_generation, min(READ_CACHE_SIZE, 8), READ_CACHE_TTL
+)
+setting_cache = readcache.ReadCache(
+    "settings", read_generation, min(READ_CACHE_SIZE, 64), READ_CACHE_TTL
+)
+model_cache = readcache.ReadCache("models", read_generation, READ_CACHE_SIZE, READ_CACHE_TTL)
+
+
+# NOTIFYed on every such commit, for the other nodes on PostgreSQL
+READ_CACHE_CHANNEL = "stlvault_reads"
+
+
+class ReadInvalidation:
+    """Invalidates the read caches once a change to what they hold commits."""
+
+    invalidate_reads = False
+
+    def commit(self):
+        if self.invalidate_reads and db.POSTGRES:
+            # delivered to every listener when, and only if, this commits
+            self.execute(f"NOTIFY {READ_CACHE_CHANNEL}")
+        super().commit()
+        if self.invalidate_reads:
+            self.invalidate_reads = False
+            read_generation.advance()
+
+    def rollback(self):
+        self.invalidate_reads = False
+        super().rollback()
+
+
+class Connection(ReadInvalidation, metrics.TimedConnection):
+    pass
+
+
+if db.psycopg is not None:
+    class PgConnection(ReadInvalidation, db.PgConnection):
+        pass
+
+
+def get_db_conn(check_same_thread: bool = True):
+    if db.POSTGRES:
+        # pooled; threads may share it, so check_same_thread doesn't apply
+        return db.connect(PgConnection)
+    conn = sqlite3.connect(
+        DB_PATH, check_same_thread=check_same_thread, factory=Connection
+    )
     conn.row_factory = sqlite3.Row
     return conn
 
 
 def init_db():
     conn = get_db_conn()
+    try:
+        if not db.POSTGRES:
+            # migrations can take a while on a big library; wait for them
+            conn.execute("PRAGMA busy_timeout=600000")
+            conn.execute(f"PRAGMA journal_mode={DB_JOURNAL_MODE}")
+        if db.schema_version(conn.cursor()) < SCHEMA_VERSION:
+            migrate_db(conn)
+        if os.getenv("MAKERWORLD_BAMBU_TOKEN"):
+            conn.execute(
+                "INSERT INTO settings(key,value) VALUES (?,?) ON CONFLICT(key) DO NOTHING",
+                ("makerworld_bambu_token", os.getenv("MAKERWORLD_BAMBU_TOKEN")),
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def migrate_db(conn):
+    """Bring the schema up to SCHEMA_VERSION. Every worker and replica calls
+    this on start; the exclusive lock makes the others wait, and they find
+    the schema version already current once they get it."""
     cur = conn.cursor()
+    cur.execute("BEGIN EXCLUSIVE")
+    if db.schema_version(cur) >= SCHEMA_VERSION:
+        conn.rollback()
+        return
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS folders (
             id TEXT PRIMARY KEY,
             name TEXT NOT NULL,
-            parentId TEXT
+            parentId TEXT,
+            updatedAt INTEGER
         )
         """
     )
@@ -73,7 +291,25 @@ def init_db():
             tags TEXT,
             description TEXT,
             thumbnail TEXT,
-            manual TEXT
+            manual TEXT,
+            updatedAt INTEGER
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ingest_jobs (
+            id TEXT PRIMARY KEY,
+            filename TEXT,
+            folderId TEXT,
+            status TEXT NOT NULL,
+            total INTEGER,
+            processed INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            bytes INTEGER DEFAULT 0,
+            errors TEXT,
+            createdAt INTEGER,
+            updatedAt INTEGER
         )
         """
     )
@@ -85,48 +321,304 @@ def init_db():
         )
         """
     )
-    try:
-        cur.execute("ALTER TABLE models ADD COLUMN manual TEXT")
-    except sqlite3.OperationalError:
-        pass
-    if os.getenv("MAKERWORLD_BAMBU_TOKEN"):
+    # deleted ids are kept for a while so delta listings can report them
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tombstones (
+            id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            deletedAt INTEGER NOT NULL,
+            PRIMARY KEY (kind, id)
+        )
+        """
+    )
+    # shape signatures; vector is NULL for files without a readable mesh
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS fingerprints (
+            modelId TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            vector BLOB,
+            triangles INTEGER,
+            area REAL,
+            computedAt INTEGER
+        )
+        """
+    )
+    # drop-folder files already ingested, so "link" sources are not re-added
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS drop_files (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtimeNs INTEGER,
+            modelId TEXT,
+            ingestedAt INTEGER
+        )
+        """
+    )
+    # findings of the last integrity scrub
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scrub_issues (
+            kind TEXT NOT NULL,
+            ref TEXT NOT NULL,
+            modelId TEXT,
+            path TEXT,
+            detail TEXT,
+            bytes INTEGER,
+            foundAt INTEGER,
+            PRIMARY KEY (kind, ref)
+        )
+        """
+    )
+    # tessellation state of STEP models; the mesh is MESH_DIR/<id>.stl
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meshes (
+            modelId TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            owner TEXT,
+            triangles INTEGER,
+            seconds REAL,
+            error TEXT,
+            updatedAt INTEGER
+        )
+        """
+    )
+    # previous files of each model; contents live in VERSION_DIR by hash
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS model_versions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            modelId TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            size INTEGER,
+            ext TEXT,
+            name TEXT,
+            thumbnail TEXT,
+            createdAt INTEGER,
+            archivedAt INTEGER,
+            UNIQUE (modelId, version)
+        )
+        """
+    )
+    # thumbnails re-encoded for grids, valid while models.updatedAt matches
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS thumbnail_cache (
+            modelId TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            updatedAt INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (modelId, size)
+        )
+        """
+    )
+    # live processes and the leader lease (see coordination.py)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS workers (
+            id TEXT PRIMARY KEY,
+            host TEXT,
+            pid INTEGER,
+            startedAt INTEGER,
+            heartbeatAt INTEGER
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expiresAt INTEGER NOT NULL
+        )
+        """
+    )
+    for ddl in (
+        "ALTER TABLE models ADD COLUMN manual TEXT",
+        "ALTER TABLE models ADD COLUMN updatedAt INTEGER",
+        "ALTER TABLE folders ADD COLUMN updatedAt INTEGER",
+        "ALTER TABLE models ADD COLUMN hash TEXT",
+        # print metadata read from 3MF packages
+        "ALTER TABLE models ADD COLUMN plates INTEGER",
+        "ALTER TABLE models ADD COLUMN printTime INTEGER",
+        "ALTER TABLE models ADD COLUMN filamentGrams REAL",
+        "ALTER TABLE models ADD COLUMN filamentTypes TEXT",
+        "ALTER TABLE models ADD COLUMN printerModel TEXT",
+        "ALTER TABLE models ADD COLUMN objects TEXT",
+        "ALTER TABLE models ADD COLUMN printMeta TEXT",
+        # process running the job, so the leader can fail it if that dies
+        "ALTER TABLE ingest_jobs ADD COLUMN owner TEXT",
+        # bounding box in model units, from the tessellated mesh
+        "ALTER TABLE models ADD COLUMN sizeX REAL",
+        "ALTER TABLE models ADD COLUMN sizeY REAL",
+        "ALTER TABLE models ADD COLUMN sizeZ REAL",
+        # number of the current file; earlier ones are in model_versions
+        "ALTER TABLE models ADD COLUMN version INTEGER",
+        # folder a deleted model was in, so folder deltas only report their own
+        "ALTER TABLE tombstones ADD COLUMN folderId TEXT",
+    ):
+        if db.POSTGRES:
+            # becomes ADD COLUMN IF NOT EXISTS
+            cur.execute(ddl)
+            continue
+        try:
+            cur.execute(ddl)
+        except sqlite3.OperationalError:
+            pass
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_models_updated ON models(updatedAt)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_folders_updated ON folders(updatedAt)")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tombstones_deleted ON tombstones(deletedAt)"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_models_hash ON models(hash)")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_model_versions_archived ON model_versions(archivedAt)"
+    )
+    if db.POSTGRES:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_models_printer ON models(lower(printerModel))")
+        create_search_indexes(cur)
+    else:
         cur.execute(
-            "INSERT OR IGNORE INTO settings(key,value) VALUES (?,?)",
-            ("makerworld_bambu_token", os.getenv("MAKERWORLD_BAMBU_TOKEN")),
+            "CREATE INDEX IF NOT EXISTS idx_models_printer ON models(printerModel COLLATE NOCASE)"
         )
-    conn.commit()
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_models_print_time ON models(printTime)")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_folders_parent ON folders(parentId, name)"
+    )
+    cur.execute(
+        "INSERT INTO settings(key,value) VALUES ('library_version','0') "
+        "ON CONFLICT(key) DO NOTHING"
+    )
 
     # seed folders if empty
     cur.execute("SELECT COUNT(*) as c FROM folders")
     if cur.fetchone()[0] == 0:
+        ts = int(time.time() * 1000)
         seed = [
-            ("1", "Characters", None),
-            ("2", "Vehicles", None),
-            ("3", "Terrain", None),
-            ("4", "Tanks", "2"),
+            ("1", "Characters", None, ts),
+            ("2", "Vehicles", None, ts),
+            ("3", "Terrain", None, ts),
+            ("4", "Tanks", "2", ts),
         ]
-        cur.executemany("INSERT INTO folders(id,name,parentId) VALUES (?,?,?)", seed)
-        conn.commit()
-
-    conn.close()
+        cur.executemany(
+            "INSERT INTO folders(id,name,parentId,updatedAt) VALUES (?,?,?,?)", seed
+        )
+    db.set_schema_version(cur, SCHEMA_VERSION)
+    conn.commit()
 
 
-init_db()
+def create_search_indexes(cur):
+    """PostgreSQL: trigram GIN indexes for the `q` search, which matches
+    substrings of tags, names, object names and printer models with ILIKE.
+    Needs the pg_trgm extension; without it the search scans the table."""
+    cur.execute("SAVEPOINT search_indexes")
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except db.Error as e:
+        cur.execute("ROLLBACK TO SAVEPOINT search_indexes")
+        log.warning("pg_trgm unavailable (%s); search will not use an index", e)
+        return
+    for column in ("tags", "name", "objects", "printerModel"):
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_models_{column.lower()}_trgm "
+            f"ON models USING GIN ({column} gin_trgm_ops)"
+        )
+    cur.execute("RELEASE SAVEPOINT search_indexes")
 
 
 def now_ms() -> int:
     return int(time.time() * 1000)
 
 
+def get_library_version(cur) -> int:
+    row = cur.execute(
+        "SELECT value FROM settings WHERE key='library_version'"
+    ).fetchone()
+    return int(row["value"]) if row else 0
+
+
+def bump_library_version(cur):
+    """Mark the library as changed; call inside the writing transaction."""
+    cur.execute(
+        "UPDATE settings SET value = CAST(value AS INTEGER) + 1 WHERE key='library_version'"
+    )
+    cur.connection.invalidate_reads = True
+
+
+def cached_library_version() -> int:
+    """The library version without a query while nothing has changed."""
+
+    def load():
+        conn = get_db_conn()
+        try:
+            return get_library_version(conn.cursor())
+        finally:
+            conn.close()
+
+    return library_cache.get("version", load)
+
+
+TOMBSTONE_UPSERT = (
+    "INSERT INTO tombstones(id,kind,folderId,deletedAt) VALUES (?,?,?,?) "
+    "ON CONFLICT(kind,id) DO UPDATE SET folderId=excluded.folderId, "
+    "deletedAt=excluded.deletedAt"
+)
+
+
+def add_tombstone(cur, kind: str, item_id: str, folder_id: Optional[str] = None):
+    cur.execute(TOMBSTONE_UPSERT, (item_id, kind, folder_id, now_ms()))
+
+
+def library_etag(version: int) -> str:
+    return f'W/"lib-{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison: ignore the W/ prefix on both sides
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def delta_is_complete(cur, since: int) -> bool:
+    """False when tombstones older than `since` were pruned and may be missing."""
+    row = cur.execute(
+        "SELECT value FROM settings WHERE key='tombstones_pruned_before'"
+    ).fetchone()
+    return not row or since >= int(row["value"])
+
+
 def row_to_folder(row: sqlite3.Row) -> Dict[str, Any]:
     return {"id": row["id"], "name": row["name"], "parentId": row["parentId"]}
 
 
-def row_to_model(row: sqlite3.Row) -> Dict[str, Any]:
+def row_to_model(row: sqlite3.Row, thumbnail: bool = True) -> Dict[str, Any]:
+    """API form of a models row. Without `thumbnail` the data URL is left out
+    and `hasThumbnail` says whether there is one to fetch from
+    /api/thumbnails."""
     tags = []
     if row["tags"]:
         try:
-            tags = json.loads(row["tags"])
+            tags = orjson.loads(row["tags"])
         except Exception:
             tags = []
     return {
@@ -138,11 +630,108 @@ def row_to_model(row: sqlite3.Row) -> Dict[str, Any]:
         "dateAdded": row["dateAdded"],
         "tags": tags,
         "description": row["description"] or "",
-        "thumbnail": row["thumbnail"],
+        "thumbnail": row["thumbnail"] if thumbnail else None,
+        "hasThumbnail": bool(row["thumbnail"]),
+        "updatedAt": row["updatedAt"],
         "manual": row["manual"] if "manual" in row.keys() else None,
+        "printInfo": row_to_print_info(row),
+        "dimensions": (
+            {"x": row["sizeX"], "y": row["sizeY"], "z": row["sizeZ"]}
+            if row["sizeX"] is not None else None
+        ),
+        "version": row["version"] or 1,
+    }
+
+
+def row_to_print_info(row: sqlite3.Row) -> Optional[Dict[str, Any]]:
+    if row["plates"] is None:
+        return None
+    return {
+        "plates": row["plates"],
+        "printTime": row["printTime"],
+        "filamentGrams": row["filamentGrams"],
+        "filamentTypes": orjson.loads(row["filamentTypes"]) if row["filamentTypes"] else [],
+        "printerModel": row["printerModel"],
+        "objects": orjson.loads(row["objects"]) if row["objects"] else [],
+        "extra": orjson.loads(row["printMeta"]) if row["printMeta"] else {},
     }
 
 
+def print_info_values(info: Optional[Dict[str, Any]]) -> tuple:
+    """Column values for plates..printMeta; all NULL when there is no info."""
+    if not info:
+        return (None,) * 7
+    return (
+        info["plates"],
+        info["printTime"],
+        info["filamentGrams"],
+        json.dumps(info["filamentTypes"]),
+        info["printerModel"],
+        json.dumps(info["objects"]),
+        json.dumps(info["extra"]),
+    )
+
+
+def public_print_info(info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return {k: v for k, v in info.items() if k != "thumbnail"} if info else None
+
+
+def set_print_info(cur, model_id: str, info: Optional[Dict[str, Any]]):
+    cur.execute(
+        "UPDATE models SET plates=?, printTime=?, filamentGrams=?, filamentTypes=?, "
+        "printerModel=?, objects=?, printMeta=? WHERE id=?",
+        (*print_info_values(info), model_id),
+    )
+
+
+def insert_model(cur, model: Dict[str, Any], digest: Optional[str],
+                 info: Optional[Dict[str, Any]]):
+    cur.execute(
+        "INSERT INTO models(id,name,folderId,url,size,dateAdded,tags,description,thumbnail,updatedAt,hash) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+        (
+            model["id"],
+            model["name"],
+            model["folderId"],
+            model["url"],
+            model["size"],
+            model["dateAdded"],
+            json.dumps(model["tags"]),
+            model["description"],
+            model["thumbnail"],
+            model["dateAdded"],
+            digest,
+        ),
+    )
+    set_print_info(cur, model["id"], info)
+
+
+def remove_file(path: Union[str, Path]):
+    """Unlink if present; failures are logged and left for the scrubber."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        log.warning("could not remove %s: %s", path, e)
+
+
+def remove_model_files(model_id: str, manual: bool = True):
+    for fname in os.listdir(UPLOAD_DIR):
+        if fname.startswith(model_id):
+            remove_file(os.path.join(UPLOAD_DIR, fname))
+    remove_file(MESH_DIR / f"{model_id}.stl")
+    if manual:
+        remove_file(MANUAL_DIR / f"{model_id}.md")
+
+
+def is_step(name: Optional[str]) -> bool:
+    return bool(name) and name.lower().endswith((".step", ".stp"))
+
+
+def is_3mf(name: Optional[str]) -> bool:
+    return bool(name) and str(name).lower().endswith("3mf")
+
+
 def save_upload_file(upload_file: UploadFile, dest_path: str) -> int:
     with open(dest_path, "wb") as buffer:
         shutil.copyfileobj(upload_file.file, buffer)
@@ -150,11 +739,19 @@ def save_upload_file(upload_file: UploadFile, dest_path: str) -> int:
     return size
 
 
+def save_upload_file_hashed(upload_file: UploadFile, dest_path: str):
+    """Like save_upload_file, but also returns the sha256 of the content."""
+    return archive_ingest.copy_hashed(upload_file.file, dest_path)
+
+
 def get_setting(key: str) -> Optional[str]:
-    conn = get_db_conn()
-    row = conn.execute("SELECT value FROM settings WHERE key=?", (key,)).fetchone()
-    conn.close()
-    return row["value"] if row else None
+    def load():
+        conn = get_db_conn()
+        row = conn.execute("SELECT value FROM settings WHERE key=?", (key,)).fetchone()
+        conn.close()
+        return row["value"] if row else None
+
+    return setting_cache.get(key, load)
 
 
 def set_setting(key: str, value: str):
@@ -163,6 +760,7 @@ def set_setting(key: str, value: str):
         "INSERT INTO settings(key,value) VALUES (?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
         (key, value),
     )
+    conn.invalidate_reads = True
     conn.commit()
     conn.close()
 
@@ -170,19 +768,68 @@ def set_setting(key: str, value: str):
 def clear_setting(key: str):
     conn = get_db_conn()
     conn.execute("DELETE FROM settings WHERE key=?", (key,))
+    conn.invalidate_reads = True
     conn.commit()
     conn.close()
 
 
+def cached_folders() -> Tuple[int, List[Dict[str, Any]]]:
+    """(library version, every folder); the version is read first, so the
+    folders are never older than the ETag made from it."""
+
+    def load():
+        conn = get_db_conn()
+        try:
+            cur = conn.cursor()
+            version = get_library_version(cur)
+            cur.execute("SELECT id,name,parentId FROM folders")
+            return version, [row_to_folder(r) for r in cur.fetchall()]
+        finally:
+            conn.close()
+
+    return library_cache.get("folders", load)
+
+
 # --- Folder endpoints ---
 @app.get("/api/folders")
-def get_folders():
-    conn = get_db_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id,name,parentId FROM folders")
-    rows = cur.fetchall()
-    conn.close()
-    return [row_to_folder(r) for r in rows]
+def get_folders(request: Request, modifiedSince: Optional[int] = None):
+    server_time = now_ms()
+    version, folders = cached_folders()
+    etag = library_etag(version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if modifiedSince is not None:
+        conn = get_db_conn()
+        cur = conn.cursor()
+        if delta_is_complete(cur, modifiedSince):
+            cur.execute(
+                "SELECT id,name,parentId FROM folders WHERE COALESCE(updatedAt,0) >= ?",
+                (modifiedSince,),
+            )
+            changed = [row_to_folder(r) for r in cur.fetchall()]
+            cur.execute(
+                "SELECT id FROM tombstones WHERE kind='folder' AND deletedAt >= ?",
+                (modifiedSince,),
+            )
+            deleted = [r["id"] for r in cur.fetchall()]
+            conn.close()
+            return ORJSONResponse(
+                {
+                    "full": False,
+                    "changed": changed,
+                    "deleted": deleted,
+                    "serverTime": server_time,
+                },
+                headers=headers,
+            )
+        conn.close()
+        return ORJSONResponse(
+            {"full": True, "changed": folders, "deleted": [], "serverTime": server_time},
+            headers=headers,
+        )
+    return ORJSONResponse(folders, headers=headers)
 
 
 @app.post("/api/folders")
@@ -191,9 +838,10 @@ def create_folder(item: FolderData):
     conn = get_db_conn()
     cur = conn.cursor()
     cur.execute(
-        "INSERT INTO folders(id,name,parentId) VALUES (?,?,?)",
-        (fid, item.name, item.parentId),
+        "INSERT INTO folders(id,name,parentId,updatedAt) VALUES (?,?,?,?)",
+        (fid, item.name, item.parentId, now_ms()),
     )
+    bump_library_version(cur)
     conn.commit()
     conn.close()
     return {"id": fid, "name": item.name, "parentId": item.parentId}
@@ -203,10 +851,14 @@ def create_folder(item: FolderData):
 def update_folder(folder_id: str, item: FolderData):
     conn = get_db_conn()
     cur = conn.cursor()
-    cur.execute("UPDATE folders SET name=? WHERE id=?", (item.name, folder_id))
+    cur.execute(
+        "UPDATE folders SET name=?, updatedAt=? WHERE id=?",
+        (item.name, now_ms(), folder_id),
+    )
     if cur.rowcount == 0:
         conn.close()
         raise HTTPException(status_code=404, detail="Folder not found")
+    bump_library_version(cur)
     conn.commit()
     cur.execute("SELECT id,name,parentId FROM folders WHERE id=?", (folder_id,))
     row = cur.fetchone()
@@ -227,34 +879,158 @@ def delete_folder(folder_id: str):
         conn.close()
         raise HTTPException(status_code=400, detail="Folder must be empty to delete")
     cur.execute("DELETE FROM folders WHERE id=?", (folder_id,))
+    if cur.rowcount:
+        add_tombstone(cur, "folder", folder_id)
+        bump_library_version(cur)
     conn.commit()
     conn.close()
     return {"ok": True}
 
 
 # --- Model endpoints ---
+def stream_models(conn: sqlite3.Connection, cur: sqlite3.Cursor, fmt: str, thumbnail: bool = True):
+    """Serialize rows as they come off the cursor, as NDJSON or a JSON array."""
+    try:
+        first = True
+        if fmt == "json":
+            yield b"["
+        while True:
+            rows = cur.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            if fmt == "ndjson":
+                yield b"".join(orjson.dumps(row_to_model(r, thumbnail)) + b"\n" for r in rows)
+            else:
+                chunk = b",".join(orjson.dumps(row_to_model(r, thumbnail)) for r in rows)
+                yield chunk if first else b"," + chunk
+            first = False
+        if fmt == "json":
+            yield b"]"
+    finally:
+        conn.close()
+
+
 @app.get("/api/models")
-def get_models(folderId: Optional[str] = None):
-    conn = get_db_conn()
+def get_models(
+    request: Request,
+    folderId: Optional[str] = None,
+    modifiedSince: Optional[int] = None,
+    stream: Optional[str] = None,
+    printerModel: Optional[str] = None,
+    filamentType: Optional[str] = None,
+    maxPrintTime: Optional[int] = None,
+    q: Optional[str] = None,
+    include_thumbnails: bool = Query(True, alias="thumbnails"),
+):
+    # streamed responses keep the connection open across threadpool hops
+    server_time = now_ms()
+    etag = library_etag(cached_library_version())
+    if not include_thumbnails:
+        # a different body for the same library version
+        etag = etag[:-1] + '-t0"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    conn = get_db_conn(check_same_thread=False)
     cur = conn.cursor()
-    if folderId and folderId != "all":
-        cur.execute("SELECT * FROM models WHERE folderId=?", (folderId,))
-    else:
-        cur.execute("SELECT * FROM models")
-    rows = cur.fetchall()
+    in_folder = folderId and folderId != "all"
+
+    where = []
+    params: List[Any] = []
+    if in_folder:
+        where.append("folderId=?")
+        params.append(folderId)
+    if printerModel:
+        where.append(db.nocase_equals("printerModel"))
+        params.append(printerModel)
+    if filamentType:
+        where.append(f"filamentTypes {db.LIKE} ?")
+        params.append(f'%"{filamentType}"%')
+    if maxPrintTime is not None:
+        where.append("printTime<=?")
+        params.append(maxPrintTime)
+    if q:
+        where.append(
+            f"(name {db.LIKE} ? OR tags {db.LIKE} ? OR objects {db.LIKE} ? "
+            f"OR printerModel {db.LIKE} ?)"
+        )
+        params.extend([f"%{q}%"] * 4)
+
+    if modifiedSince is not None and delta_is_complete(cur, modifiedSince):
+        # rows that changed but no longer match (moved out of the folder,
+        # retagged, ...) look deleted to this view
+        matches = " AND ".join(where) or "1=1"
+        cur.execute(
+            f"SELECT *, CASE WHEN {matches} THEN 1 ELSE 0 END AS inView FROM models "
+            "WHERE COALESCE(updatedAt,0) >= ?",
+            (*params, modifiedSince),
+        )
+        changed = []
+        deleted = []
+        for r in cur.fetchall():
+            if r["inView"]:
+                changed.append(row_to_model(r, include_thumbnails))
+            else:
+                deleted.append(r["id"])
+        sql = "SELECT id FROM tombstones WHERE kind='model' AND deletedAt >= ?"
+        if in_folder:
+            # folderId is unknown for tombstones written before it was recorded
+            sql += " AND (folderId IS NULL OR folderId=?)"
+        cur.execute(sql, (modifiedSince, folderId) if in_folder else (modifiedSince,))
+        deleted.extend(r["id"] for r in cur.fetchall())
+        conn.close()
+        return ORJSONResponse(
+            {
+                "full": False,
+                "changed": changed,
+                "deleted": deleted,
+                "serverTime": server_time,
+            },
+            headers=headers,
+        )
+
+    sql = "SELECT * FROM models"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+
+    if stream in ("ndjson", "json") and modifiedSince is None:
+        cur = db.stream_cursor(conn)
+        cur.execute(sql, params)
+        media_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+        return StreamingResponse(
+            stream_models(conn, cur, stream, include_thumbnails),
+            media_type=media_type,
+            headers=headers,
+        )
+
+    rows = cur.execute(sql, params).fetchall()
     conn.close()
-    return [row_to_model(r) for r in rows]
+    models = [row_to_model(r, include_thumbnails) for r in rows]
+    if modifiedSince is not None:
+        return ORJSONResponse(
+            {"full": True, "changed": models, "deleted": [], "serverTime": server_time},
+            headers=headers,
+        )
+    return ORJSONResponse(models, headers=headers)
 
-def get_model_info(modelId):
-    conn = get_db_conn()
-    cur = conn.cursor()
-    m = None
-    if modelId is not None:
-        m = cur.execute("SELECT * FROM models WHERE id=?", (modelId,)).fetchone()
-    else:
+
+def get_model_info(modelId) -> Optional[Dict[str, Any]]:
+    """A model without its thumbnail, plus its stored filename as "file",
+    or None if there is no such model. Cached and shared: don't modify it."""
+    if modelId is None:
         return None
-    conn.close()
-    return row_to_model(m)
+
+    def load():
+        conn = get_db_conn()
+        m = conn.execute("SELECT * FROM models WHERE id=?", (modelId,)).fetchone()
+        conn.close()
+        if m is None:
+            return None
+        with metrics.file_scan("download"):
+            stored = next((f for f in os.listdir(UPLOAD_DIR) if f.startswith(modelId)), None)
+        return {**row_to_model(m, thumbnail=False), "file": stored}
+
+    return model_cache.get(modelId, load)
 
 @app.post("/api/models/upload")
 def upload_model(
@@ -271,45 +1047,48 @@ def upload_model(
     
     filename = f"{mid}{ext}"
     path = os.path.join(UPLOAD_DIR, filename)
-    size = save_upload_file(file, path)
-
-    tag_list: List[str] = []
-    if tags:
-        try:
-            tag_list = json.loads(tags)
-        except Exception:
-            tag_list = [t.strip() for t in (tags or "").split(",") if t.strip()]
-
-    model = {
-        "id": mid,
-        "name": file.filename,
-        "folderId": folderId if folderId != "all" else "1",
-        "url": f"/api/models/{mid}/download",
-        "size": size,
-        "dateAdded": now_ms(),
-        "tags": tag_list,
-        "description": "",
-        "thumbnail": thumbnail,
-    }
+    size, digest = save_upload_file_hashed(file, path)
+    conn = None
+    try:
+        info = threemf.inspect_3mf(path, with_thumbnail=not thumbnail) if is_3mf(ext) else None
+        if info and not thumbnail:
+            thumbnail = info["thumbnail"]
 
-    conn = get_db_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO models(id,name,folderId,url,size,dateAdded,tags,description,thumbnail) VALUES (?,?,?,?,?,?,?,?,?)",
-        (
-            model["id"],
-            model["name"],
-            model["folderId"],
-            model["url"],
-            model["size"],
-            model["dateAdded"],
-            json.dumps(model["tags"]),
-            model["description"],
-            model["thumbnail"],
-        ),
-    )
-    conn.commit()
-    conn.close()
+        tag_list: List[str] = []
+        if tags:
+            try:
+                tag_list = json.loads(tags)
+            except Exception:
+                tag_list = [t.strip() for t in (tags or "").split(",") if t.strip()]
+
+        model = {
+            "id": mid,
+            "name": file.filename,
+            "folderId": folderId if folderId != "all" else "1",
+            "url": f"/api/models/{mid}/download",
+            "size": size,
+            "dateAdded": now_ms(),
+            "tags": tag_list,
+            "description": "",
+            "thumbnail": thumbnail,
+        }
+
+        conn = get_db_conn()
+        cur = conn.cursor()
+        insert_model(cur, model, digest, info)
+        bump_library_version(cur)
+        conn.commit()
+    except Exception:
+        # no row for the file: don't leave it behind as an orphan
+        if conn is not None:
+            conn.rollback()
+        remove_file(path)
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
+    process_new_files([(model["id"], path)])
+    model["printInfo"] = public_print_info(info)
     return model
 
 
@@ -335,8 +1114,11 @@ def update_model(model_id: str, updates: dict):
             fields.append(f"{k}=?")
 
     if fields:
+        fields.append("updatedAt=?")
+        values.append(now_ms())
         sql = f"UPDATE models SET {', '.join(fields)} WHERE id=?"
         cur.execute(sql, (*values, model_id))
+        bump_library_version(cur)
         conn.commit()
 
     row = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
@@ -353,58 +1135,78 @@ def delete_model(model_id: str):
         conn.close()
         raise HTTPException(status_code=404, detail="Model not found")
     # Delete file if exists
-    for fname in os.listdir(UPLOAD_DIR):
-        if fname.startswith(model_id):
-            try:
-                os.remove(os.path.join(UPLOAD_DIR, fname))
-            except Exception:
-                pass
-    manual_path = MANUAL_DIR / f"{model_id}.md"
-    if manual_path.exists():
-        try:
-            manual_path.unlink()
-        except Exception:
-            pass
+    with metrics.file_scan("delete"):
+        remove_model_files(model_id)
     cur.execute("DELETE FROM models WHERE id=?", (model_id,))
+    cur.execute("DELETE FROM fingerprints WHERE modelId=?", (model_id,))
+    cur.execute("DELETE FROM meshes WHERE modelId=?", (model_id,))
+    cur.execute("DELETE FROM model_versions WHERE modelId=?", (model_id,))
+    add_tombstone(cur, "model", model_id, m["folderId"])
+    bump_library_version(cur)
     conn.commit()
     conn.close()
     return {"ok": True}
 
 
+def send_file(
+    path: Union[str, Path],
+    media_type: str,
+    filename: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """A FileResponse, or with FILE_OFFLOAD an empty response whose header
+    names the file for the reverse proxy to send, ranges included. Only
+    files under UPLOAD_DIR can be offloaded; that is what the proxy maps."""
+    if FILE_OFFLOAD not in ("x-accel-redirect", "x-sendfile"):
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+    try:
+        relative = Path(path).resolve().relative_to(UPLOAD_DIR.resolve())
+    except ValueError:
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+    headers = dict(headers or {})
+    if filename:
+        headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    if FILE_OFFLOAD == "x-accel-redirect":
+        headers["X-Accel-Redirect"] = FILE_OFFLOAD_PREFIX.rstrip("/") + "/" + quote(relative.as_posix())
+    else:
+        root = Path(FILE_OFFLOAD_ROOT) if FILE_OFFLOAD_ROOT else UPLOAD_DIR.resolve()
+        headers["X-Sendfile"] = str(root / relative)
+    metrics.FILES_OFFLOADED.inc()
+    return Response(media_type=media_type, headers=headers)
+
+
 @app.get("/api/models/{model_id}/download")
 def download_model(model_id: str):
-    # Find file matching id
     m_info = get_model_info(model_id)
-    for fname in os.listdir(UPLOAD_DIR):
-        if fname.startswith(model_id):
-            return FileResponse(
-                os.path.join(UPLOAD_DIR, fname),
-                media_type="application/octet-stream",
-                filename=m_info["name"],
-            )
+    path = os.path.join(UPLOAD_DIR, m_info["file"]) if m_info and m_info["file"] else None
+    if path and os.path.isfile(path):
+        return send_file(
+            path,
+            media_type="application/octet-stream",
+            filename=m_info["name"],
+        )
     raise HTTPException(status_code=404, detail="File not found")
 
 
 @app.post("/api/models/bulk-delete")
 def bulk_delete(payload: dict):
     ids = payload.get("ids", [])
+    for mid in ids:
+        with metrics.file_scan("bulk_delete"):
+            remove_model_files(mid)
     conn = get_db_conn()
     cur = conn.cursor()
-    for mid in ids:
-        # delete files
-        for fname in os.listdir(UPLOAD_DIR):
-            if fname.startswith(mid):
-                try:
-                    os.remove(os.path.join(UPLOAD_DIR, fname))
-                except Exception:
-                    pass
-        manual_path = MANUAL_DIR / f"{mid}.md"
-        if manual_path.exists():
-            try:
-                manual_path.unlink()
-            except Exception:
-                pass
-        cur.execute("DELETE FROM models WHERE id=?", (mid,))
+    ts = now_ms()
+    for chunk in db.batches(ids):
+        match, params = db.in_list(chunk)
+        found = cur.execute(f"SELECT id,folderId FROM models WHERE id {match}", params).fetchall()
+        cur.execute(f"DELETE FROM models WHERE id {match}", params)
+        cur.executemany(
+            TOMBSTONE_UPSERT, [(r["id"], "model", r["folderId"], ts) for r in found]
+        )
+        for table in ("fingerprints", "meshes", "model_versions"):
+            cur.execute(f"DELETE FROM {table} WHERE modelId {match}", params)
+    bump_library_version(cur)
     conn.commit()
     conn.close()
     return {"ok": True}
@@ -416,8 +1218,13 @@ def bulk_move(payload: dict):
     folderId = payload.get("folderId")
     conn = get_db_conn()
     cur = conn.cursor()
-    for mid in ids:
-        cur.execute("UPDATE models SET folderId=? WHERE id=?", (folderId, mid))
+    ts = now_ms()
+    for chunk in db.batches(ids):
+        match, params = db.in_list(chunk)
+        cur.execute(
+            f"UPDATE models SET folderId=?, updatedAt=? WHERE id {match}", (folderId, ts, *params)
+        )
+    bump_library_version(cur)
     conn.commit()
     conn.close()
     return {"ok": True}
@@ -429,18 +1236,23 @@ def bulk_tag(payload: dict):
     tags = payload.get("tags", [])
     conn = get_db_conn()
     cur = conn.cursor()
-    for mid in ids:
-        row = cur.execute("SELECT tags FROM models WHERE id=?", (mid,)).fetchone()
-        if not row:
-            continue
-        existing = []
-        if row["tags"]:
-            try:
-                existing = json.loads(row["tags"])
-            except Exception:
-                existing = []
-        merged = list(dict.fromkeys(existing + tags))
-        cur.execute("UPDATE models SET tags=? WHERE id=?", (json.dumps(merged), mid))
+    ts = now_ms()
+    for chunk in db.batches(ids):
+        match, params = db.in_list(chunk)
+        updates = []
+        for row in cur.execute(
+            f"SELECT id, tags FROM models WHERE id {match} ORDER BY id", params
+        ).fetchall():
+            existing = []
+            if row["tags"]:
+                try:
+                    existing = json.loads(row["tags"])
+                except Exception:
+                    existing = []
+            merged = list(dict.fromkeys(existing + tags))
+            updates.append((json.dumps(merged), ts, row["id"]))
+        cur.executemany("UPDATE models SET tags=?, updatedAt=? WHERE id=?", updates)
+    bump_library_version(cur)
     conn.commit()
     conn.close()
     return {"ok": True}
@@ -456,27 +1268,25 @@ def replace_model_file(
     if not m:
         conn.close()
         raise HTTPException(status_code=404, detail="Model not found")
-    # remove existing files that start with model_id
-    for fname in os.listdir(UPLOAD_DIR):
-        if fname.startswith(model_id):
-            try:
-                os.remove(os.path.join(UPLOAD_DIR, fname))
-            except Exception:
-                pass
 
     filename_str = file.filename or ".stl"
     ext = os.path.splitext(filename_str)[-1] or ".stl"
-    filename = f"{model_id}{ext}"
-    path = os.path.join(UPLOAD_DIR, filename)
-    size = save_upload_file(file, path)
-
-    cur.execute(
-        "UPDATE models SET url=?, size=?, thumbnail=? WHERE id=?",
-        (f"/api/models/{model_id}/download", size, thumbnail, model_id),
-    )
-    conn.commit()
+    # written aside first; the current file is kept as a version on the swap
+    tmp = os.path.join(UPLOAD_DIR, f".{model_id}.{uuid.uuid4().hex[:8]}.upload")
+    try:
+        size, digest = save_upload_file_hashed(file, tmp)
+        info = threemf.inspect_3mf(tmp, with_thumbnail=not thumbnail) if is_3mf(ext) else None
+        if info and not thumbnail:
+            thumbnail = info["thumbnail"]
+        path = swap_model_file(conn, model_id, tmp, ext, size, digest, thumbnail, info)
+    except Exception:
+        conn.close()
+        raise
+    finally:
+        remove_file(tmp)
     row = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
     conn.close()
+    process_new_files([(model_id, path)])
     return row_to_model(row)
 
 
@@ -503,9 +1313,10 @@ def replace_model_thumbnail(
         raise HTTPException(status_code=404, detail="Model not found")
 
     cur.execute(
-        "UPDATE models SET thumbnail=? WHERE id=?",
-        (thumbnail, model_id),
+        "UPDATE models SET thumbnail=?, updatedAt=? WHERE id=?",
+        (thumbnail, now_ms(), model_id),
     )
+    bump_library_version(cur)
     conn.commit()
     row = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
     conn.close()
@@ -517,7 +1328,7 @@ def get_model_manual(model_id: str):
     path = MANUAL_DIR / f"{model_id}.md"
     if not path.exists():
         raise HTTPException(status_code=404, detail="Manual not found")
-    return FileResponse(path, media_type="text/markdown")
+    return send_file(path, media_type="text/markdown")
 
 
 @app.put("/api/models/{model_id}/manual")
@@ -533,9 +1344,10 @@ def upload_model_manual(model_id: str, file: UploadFile = File(...)):
     save_upload_file(file, str(path))
 
     cur.execute(
-        "UPDATE models SET manual=? WHERE id=?",
-        (file.filename, model_id),
+        "UPDATE models SET manual=?, updatedAt=? WHERE id=?",
+        (file.filename, now_ms(), model_id),
     )
+    bump_library_version(cur)
     conn.commit()
     row = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
     conn.close()
@@ -551,37 +1363,1667 @@ def delete_model_manual(model_id: str):
         conn.close()
         raise HTTPException(status_code=404, detail="Model not found")
 
-    path = MANUAL_DIR / f"{model_id}.md"
-    if path.exists():
+    remove_file(MANUAL_DIR / f"{model_id}.md")
+
+    cur.execute(
+        "UPDATE models SET manual=NULL, updatedAt=? WHERE id=?", (now_ms(), model_id)
+    )
+    bump_library_version(cur)
+    conn.commit()
+    row = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
+    conn.close()
+    return row_to_model(row)
+
+
+def model_file_index() -> Dict[str, str]:
+    """Map model id -> stored filename with a single directory scan."""
+    index = {}
+    with metrics.file_scan("index"):
+        for fname in os.listdir(UPLOAD_DIR):
+            # stored as "<uuid>.<ext>"; uuids are 36 characters
+            index.setdefault(fname[:36], fname)
+    return index
+
+
+def safe_name(name: str) -> str:
+    cleaned = "".join("_" if c in '<>:"/\\|?*' or ord(c) < 32 else c for c in name)
+    return cleaned.strip(" .") or "unnamed"
+
+
+def folder_paths(cur) -> Dict[str, str]:
+    """Folder id -> "Parent/Child" path built from parentId links."""
+    folders = {
+        r["id"]: (r["name"], r["parentId"])
+        for r in cur.execute("SELECT id,name,parentId FROM folders").fetchall()
+    }
+    paths: Dict[str, str] = {}
+
+    def resolve(fid, seen=()):
+        if fid in paths:
+            return paths[fid]
+        name, parent = folders[fid]
+        if parent in folders and parent not in seen:
+            path = resolve(parent, seen + (fid,)) + "/" + safe_name(name)
+        else:
+            path = safe_name(name)
+        paths[fid] = path
+        return path
+
+    for fid in folders:
+        resolve(fid)
+    return paths
+
+
+def export_entries(rows: List[sqlite3.Row], paths: Dict[str, str], root: Optional[str]):
+    """Archive entries for the given model rows: files, manuals and a manifest."""
+    files = model_file_index()
+    used = set()
+    manifest = []
+    entries = []
+
+    def unique(path):
+        stem, ext = os.path.splitext(path)
+        candidate, n = path, 2
+        while candidate.lower() in used:
+            candidate = f"{stem} ({n}){ext}"
+            n += 1
+        used.add(candidate.lower())
+        return candidate
+
+    for row in rows:
+        model = row_to_model(row)
+        stored = files.get(model["id"])
+        folder = paths.get(model["folderId"], "")
+        # strip the exported folder's parents so the archive starts at it
+        if root and folder.startswith(root):
+            folder = folder[len(root):].lstrip("/")
+        name = safe_name(model["name"] or model["id"])
+        if stored and not os.path.splitext(name)[1]:
+            name += os.path.splitext(stored)[1]
+        arcname = unique(f"{folder}/{name}" if folder else name)
+        item = {**model, "path": arcname if stored else None, "manualPath": None}
+        item.pop("thumbnail", None)
+        if stored:
+            entries.append((arcname, os.path.join(UPLOAD_DIR, stored)))
+        manual = MANUAL_DIR / f"{model['id']}.md"
+        if model["manual"] and manual.exists():
+            item["manualPath"] = unique(os.path.splitext(arcname)[0] + ".md")
+            entries.append((item["manualPath"], str(manual)))
+        manifest.append(item)
+
+    body = orjson.dumps(
+        {"exportedAt": now_ms(), "models": manifest}, option=orjson.OPT_INDENT_2
+    )
+    return [("manifest.json", body)] + entries
+
+
+def zip_response(entries, name: str) -> StreamingResponse:
+    filename = f"{safe_name(name)}.zip"
+    return StreamingResponse(
+        stream_zip(entries, EXPORT_COMPRESS_LEVEL),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@app.get("/api/folders/{folder_id}/export")
+def export_folder(folder_id: str, recursive: bool = True):
+    conn = get_db_conn()
+    cur = conn.cursor()
+    folder = cur.execute("SELECT * FROM folders WHERE id=?", (folder_id,)).fetchone()
+    if not folder:
+        conn.close()
+        raise HTTPException(status_code=404, detail="Folder not found")
+    ids = [folder_id]
+    if recursive:
+        children: Dict[str, List[str]] = {}
+        for r in cur.execute("SELECT id,parentId FROM folders").fetchall():
+            children.setdefault(r["parentId"], []).append(r["id"])
+        seen = {folder_id}
+        i = 0
+        while i < len(ids):
+            for c in children.get(ids[i], []):
+                if c not in seen:
+                    seen.add(c)
+                    ids.append(c)
+            i += 1
+    paths = folder_paths(cur)
+    rows = []
+    # batches are sorted, so the rows stay in folderId, name order overall
+    for batch in db.batches(ids):
+        sql, params = db.in_list(batch)
+        rows.extend(cur.execute(
+            f"SELECT * FROM models WHERE folderId {sql} ORDER BY folderId, name", params
+        ).fetchall())
+    conn.close()
+    root = paths[folder_id]
+    parent_root = root.rsplit("/", 1)[0] if "/" in root else ""
+    return zip_response(export_entries(rows, paths, parent_root), folder["name"])
+
+
+@app.post("/api/models/export")
+def export_models(payload: dict):
+    ids = payload.get("ids", [])
+    if not ids:
+        raise HTTPException(status_code=400, detail="No models selected")
+    conn = get_db_conn()
+    cur = conn.cursor()
+    paths = folder_paths(cur)
+    rows = []
+    for batch in db.batches(ids):
+        sql, params = db.in_list(batch)
+        rows.extend(cur.execute(f"SELECT * FROM models WHERE id {sql}", params).fetchall())
+    conn.close()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Models not found")
+    flat = payload.get("flat", False)
+    return zip_response(
+        export_entries(rows, {} if flat else paths, None),
+        payload.get("name") or "stlvault-export",
+    )
+
+
+@app.post("/api/models/inspect")
+def inspect_models(payload: dict):
+    """(Re)read 3MF metadata for the given ids, or for every 3MF model that
+    has none yet. Thumbnails are only filled in where missing."""
+    ids = payload.get("ids")
+    conn = get_db_conn()
+    cur = conn.cursor()
+    if ids:
+        rows = [
+            r for mid in ids
+            for r in cur.execute("SELECT id,thumbnail FROM models WHERE id=?", (mid,))
+        ]
+    else:
+        rows = cur.execute(
+            "SELECT id,thumbnail FROM models WHERE plates IS NULL"
+        ).fetchall()
+    files = model_file_index()
+    updated = 0
+    for row in rows:
+        stored = files.get(row["id"])
+        if not stored or not is_3mf(stored):
+            continue
+        info = threemf.inspect_3mf(
+            os.path.join(UPLOAD_DIR, stored), with_thumbnail=not row["thumbnail"]
+        )
+        if info is None:
+            continue
+        set_print_info(cur, row["id"], info)
+        if info["thumbnail"] and not row["thumbnail"]:
+            cur.execute(
+                "UPDATE models SET thumbnail=? WHERE id=?", (info["thumbnail"], row["id"])
+            )
+        cur.execute("UPDATE models SET updatedAt=? WHERE id=?", (now_ms(), row["id"]))
+        updated += 1
+    if updated:
+        bump_library_version(cur)
+    conn.commit()
+    conn.close()
+    return {"updated": updated}
+
+
+# --- Background workers ---
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(name: str, workers: int) -> ThreadPoolExecutor:
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = ThreadPoolExecutor(workers, thread_name_prefix=name)
+        return _pools[name]
+
+
+def worker_pool() -> ThreadPoolExecutor:
+    """Threads for file placement and extraction during ingest."""
+    return _pool("worker", INGEST_WORKERS)
+
+
+def fingerprint_pool() -> ThreadPoolExecutor:
+    # separate and small so a backlog of signatures never delays ingest
+    return _pool("fingerprint", FINGERPRINT_WORKERS)
+
+
+def step_pool() -> ThreadPoolExecutor:
+    # each thread waits on one tessellation child process
+    return _pool("step", STEP_WORKERS)
+
+
+def import_options_pool() -> ThreadPoolExecutor:
+    # upstream requests are paced per host in importers.common
+    return _pool("import-options", IMPORT_OPTIONS_WORKERS)
+
+
+# --- Version history ---
+def file_signature(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def hash_model_file(model_id: str) -> Optional[Tuple[str, Tuple[int, int], str]]:
+    """(path, signature, sha256) of the model's current file, or None."""
+    with metrics.file_scan("replace"):
+        old = sorted(f for f in os.listdir(UPLOAD_DIR) if f.startswith(model_id))
+    if not old:
+        return None
+    path = os.path.join(UPLOAD_DIR, old[0])
+    try:
+        signature = file_signature(path)
+        return path, signature, dropwatch.file_sha256(path)
+    except OSError:
+        return None
+
+
+def swap_model_file(conn: sqlite3.Connection, model_id: str, src: str, ext: str,
+                    size: int, digest: str, thumbnail: Optional[str],
+                    info: Optional[Dict[str, Any]]) -> str:
+    """Make `src` the model's file and keep the file it replaces as the
+    next entry of its version history. Returns the new path.
+
+    Runs in one write transaction, which also keeps the version collector
+    out; the old file is renamed into VERSION_DIR, never copied.
+    """
+    path = os.path.join(UPLOAD_DIR, f"{model_id}{ext}")
+    cur = conn.cursor()
+    # rows from before hashes were stored: hash the current file now, not
+    # while holding the write lock, which would stall every other writer
+    hashed = None
+    m = cur.execute("SELECT hash FROM models WHERE id=?", (model_id,)).fetchone()
+    if m is not None and not m["hash"]:
+        hashed = hash_model_file(model_id)
+    cur.execute("BEGIN IMMEDIATE")
+    archived = False
+    old_path = None
+    try:
+        # re-read under the lock in case another replace got in first
+        m = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
+        if not m:
+            raise HTTPException(status_code=404, detail="Model not found")
+        with metrics.file_scan("replace"):
+            old = sorted(f for f in os.listdir(UPLOAD_DIR) if f.startswith(model_id))
+        old_path = os.path.join(UPLOAD_DIR, old[0]) if old else None
+        old_hash = m["hash"]
+        if old_path and not old_hash:
+            if hashed and hashed[0] == old_path and hashed[1] == file_signature(old_path):
+                old_hash = hashed[2]
+            else:
+                # changed since it was hashed; rare, so hash it again here
+                old_hash = dropwatch.file_sha256(old_path)
+        current = m["version"] or 1
+        if old_path:
+            since = cur.execute(
+                "SELECT MAX(archivedAt) FROM model_versions WHERE modelId=?", (model_id,)
+            ).fetchone()[0]
+            cur.execute(
+                "INSERT INTO model_versions(modelId,version,hash,size,ext,name,"
+                "thumbnail,createdAt,archivedAt) VALUES (?,?,?,?,?,?,?,?,?) "
+                "ON CONFLICT(modelId,version) DO UPDATE SET hash=excluded.hash, "
+                "size=excluded.size, ext=excluded.ext, name=excluded.name, "
+                "thumbnail=excluded.thumbnail, createdAt=excluded.createdAt, "
+                "archivedAt=excluded.archivedAt",
+                (model_id, current, old_hash, os.path.getsize(old_path),
+                 os.path.splitext(old[0])[1], m["name"], m["thumbnail"],
+                 since or m["dateAdded"], now_ms()),
+            )
+        set_print_info(cur, model_id, info)
+        cur.execute(
+            "UPDATE models SET url=?, size=?, thumbnail=?, updatedAt=?, hash=?, version=?, "
+            "sizeX=NULL, sizeY=NULL, sizeZ=NULL WHERE id=?",
+            (f"/api/models/{model_id}/download", size, thumbnail, now_ms(), digest,
+             current + 1, model_id),
+        )
+        cur.execute("DELETE FROM fingerprints WHERE modelId=?", (model_id,))
+        cur.execute("DELETE FROM meshes WHERE modelId=?", (model_id,))
+        bump_library_version(cur)
+        if old_path:
+            versions.archive(str(VERSION_DIR), old_path, old_hash)
+            archived = True
+        for extra in old[1:]:
+            remove_file(os.path.join(UPLOAD_DIR, extra))
+        remove_file(MESH_DIR / f"{model_id}.stl")
+        os.replace(src, path)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        if archived and not os.path.exists(old_path):
+            versions.materialize(str(VERSION_DIR), old_hash, old_path)
+        raise
+    return path
+
+
+def get_version_row(cur, model_id: str, version: int) -> sqlite3.Row:
+    row = cur.execute(
+        "SELECT * FROM model_versions WHERE modelId=? AND version=?", (model_id, version)
+    ).fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return row
+
+
+@app.get("/api/models/{model_id}/versions")
+def list_model_versions(model_id: str):
+    conn = get_db_conn()
+    cur = conn.cursor()
+    m = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
+    if not m:
+        conn.close()
+        raise HTTPException(status_code=404, detail="Model not found")
+    rows = cur.execute(
+        "SELECT * FROM model_versions WHERE modelId=? ORDER BY version DESC", (model_id,)
+    ).fetchall()
+    conn.close()
+    return {
+        "current": {
+            "version": m["version"] or 1,
+            "size": m["size"],
+            "hash": m["hash"],
+            "updatedAt": m["updatedAt"],
+        },
+        "versions": [versions.row_to_version(r) for r in rows],
+        "keep": VERSION_KEEP,
+        "maxAgeDays": VERSION_MAX_AGE_DAYS,
+    }
+
+
+@app.get("/api/models/{model_id}/versions/{version}/download")
+def download_model_version(model_id: str, version: int):
+    conn = get_db_conn()
+    row = get_version_row(conn.cursor(), model_id, version)
+    conn.close()
+    path = versions.blob_path(str(VERSION_DIR), row["hash"])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    stem = os.path.splitext(row["name"] or model_id)[0]
+    return send_file(
+        path,
+        media_type="application/octet-stream",
+        filename=f"{stem}-v{version}{row['ext'] or ''}",
+    )
+
+
+@app.post("/api/models/{model_id}/versions/{version}/restore")
+def restore_model_version(model_id: str, version: int):
+    """Make an earlier version current again. The file it replaces becomes
+    a new version itself, so a restore can be undone the same way."""
+    conn = get_db_conn()
+    cur = conn.cursor()
+    m = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
+    if not m:
+        conn.close()
+        raise HTTPException(status_code=404, detail="Model not found")
+    row = get_version_row(cur, model_id, version)
+    if not os.path.exists(versions.blob_path(str(VERSION_DIR), row["hash"])):
+        conn.close()
+        raise HTTPException(status_code=404, detail="File not found")
+    ext = row["ext"] or ".stl"
+    tmp = os.path.join(UPLOAD_DIR, f".{model_id}.{uuid.uuid4().hex[:8]}.upload")
+    try:
+        versions.materialize(str(VERSION_DIR), row["hash"], tmp)
+        info = threemf.inspect_3mf(tmp, with_thumbnail=not row["thumbnail"]) if is_3mf(ext) else None
+        thumbnail = row["thumbnail"] or (info["thumbnail"] if info else None)
+        path = swap_model_file(conn, model_id, tmp, ext, row["size"], row["hash"], thumbnail, info)
+    except Exception:
+        conn.close()
+        raise
+    finally:
+        remove_file(tmp)
+    updated = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
+    conn.close()
+    process_new_files([(model_id, path)])
+    return row_to_model(updated)
+
+
+@app.delete("/api/models/{model_id}/versions/{version}")
+def delete_model_version(model_id: str, version: int):
+    conn = get_db_conn()
+    cur = conn.cursor()
+    get_version_row(cur, model_id, version)
+    # the blob goes with the next collection if nothing else refers to it
+    cur.execute(
+        "DELETE FROM model_versions WHERE modelId=? AND version=?", (model_id, version)
+    )
+    conn.commit()
+    conn.close()
+    return {"ok": True}
+
+
+def collect_versions() -> Dict[str, int]:
+    """Apply the retention limits, then free blobs nothing refers to."""
+    conn = get_db_conn()
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        pruned = versions.prune(cur, VERSION_KEEP, VERSION_MAX_AGE_DAYS, now_ms())
+        blobs, freed = versions.collect_garbage(cur, str(VERSION_DIR))
+        conn.commit()
+    finally:
+        conn.close()
+    if pruned or blobs:
+        log.info("version history: %d versions expired, %d blobs (%d bytes) freed",
+                 pruned, blobs, freed)
+    return {"expired": pruned, "blobs": blobs, "freedBytes": freed}
+
+
+# --- Grid thumbnails ---
+class ThumbnailBatch(BaseModel):
+    ids: List[str]
+    size: int = THUMBNAIL_GRID_SIZE
+
+
+def cached_thumbnails(cur: sqlite3.Cursor, ids: List[str], size: int) -> Dict[str, Tuple[str, bytes, int]]:
+    """id -> (type, bytes, updatedAt) for the models in `ids` that have a
+    thumbnail, encoding and caching the ones that changed since they were
+    last encoded at `size`. At most THUMBNAIL_BATCH_MAX ids; the caller
+    commits."""
+    found: Dict[str, Tuple[str, bytes, int]] = {}
+    stale: List[str] = []
+    match, params = db.in_list(ids)
+    for r in cur.execute(
+        "SELECT m.id, COALESCE(m.updatedAt, 0) AS updatedAt, c.updatedAt AS cachedAt, "
+        "c.type, c.data FROM models m "
+        "LEFT JOIN thumbnail_cache c ON c.modelId=m.id AND c.size=? "
+        f"WHERE m.id {match} AND m.thumbnail IS NOT NULL AND m.thumbnail != ''",
+        (size, *params),
+    ).fetchall():
+        if r["cachedAt"] == r["updatedAt"]:
+            found[r["id"]] = (r["type"], r["data"], r["updatedAt"])
+        else:
+            stale.append(r["id"])
+    if not stale:
+        return found
+    encoded = []
+    match, params = db.in_list(stale)
+    for r in cur.execute(
+        f"SELECT id, COALESCE(updatedAt, 0) AS updatedAt, thumbnail FROM models WHERE id {match}",
+        params,
+    ).fetchall():
+        decoded = thumbnails.decode_data_url(r["thumbnail"])
+        if decoded is None:
+            continue
+        mime, data = thumbnails.encode(decoded[1], decoded[0], size)
+        found[r["id"]] = (mime, data, r["updatedAt"])
+        encoded.append((r["id"], size, r["updatedAt"], mime, data))
+    cur.executemany(
+        "INSERT INTO thumbnail_cache(modelId,size,updatedAt,type,data) VALUES (?,?,?,?,?) "
+        "ON CONFLICT(modelId,size) DO UPDATE SET updatedAt=excluded.updatedAt, "
+        "type=excluded.type, data=excluded.data",
+        encoded,
+    )
+    return found
+
+
+@app.post("/api/thumbnails")
+def get_thumbnails(batch: ThumbnailBatch):
+    """Thumbnails of many models in one response, packed as described in
+    thumbnails.py. `size` is rounded up to one of thumbnails.SIZES."""
+    ids = list(dict.fromkeys(batch.ids))
+    if len(ids) > THUMBNAIL_BATCH_MAX:
+        raise HTTPException(
+            status_code=400, detail=f"At most {THUMBNAIL_BATCH_MAX} ids per request"
+        )
+    size = thumbnails.snap_size(batch.size)
+    conn = get_db_conn()
+    try:
+        found = cached_thumbnails(conn.cursor(), ids, size)
+        conn.commit()
+    finally:
+        conn.close()
+    body = thumbnails.pack(
+        ((i, *found[i]) for i in ids if i in found),
+        [i for i in ids if i not in found],
+    )
+    return Response(content=body, media_type=thumbnails.MEDIA_TYPE)
+
+
+def warm_thumbnails() -> int:
+    """Encode grid thumbnails ahead of the first request for them, a batch
+    per housekeeping pass, and drop the cache of deleted models."""
+    conn = get_db_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "DELETE FROM thumbnail_cache WHERE modelId NOT IN (SELECT id FROM models)"
+        )
+        size = thumbnails.snap_size(THUMBNAIL_GRID_SIZE)
+        ids = [
+            r["id"]
+            for r in cur.execute(
+                "SELECT m.id FROM models m LEFT JOIN thumbnail_cache c "
+                "ON c.modelId=m.id AND c.size=? "
+                "WHERE m.thumbnail IS NOT NULL AND m.thumbnail != '' "
+                "AND (c.updatedAt IS NULL OR c.updatedAt != COALESCE(m.updatedAt, 0)) "
+                "LIMIT ?",
+                (size, THUMBNAIL_BATCH_MAX),
+            )
+        ]
+        if ids:
+            cached_thumbnails(cur, ids, size)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(ids)
+
+
+# --- Shape fingerprints ---
+_fingerprint_index: Optional["fingerprint.FingerprintIndex"] = None
+_fingerprint_key: Optional[tuple] = None
+_fingerprint_lock = threading.Lock()
+
+
+def store_fingerprint(cur, model_id: str, result):
+    import fingerprint
+
+    vec, triangles, area = result if result else (None, None, None)
+    cur.execute(
+        "INSERT INTO fingerprints(modelId,version,vector,triangles,area,computedAt) "
+        "VALUES (?,?,?,?,?,?) ON CONFLICT(modelId) DO UPDATE SET "
+        "version=excluded.version, vector=excluded.vector, triangles=excluded.triangles, "
+        "area=excluded.area, computedAt=excluded.computedAt",
+        (
+            model_id,
+            fingerprint.SIGNATURE_VERSION,
+            fingerprint.to_blob(vec) if vec is not None else None,
+            triangles,
+            area,
+            now_ms(),
+        ),
+    )
+
+
+def fingerprint_models(items: List[Tuple[str, str]]):
+    import fingerprint
+
+    results = []
+    for model_id, path in items:
         try:
-            path.unlink()
+            results.append((model_id, path, fingerprint.compute(path)))
         except Exception:
+            results.append((model_id, path, None))
+    # one short write transaction per chunk, so bursts don't contend with ingest
+    conn = get_db_conn()
+    cur = conn.cursor()
+    for model_id, path, result in results:
+        # the file may have been replaced or deleted while we were reading it
+        if not os.path.exists(path):
+            continue
+        if cur.execute("SELECT 1 FROM models WHERE id=?", (model_id,)).fetchone():
+            store_fingerprint(cur, model_id, result)
+    conn.commit()
+    conn.close()
+
+
+def schedule_fingerprints(items: List[Tuple[str, str]]):
+    """Compute shape signatures for (model id, path) pairs on the worker pool."""
+    chunk = max(1, min(FINGERPRINT_CHUNK_SIZE, -(-len(items) // FINGERPRINT_WORKERS)))
+    for i in range(0, len(items), chunk):
+        fingerprint_pool().submit(fingerprint_models, items[i:i + chunk])
+
+
+def fingerprint_source(model_id: str, stored: str) -> str:
+    """File to fingerprint: the model, or the cached mesh of a STEP model."""
+    if is_step(stored):
+        return str(MESH_DIR / f"{model_id}.stl")
+    return os.path.join(UPLOAD_DIR, stored)
+
+
+def process_new_files(items: List[Tuple[str, str]]):
+    """Background work for newly stored (model id, path) files: STEP models
+    are tessellated first and fingerprinted from their mesh."""
+    schedule_meshes([i for i in items if is_step(i[1])])
+    schedule_fingerprints([i for i in items if not is_step(i[1])])
+
+
+def fingerprint_index(cur) -> "fingerprint.FingerprintIndex":
+    """Every current signature as one matrix, rebuilt only when the library
+    or the fingerprints table has changed."""
+    import fingerprint
+
+    global _fingerprint_index, _fingerprint_key
+    count, latest = cur.execute(
+        "SELECT COUNT(*), MAX(computedAt) FROM fingerprints"
+    ).fetchone()
+    key = (get_library_version(cur), count, latest)
+    with _fingerprint_lock:
+        if _fingerprint_index is None or key != _fingerprint_key:
+            rows = cur.execute(
+                "SELECT f.modelId, f.vector FROM fingerprints f JOIN models m ON m.id=f.modelId "
+                "WHERE f.vector IS NOT NULL AND f.version=?",
+                (fingerprint.SIGNATURE_VERSION,),
+            ).fetchall()
+            vectors = fingerprint.from_blob(b"".join(r[1] for r in rows))
+            _fingerprint_index = fingerprint.FingerprintIndex(
+                [r[0] for r in rows], vectors.reshape(len(rows), -1) if rows else vectors
+            )
+            _fingerprint_key = key
+        return _fingerprint_index
+
+
+def model_rows_by_id(cur, ids: List[str]) -> Dict[str, sqlite3.Row]:
+    found: Dict[str, sqlite3.Row] = {}
+    for chunk in db.batches(ids):
+        match, params = db.in_list(chunk)
+        for row in cur.execute(f"SELECT * FROM models WHERE id {match}", params):
+            found[row["id"]] = row
+    return found
+
+
+@app.post("/api/models/fingerprints")
+def compute_fingerprints(payload: dict):
+    """Queue signatures for the given ids, or for every model without a
+    current one. Returns immediately; results land as workers finish."""
+    import fingerprint
+
+    ids = payload.get("ids")
+    conn = get_db_conn()
+    cur = conn.cursor()
+    if ids:
+        wanted = set(ids)
+    else:
+        wanted = {
+            r[0]
+            for r in cur.execute(
+                "SELECT m.id FROM models m LEFT JOIN fingerprints f ON f.modelId=m.id "
+                "WHERE f.modelId IS NULL OR f.version<>?",
+                (fingerprint.SIGNATURE_VERSION,),
+            )
+        }
+    conn.close()
+    files = model_file_index()
+    items = [(mid, fingerprint_source(mid, files[mid])) for mid in wanted if mid in files]
+    schedule_fingerprints(items)
+    return {"queued": len(items)}
+
+
+@app.get("/api/models/duplicates")
+def find_duplicates(threshold: float = DUPLICATE_THRESHOLD):
+    """Groups of byte-identical or near-identical models across the vault."""
+    import fingerprint
+
+    start = time.perf_counter()
+    conn = get_db_conn()
+    cur = conn.cursor()
+    index = fingerprint_index(cur)
+    ids = list(index.ids)
+    pos = dict(index.pos)
+    parent = list(range(len(ids)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    pairs = index.duplicate_pairs(threshold)
+    for i, j, _d in pairs:
+        union(i, j)
+    # identical bytes are duplicates even when no mesh could be read
+    same_hash: Dict[str, List[str]] = {}
+    for digest, mid in cur.execute(
+        "SELECT hash, id FROM models WHERE hash IN "
+        "(SELECT hash FROM models WHERE hash IS NOT NULL GROUP BY hash HAVING COUNT(*) > 1)"
+    ):
+        same_hash.setdefault(digest, []).append(mid)
+    for members in same_hash.values():
+        for mid in members:
+            if mid not in pos:
+                pos[mid] = len(ids)
+                ids.append(mid)
+                parent.append(len(parent))
+        for mid in members[1:]:
+            union(pos[members[0]], pos[mid])
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(ids)):
+        clusters.setdefault(find(i), []).append(i)
+    spread: Dict[int, float] = {}
+    for i, _j, d in pairs:
+        root = find(i)
+        spread[root] = max(spread.get(root, 0.0), d)
+    groups = sorted(
+        ((root, members) for root, members in clusters.items() if len(members) > 1),
+        key=lambda g: len(g[1]),
+        reverse=True,
+    )
+    rows = model_rows_by_id(cur, [ids[i] for _root, members in groups for i in members])
+    pending = cur.execute(
+        "SELECT COUNT(*) FROM models m LEFT JOIN fingerprints f ON f.modelId=m.id "
+        "WHERE f.modelId IS NULL OR f.version<>?",
+        (fingerprint.SIGNATURE_VERSION,),
+    ).fetchone()[0]
+    conn.close()
+
+    report = []
+    for root, members in groups:
+        group_rows = [rows[ids[i]] for i in members if ids[i] in rows]
+        if len(group_rows) < 2:
+            continue
+        hashes = {r["hash"] for r in group_rows}
+        report.append({
+            "exact": len(hashes) == 1 and None not in hashes,
+            "distance": round(spread.get(root, 0.0), 4),
+            "models": [row_to_model(r) for r in group_rows],
+        })
+    return ORJSONResponse({
+        "groups": report,
+        "threshold": threshold,
+        "fingerprinted": len(index),
+        "pending": pending,
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 1),
+    })
+
+
+@app.get("/api/models/{model_id}/similar")
+def similar_models(model_id: str, limit: int = 10, maxDistance: Optional[float] = None):
+    """Nearest models by shape signature, closest first."""
+    import fingerprint
+
+    conn = get_db_conn()
+    cur = conn.cursor()
+    if not cur.execute("SELECT 1 FROM models WHERE id=?", (model_id,)).fetchone():
+        conn.close()
+        raise HTTPException(status_code=404, detail="Model not found")
+    row = cur.execute(
+        "SELECT vector FROM fingerprints WHERE modelId=? AND version=?",
+        (model_id, fingerprint.SIGNATURE_VERSION),
+    ).fetchone()
+    if row is None:
+        # not computed yet: do it now rather than make the caller poll
+        stored = model_file_index().get(model_id)
+        result = fingerprint.compute(fingerprint_source(model_id, stored)) if stored else None
+        store_fingerprint(cur, model_id, result)
+        conn.commit()
+        found = result is not None
+    else:
+        found = row["vector"] is not None
+    if not found:
+        conn.close()
+        raise HTTPException(status_code=400, detail="Model has no readable mesh")
+    matches = fingerprint_index(cur).similar(
+        model_id, max(1, min(limit, 100)), maxDistance
+    )
+    rows = model_rows_by_id(cur, [mid for mid, _d in matches])
+    conn.close()
+    return [
+        {"model": row_to_model(rows[mid]), "distance": round(d, 4)}
+        for mid, d in matches
+        if mid in rows
+    ]
+
+
+# --- STEP meshes ---
+def schedule_meshes(items: List[Tuple[str, str]], retry: bool = False):
+    """Tessellate STEP models given as (model id, path) on the step pool.
+    Models already meshed (or failed, unless `retry`) or being meshed by a
+    live process are skipped."""
+    if not items or not stepmesh.available():
+        return
+    conn = get_db_conn()
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    live = coordinator.live_workers(cur)
+    claimed = []
+    for model_id, path in items:
+        row = cur.execute("SELECT status, owner FROM meshes WHERE modelId=?", (model_id,)).fetchone()
+        if row and (row["status"] == "ready" or (row["status"] == "failed" and not retry)):
+            continue
+        if row and row["status"] in ("queued", "running") and row["owner"] in live:
+            continue
+        cur.execute(
+            "INSERT INTO meshes(modelId,status,owner,updatedAt) VALUES (?,?,?,?) "
+            "ON CONFLICT(modelId) DO UPDATE SET status=excluded.status, owner=excluded.owner, "
+            "error=NULL, updatedAt=excluded.updatedAt",
+            (model_id, "queued", coordination.INSTANCE_ID, now_ms()),
+        )
+        claimed.append((model_id, path))
+    conn.commit()
+    conn.close()
+    for model_id, path in claimed:
+        step_pool().submit(mesh_model, model_id, path)
+
+
+def mesh_model(model_id: str, path: str):
+    def set_status(**fields):
+        conn = get_db_conn()
+        sets = ", ".join(f"{k}=?" for k in fields)
+        conn.execute(
+            f"UPDATE meshes SET {sets}, updatedAt=? WHERE modelId=?",
+            (*fields.values(), now_ms(), model_id),
+        )
+        conn.commit()
+        conn.close()
+
+    dest = MESH_DIR / f"{model_id}.stl"
+    try:
+        before = os.stat(path)
+    except OSError:
+        set_status(status="failed", error="model file is missing")
+        return
+    set_status(status="running")
+    MESH_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        result = stepmesh.mesh_step(path, str(dest), STEP_TIMEOUT_SECONDS, STEP_MEMORY_MB)
+    except Exception as e:
+        log.warning("could not tessellate %s: %s", model_id, e)
+        set_status(status="failed", error=str(e))
+        return
+
+    conn = get_db_conn()
+    cur = conn.cursor()
+    try:
+        after = os.stat(path)
+    except OSError:
+        after = None
+    exists = cur.execute("SELECT 1 FROM models WHERE id=?", (model_id,)).fetchone()
+    if not exists or after is None or (after.st_size, after.st_mtime_ns) != (
+        before.st_size, before.st_mtime_ns
+    ):
+        # deleted or replaced while we worked; the replacement has its own job
+        conn.close()
+        remove_file(dest)
+        return
+    x, y, z = result["size"]
+    cur.execute(
+        "UPDATE meshes SET status='ready', triangles=?, seconds=?, error=NULL, updatedAt=? "
+        "WHERE modelId=?",
+        (result["triangles"], result["seconds"], now_ms(), model_id),
+    )
+    cur.execute(
+        "UPDATE models SET sizeX=?, sizeY=?, sizeZ=?, updatedAt=?, "
+        "thumbnail=COALESCE(NULLIF(thumbnail,''), ?) WHERE id=?",
+        (x, y, z, now_ms(), result["thumbnail"], model_id),
+    )
+    bump_library_version(cur)
+    conn.commit()
+    conn.close()
+    schedule_fingerprints([(model_id, str(dest))])
+
+
+@app.post("/api/models/meshes")
+def compute_meshes(payload: dict):
+    """Queue tessellation for the given STEP ids, or for every STEP model
+    without a mesh. Failed ones are retried."""
+    ids = payload.get("ids")
+    files = model_file_index()
+    conn = get_db_conn()
+    if ids:
+        wanted = [mid for mid in ids if mid in files]
+    else:
+        done = {r[0] for r in conn.execute("SELECT modelId FROM meshes WHERE status='ready'")}
+        wanted = [r[0] for r in conn.execute("SELECT id FROM models") if r[0] not in done]
+    conn.close()
+    items = [(mid, os.path.join(UPLOAD_DIR, files[mid])) for mid in wanted
+             if mid in files and is_step(files[mid])]
+    schedule_meshes(items, retry=True)
+    return {"queued": len(items), "available": stepmesh.available()}
+
+
+@app.get("/api/models/{model_id}/mesh")
+def get_model_mesh(model_id: str):
+    """The tessellated mesh of a STEP model as binary STL. 202 while it is
+    queued or running (the job is started if there is none), 422 if the
+    file could not be tessellated."""
+    conn = get_db_conn()
+    model = conn.execute("SELECT name FROM models WHERE id=?", (model_id,)).fetchone()
+    row = conn.execute("SELECT * FROM meshes WHERE modelId=?", (model_id,)).fetchone()
+    conn.close()
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    dest = MESH_DIR / f"{model_id}.stl"
+    if row and row["status"] == "ready" and dest.exists():
+        return send_file(
+            dest,
+            media_type="model/stl",
+            filename=f"{os.path.splitext(model['name'])[0]}.stl",
+            headers={"Cache-Control": "no-cache"},
+        )
+    if row and row["status"] == "failed":
+        raise HTTPException(status_code=422, detail=row["error"] or "Tessellation failed")
+    with metrics.file_scan("mesh"):
+        stored = next((f for f in os.listdir(UPLOAD_DIR) if f.startswith(model_id)), None)
+    if not stored:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not is_step(stored):
+        raise HTTPException(status_code=400, detail="Model is not a STEP file")
+    if not stepmesh.available():
+        raise HTTPException(status_code=501, detail="STEP tessellation is not installed")
+    # ready but the cache is gone: make it again
+    schedule_meshes([(model_id, os.path.join(UPLOAD_DIR, stored))], retry=True)
+    return ORJSONResponse(
+        {"status": row["status"] if row and row["status"] != "ready" else "queued"},
+        status_code=202,
+        headers={"Retry-After": "2"},
+    )
+
+
+# --- Archive ingest ---
+def ensure_folder_path(cur, parent_id: Optional[str], names: List[str], cache: Dict):
+    """Folder id for parent/names..., reusing same-named folders so re-ingesting
+    an archive merges into the existing tree."""
+    key = (parent_id,)
+    fid = parent_id
+    for name in names:
+        key = key + (name,)
+        if key in cache:
+            fid = cache[key]
+            continue
+        row = cur.execute(
+            "SELECT id FROM folders WHERE name=? AND parentId IS ?", (name, fid)
+        ).fetchone()
+        if row:
+            fid = row["id"]
+        else:
+            new_id = str(uuid.uuid4())
+            cur.execute(
+                "INSERT INTO folders(id,name,parentId,updatedAt) VALUES (?,?,?,?)",
+                (new_id, name, fid, now_ms()),
+            )
+            fid = new_id
+        cache[key] = fid
+    return fid
+
+
+def update_ingest_job(cur, job_id: str, **fields):
+    fields["updatedAt"] = now_ms()
+    sets = ", ".join(f"{k}=?" for k in fields)
+    cur.execute(f"UPDATE ingest_jobs SET {sets} WHERE id=?", (*fields.values(), job_id))
+
+
+def run_ingest(job_id: str, archive_path: str, kind: str, container: str,
+               parent_id: Optional[str], extra_tags: List[str]):
+    conn = get_db_conn()
+    cur = conn.cursor()
+    folder_cache: Dict = {}
+    pending: List[tuple] = []
+    fresh: List[tuple] = []
+    # every planned (model id, dest), and the ids whose rows are committed
+    planned_files: List[Tuple[str, str]] = []
+    committed: set = set()
+    futures: Dict = {}
+    errors: List[str] = []
+    counts = {"processed": 0, "failed": 0, "bytes": 0}
+
+    def extract(member: str, dest: str):
+        size, digest = archive_ingest.extract_zip_member(archive_path, member, dest)
+        return size, digest, threemf.inspect_3mf(dest) if is_3mf(dest) else None
+
+    def plan(member: str):
+        """(model id, dest path, folder id, name, tags) or None to skip."""
+        split = archive_ingest.split_member(member)
+        if split is None:
+            return None
+        dirs, name = split
+        if root_dir and dirs and dirs[0] == root_dir:
+            dirs = dirs[1:]
+        folder_id = ensure_folder_path(cur, parent_id, [container] + dirs, folder_cache)
+        if conn.in_transaction:
+            # new folders: commit now rather than hold the write lock while copying
+            bump_library_version(cur)
+            conn.commit()
+        mid = str(uuid.uuid4())
+        dest = os.path.join(UPLOAD_DIR, f"{mid}{os.path.splitext(name)[1].lower()}")
+        tags = list(dict.fromkeys([d.lower() for d in dirs] + extra_tags))
+        planned_files.append((mid, dest))
+        return mid, dest, folder_id, name, tags
+
+    def record(planned, result=None, error=None):
+        mid, dest, folder_id, name, tags = planned
+        if error is not None:
+            counts["failed"] += 1
+            if len(errors) < 50:
+                errors.append(f"{name}: {error}")
+            if os.path.exists(dest):
+                os.remove(dest)
+            return
+        size, digest, info = result
+        ts = now_ms()
+        pending.append(
+            (mid, name, folder_id, f"/api/models/{mid}/download", size, ts,
+             json.dumps(tags), "", info["thumbnail"] if info else None, ts, digest,
+             *print_info_values(info))
+        )
+        fresh.append((mid, dest))
+        counts["processed"] += 1
+        counts["bytes"] += size
+
+    def flush_if_full():
+        # outside the per-member try: a failed flush fails the job, it
+        # doesn't mark a member whose row is still pending as failed
+        if len(pending) >= INGEST_BATCH_SIZE:
+            flush()
+
+    def flush():
+        if pending:
+            cur.executemany(
+                "INSERT INTO models(id,name,folderId,url,size,dateAdded,tags,description,thumbnail,updatedAt,hash,"
+                "plates,printTime,filamentGrams,filamentTypes,printerModel,objects,printMeta) "
+                "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                pending,
+            )
+            pending.clear()
+        bump_library_version(cur)
+        update_ingest_job(cur, job_id, errors=json.dumps(errors), **counts)
+        conn.commit()
+        committed.update(mid for mid, _ in fresh)
+        done = fresh[:]
+        fresh.clear()
+        process_new_files(done)
+
+    root_dir = None
+    try:
+        if kind == "zip":
+            members = [
+                m for m in archive_ingest.zip_members(archive_path)
+                if archive_ingest.split_member(m)
+            ]
+            root_dir = archive_ingest.common_root(
+                [archive_ingest.split_member(m)[0] for m in members]
+            )
+            if root_dir is not None:
+                container = root_dir
+            plans = [(m, plan(m)) for m in members]
+            update_ingest_job(cur, job_id, status="running", total=len(plans))
+            conn.commit()
+            futures.update(
+                (worker_pool().submit(extract, member, p[1]), p) for member, p in plans
+            )
+            for future in as_completed(futures):
+                try:
+                    record(futures[future], result=future.result())
+                except Exception as e:
+                    record(futures[future], error=e)
+                flush_if_full()
+        else:
+            # tar is read in one pass; its directory only wraps the tree when
+            # it is named like the archive
+            root_dir = container
+            update_ingest_job(cur, job_id, status="running")
+            conn.commit()
+            for member, src in archive_ingest.tar_members(archive_path):
+                planned = plan(member)
+                if planned is None:
+                    continue
+                try:
+                    size, digest = archive_ingest.copy_hashed(src, planned[1])
+                    info = threemf.inspect_3mf(planned[1]) if is_3mf(planned[1]) else None
+                    record(planned, result=(size, digest, info))
+                except Exception as e:
+                    record(planned, error=e)
+                flush_if_full()
+        flush()
+        update_ingest_job(
+            cur, job_id, status="done", total=counts["processed"] + counts["failed"]
+        )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        # let running extractions finish, then drop every file without a row
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        for mid, dest in planned_files:
+            if mid not in committed:
+                remove_file(dest)
+        errors.append(str(e))
+        update_ingest_job(
+            cur, job_id, status="failed", errors=json.dumps(errors), **counts
+        )
+        conn.commit()
+    finally:
+        conn.close()
+        if kind == "zip":
+            archive_ingest.release_zip(archive_path)
+        try:
+            os.remove(archive_path)
+        except OSError:
             pass
 
-    cur.execute("UPDATE models SET manual=NULL WHERE id=?", (model_id,))
+
+def row_to_ingest_job(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "filename": row["filename"],
+        "folderId": row["folderId"],
+        "status": row["status"],
+        "total": row["total"],
+        "processed": row["processed"],
+        "failed": row["failed"],
+        "bytes": row["bytes"],
+        "errors": json.loads(row["errors"]) if row["errors"] else [],
+        "createdAt": row["createdAt"],
+        "updatedAt": row["updatedAt"],
+    }
+
+
+@app.post("/api/models/ingest", status_code=202)
+def ingest_archive(
+    file: UploadFile = File(...),
+    folderId: Optional[str] = Form(None),
+    tags: Optional[str] = Form(None),
+):
+    filename = file.filename or ""
+    kind = archive_ingest.archive_kind(filename)
+    if kind is None:
+        raise HTTPException(status_code=400, detail="Expected a .zip or .tar archive")
+
+    tag_list: List[str] = []
+    if tags:
+        try:
+            tag_list = json.loads(tags)
+        except Exception:
+            tag_list = [t.strip() for t in tags.split(",") if t.strip()]
+
+    job_id = str(uuid.uuid4())
+    INGEST_DIR.mkdir(parents=True, exist_ok=True)
+    archive_path = str(INGEST_DIR / f"{job_id}{'.zip' if kind == 'zip' else '.tar'}")
+    save_upload_file(file, archive_path)
+
+    container = filename
+    for suffix in (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".tar", ".zip"):
+        if container.lower().endswith(suffix):
+            container = container[: -len(suffix)]
+            break
+    parent_id = folderId if folderId and folderId != "all" else None
+
+    conn = get_db_conn()
+    ts = now_ms()
+    conn.execute(
+        "INSERT INTO ingest_jobs(id,filename,folderId,status,owner,createdAt,updatedAt) "
+        "VALUES (?,?,?,?,?,?,?)",
+        (job_id, filename, parent_id, "queued", coordination.INSTANCE_ID, ts, ts),
+    )
     conn.commit()
-    row = cur.execute("SELECT * FROM models WHERE id=?", (model_id,)).fetchone()
+    row = conn.execute("SELECT * FROM ingest_jobs WHERE id=?", (job_id,)).fetchone()
     conn.close()
-    return row_to_model(row)
+
+    threading.Thread(
+        target=run_ingest,
+        args=(job_id, archive_path, kind, container or "Imported", parent_id, tag_list),
+        name=f"ingest-{job_id[:8]}",
+        daemon=True,
+    ).start()
+    return row_to_ingest_job(row)
+
+
+@app.get("/api/models/ingest/{job_id}")
+def get_ingest_job(job_id: str):
+    conn = get_db_conn()
+    row = conn.execute("SELECT * FROM ingest_jobs WHERE id=?", (job_id,)).fetchone()
+    conn.close()
+    if not row:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return row_to_ingest_job(row)
+
+
+# --- Drop folders ---
+_drop_watcher: Optional[dropwatch.DropWatcher] = None
+
+
+def place_dropped(dropped: dropwatch.DroppedFile):
+    mid = str(uuid.uuid4())
+    dest = os.path.join(UPLOAD_DIR, f"{mid}{os.path.splitext(dropped.name)[1].lower()}")
+    try:
+        size, digest = dropwatch.place_file(dropped.path, dest, DROP_ACTION)
+    except Exception:
+        unplace_dropped(dropped, dest)
+        raise
+    info = threemf.inspect_3mf(dest) if is_3mf(dest) else None
+    return mid, dest, size, digest, info
+
+
+def unplace_dropped(dropped: dropwatch.DroppedFile, dest: str):
+    """Undo place_dropped for a file that did not get its row: put a moved
+    file back, so the watcher can try it again, or drop the copy/link."""
+    try:
+        if os.path.exists(dest) and not os.path.exists(dropped.path):
+            shutil.move(dest, dropped.path)
+        else:
+            remove_file(dest)
+    except OSError:
+        log.exception("could not return %s to %s", dest, dropped.path)
+
+
+def ingest_dropped(batch: List[dropwatch.DroppedFile]) -> List[dropwatch.DroppedFile]:
+    """Add one batch of settled drop-folder files in a single transaction.
+    Subdirectories become folders and tags, as with archive ingest. Returns
+    the files that could not be placed; if the transaction fails, every
+    file is put back and the error raised, and the watcher retries them."""
+    futures = [(f, worker_pool().submit(place_dropped, f)) for f in batch]
+    placed = []
+    failed = []
+    for dropped, future in futures:
+        try:
+            placed.append((dropped, *future.result()))
+        except Exception:
+            dropwatch.log.exception("could not ingest %s", dropped.path)
+            failed.append(dropped)
+    if not placed:
+        return failed
+    conn = get_db_conn()
+    cur = conn.cursor()
+    folder_cache: Dict = {}
+    try:
+        for dropped, mid, dest, size, digest, info in placed:
+            ts = now_ms()
+            model = {
+                "id": mid,
+                "name": dropped.name,
+                "folderId": ensure_folder_path(cur, dropped.root.folder_id, dropped.dirs, folder_cache),
+                "url": f"/api/models/{mid}/download",
+                "size": size,
+                "dateAdded": ts,
+                "tags": list(dict.fromkeys(d.lower() for d in dropped.dirs)),
+                "description": "",
+                "thumbnail": info["thumbnail"] if info else None,
+            }
+            insert_model(cur, model, digest, info)
+            cur.execute(
+                "INSERT INTO drop_files(path,size,mtimeNs,modelId,ingestedAt) VALUES (?,?,?,?,?) "
+                "ON CONFLICT(path) DO UPDATE SET size=excluded.size, mtimeNs=excluded.mtimeNs, "
+                "modelId=excluded.modelId, ingestedAt=excluded.ingestedAt",
+                (dropped.path, dropped.size, dropped.mtime_ns, mid, ts),
+            )
+        bump_library_version(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        for dropped, mid, dest, *_ in placed:
+            unplace_dropped(dropped, dest)
+        raise
+    finally:
+        conn.close()
+    process_new_files([(mid, dest) for _, mid, dest, *_ in placed])
+    return failed
+
+
+def start_drop_watcher():
+    global _drop_watcher
+    dirs = dropwatch.parse_drop_dirs(DROP_DIRS)
+    if not dirs or _drop_watcher is not None:
+        return
+    conn = get_db_conn()
+    seen = {
+        r["path"]: (r["size"], r["mtimeNs"])
+        for r in conn.execute("SELECT path,size,mtimeNs FROM drop_files")
+    }
+    conn.close()
+    _drop_watcher = dropwatch.DropWatcher(
+        dirs,
+        ingest_dropped,
+        settle=DROP_SETTLE_SECONDS,
+        poll_interval=DROP_POLL_INTERVAL,
+        batch_size=INGEST_BATCH_SIZE,
+        mode=DROP_WATCH,
+        seen=seen,
+    )
+    _drop_watcher.start()
+
+
+def stop_drop_watcher():
+    global _drop_watcher
+    if _drop_watcher is not None:
+        _drop_watcher.stop()
+        _drop_watcher = None
+
+
+@app.get("/api/drop-folders")
+def drop_folders():
+    dirs = dropwatch.parse_drop_dirs(DROP_DIRS)
+    if not dirs:
+        return {"enabled": False, "dirs": []}
+    # only the leader process watches; the others report the configuration
+    watcher = _drop_watcher
+    return {
+        "enabled": True,
+        "watching": watcher is not None,
+        "watch": ("inotify" if watcher.inotify_active else "poll") if watcher else None,
+        "action": DROP_ACTION,
+        "dirs": [{"path": d.path, "folderId": d.folder_id} for d in dirs],
+        "pending": watcher.pending_count if watcher else None,
+    }
+
+
+# --- Integrity scrub ---
+scrub = scrubber.Scrubber(
+    get_db_conn,
+    UPLOAD_DIR,
+    MANUAL_DIR,
+    io_budget=SCRUB_IO_MBPS * 1024 * 1024,
+    # only this process's requests; other workers' load isn't visible here
+    busy=lambda: metrics.in_flight() > 0,
+    max_yield=SCRUB_MAX_YIELD_MS / 1000,
+)
+
+
+def schedule_scrub(periodic: bool):
+    """Leader side of the scrub: start requested runs, resume one left
+    behind by a previous leader and, on `periodic` checks, start one every
+    SCRUB_INTERVAL_HOURS."""
+    if scrub.running:
+        return
+    state = scrub.state()
+    status = state.get("status")
+    if status == "requested":
+        scrub.start(state.get("verifyHashes", False))
+    elif status == "running":
+        scrub.start(SCRUB_VERIFY_HASHES, resume=True)
+    elif periodic and SCRUB_INTERVAL_HOURS > 0:
+        last = state.get("finishedAt") or state.get("startedAt") or 0
+        if now_ms() - last >= SCRUB_INTERVAL_HOURS * 3600 * 1000:
+            scrub.start(SCRUB_VERIFY_HASHES)
+
+
+@app.get("/api/scrub")
+def scrub_report(kind: Optional[str] = None, limit: int = 500):
+    conn = get_db_conn()
+    sql = "SELECT * FROM scrub_issues"
+    params: List[Any] = []
+    if kind:
+        sql += " WHERE kind=?"
+        params.append(kind)
+    sql += " ORDER BY kind, ref LIMIT ?"
+    params.append(limit)
+    issues = [
+        {
+            "kind": r["kind"],
+            "modelId": r["modelId"],
+            "path": r["path"],
+            "detail": r["detail"],
+            "bytes": r["bytes"],
+            "foundAt": r["foundAt"],
+        }
+        for r in conn.execute(sql, params)
+    ]
+    conn.close()
+    return {**scrub.status(), "items": issues}
+
+
+@app.post("/api/scrub", status_code=202)
+def start_scrub(payload: Optional[dict] = None):
+    payload = payload or {}
+    # any worker may take the request; the leader picks it up
+    if not scrub.request(bool(payload.get("verifyHashes", SCRUB_VERIFY_HASHES))):
+        raise HTTPException(status_code=409, detail="A scrub is already running")
+    _leader_wake.set()
+    return scrub.status()
+
+
+@app.post("/api/scrub/repair")
+def repair_scrub_issues(payload: dict):
+    """Fix reported issues of the given kinds. Orphaned files are moved to
+    UPLOAD_DIR/.quarantine unless "delete" is set; rows whose file is gone
+    are deleted. Every issue is re-checked first, and hash mismatches are
+    never touched (restore those from a backup)."""
+    kinds = [k for k in payload.get("kinds", []) if k in scrubber.KINDS]
+    dry_run = bool(payload.get("dryRun", False))
+    delete = bool(payload.get("delete", False))
+    quarantine = UPLOAD_DIR / ".quarantine" / time.strftime("%Y%m%d-%H%M%S")
+    conn = get_db_conn()
+    cur = conn.cursor()
+    fixed: Dict[str, int] = {}
+    match, params = db.in_list(kinds)
+    rows = cur.execute(
+        f"SELECT * FROM scrub_issues WHERE kind {match}", params
+    ).fetchall() if kinds else []
+    files = model_file_index()
+    listing_changed = False
+
+    for issue in rows:
+        kind = issue["kind"]
+        mid = issue["modelId"]
+        done = False
+        if kind in (scrubber.ORPHAN_FILE, scrubber.ORPHAN_MANUAL):
+            base = UPLOAD_DIR if kind == scrubber.ORPHAN_FILE else MANUAL_DIR
+            path = base / issue["path"]
+            owner = os.path.basename(issue["path"])[:36]
+            if issue["path"].startswith(".ingest/"):
+                # an archive is owned by its job while that is queued or running
+                owned = cur.execute(
+                    "SELECT 1 FROM ingest_jobs WHERE id=? AND status IN ('queued','running')",
+                    (owner,),
+                ).fetchone()
+            else:
+                owned = cur.execute("SELECT 1 FROM models WHERE id=?", (owner,)).fetchone()
+            if path.exists() and not owned:
+                done = True
+                if not dry_run:
+                    if delete:
+                        remove_file(path)
+                    else:
+                        quarantine.mkdir(parents=True, exist_ok=True)
+                        shutil.move(str(path), str(quarantine / path.name))
+        elif kind == scrubber.MISSING_FILE:
+            if mid not in files:
+                done = True
+                row = cur.execute("SELECT folderId FROM models WHERE id=?", (mid,)).fetchone()
+                if not dry_run and row is not None:
+                    cur.execute("DELETE FROM models WHERE id=?", (mid,))
+                    cur.execute("DELETE FROM fingerprints WHERE modelId=?", (mid,))
+                    cur.execute("DELETE FROM meshes WHERE modelId=?", (mid,))
+                    cur.execute("DELETE FROM model_versions WHERE modelId=?", (mid,))
+                    add_tombstone(cur, "model", mid, row["folderId"])
+                    listing_changed = True
+        elif kind == scrubber.MISSING_MANUAL:
+            if not (MANUAL_DIR / f"{mid}.md").exists():
+                done = True
+                if not dry_run:
+                    cur.execute(
+                        "UPDATE models SET manual=NULL, updatedAt=? WHERE id=?", (now_ms(), mid)
+                    )
+                    listing_changed = True
+        elif kind == scrubber.SIZE_MISMATCH:
+            stored = files.get(mid)
+            if stored:
+                done = True
+                if not dry_run:
+                    cur.execute(
+                        "UPDATE models SET size=?, updatedAt=? WHERE id=?",
+                        (os.path.getsize(UPLOAD_DIR / stored), now_ms(), mid),
+                    )
+                    listing_changed = True
+        elif kind == scrubber.UNHASHED:
+            done = True
+            if not dry_run:
+                cur.execute(
+                    "UPDATE models SET hash=? WHERE id=? AND hash IS NULL",
+                    (issue["detail"], mid),
+                )
+        if done:
+            fixed[kind] = fixed.get(kind, 0) + 1
+            if not dry_run:
+                cur.execute(
+                    "DELETE FROM scrub_issues WHERE kind=? AND ref=?", (kind, issue["ref"])
+                )
+    if listing_changed:
+        bump_library_version(cur)
+    conn.commit()
+    conn.close()
+    return {"dryRun": dry_run, "fixed": fixed}
+
+
+# --- Leader election ---
+# Every uvicorn worker and replica serves requests; the work that must happen
+# once per deployment (drop folders, scrubbing, housekeeping) runs only in the
+# process holding the leader lease.
+_leader_wake = threading.Event()
+_leader_stop = threading.Event()
+_leader_thread: Optional[threading.Thread] = None
+
+
+def housekeeping():
+    conn = get_db_conn()
+    cur = conn.cursor()
+    # jobs of a process that is gone will never finish
+    live = coordinator.live_workers(cur)
+    orphaned = [
+        r["id"]
+        for r in cur.execute(
+            "SELECT id, owner FROM ingest_jobs WHERE status IN ('queued','running')"
+        )
+        if r["owner"] not in live
+    ]
+    errors = json.dumps(["interrupted by server restart"])
+    cur.executemany(
+        "UPDATE ingest_jobs SET status='failed', errors=?, updatedAt=? WHERE id=?",
+        [(errors, now_ms(), job_id) for job_id in orphaned],
+    )
+    # drop old tombstones; delta requests older than this get a full listing
+    horizon = now_ms() - TOMBSTONE_RETENTION_DAYS * 86400 * 1000
+    if cur.execute("DELETE FROM tombstones WHERE deletedAt < ?", (horizon,)).rowcount:
+        cur.execute(
+            "INSERT INTO settings(key,value) VALUES ('tombstones_pruned_before',?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (str(horizon),),
+        )
+    conn.commit()
+    conn.close()
+    collect_versions()
+    warm_thumbnails()
+
+
+def leader_loop():
+    elected = time.monotonic()
+    last_housekeeping: Optional[float] = None
+    while not _leader_stop.is_set():
+        try:
+            now = time.monotonic()
+            periodic = last_housekeeping is None or now - last_housekeeping >= HOUSEKEEPING_INTERVAL
+            if periodic:
+                housekeeping()
+                last_housekeeping = now
+            # scheduled scrubs wait out the first minute after an election
+            schedule_scrub(periodic and now - elected >= HOUSEKEEPING_INTERVAL)
+        except Exception:
+            log.exception("leader housekeeping failed")
+        _leader_wake.wait(5)
+        _leader_wake.clear()
+
+
+def start_leader_tasks():
+    global _leader_thread
+    _leader_stop.clear()
+    _leader_thread = threading.Thread(target=leader_loop, name="leader", daemon=True)
+    _leader_thread.start()
+    start_drop_watcher()
+
+
+def stop_leader_tasks():
+    _leader_stop.set()
+    _leader_wake.set()
+    if _leader_thread is not None:
+        _leader_thread.join(timeout=10)
+    stop_drop_watcher()
+    # the state stays "running", so the next leader resumes the run
+    scrub.stop()
+
+
+coordinator = coordination.Coordinator(
+    get_db_conn,
+    lease_seconds=LEADER_LEASE_SECONDS,
+    on_elected=[start_leader_tasks],
+    on_demoted=[stop_leader_tasks],
+)
+
+
+@app.get("/api/workers")
+def list_workers():
+    conn = get_db_conn()
+    cur = conn.cursor()
+    live = coordinator.live_workers(cur)
+    lease = cur.execute("SELECT owner, expiresAt FROM leases WHERE name='leader'").fetchone()
+    workers = [
+        {
+            "id": r["id"],
+            "host": r["host"],
+            "pid": r["pid"],
+            "startedAt": r["startedAt"],
+            "heartbeatAt": r["heartbeatAt"],
+            "leader": bool(lease) and lease["owner"] == r["id"],
+        }
+        for r in cur.execute("SELECT * FROM workers ORDER BY startedAt")
+        if r["id"] in live
+    ]
+    conn.close()
+    return {
+        "instance": coordination.INSTANCE_ID,
+        "leader": lease["owner"] if lease and lease["expiresAt"] >= now_ms() else None,
+        "workers": workers,
+    }
+
+
+@app.get("/api/admission")
+async def admission_status():
+    # lane state lives on the event loop; read it there. Per worker process.
+    import anyio.to_thread
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        "instance": coordination.INSTANCE_ID,
+        "lanes": {lane.name: lane.status() for lane in lanes},
+        "threads": {
+            "total": limiter.total_tokens,
+            "busy": limiter.borrowed_tokens,
+            "interactiveReserve": INTERACTIVE_THREADS,
+        },
+    }
+
+
+@app.get("/api/read-cache")
+def read_cache_status():
+    # per worker process, like /api/admission
+    return {
+        "instance": coordination.INSTANCE_ID,
+        "shared": read_generation.shared,
+        "generation": read_generation.get(),
+        "caches": {c.name: c.stats() for c in (library_cache, setting_cache, model_cache)},
+    }
 
 
 @app.get("/api/storage-stats")
 def storage_stats():
     used = 0
-    for root, _dirs, files in os.walk(UPLOAD_DIR):
-        for fname in files:
-            used += os.path.getsize(os.path.join(root, fname))
+    with metrics.file_scan("storage_stats"):
+        for root, _dirs, files in os.walk(UPLOAD_DIR):
+            for fname in files:
+                used += os.path.getsize(os.path.join(root, fname))
     total = 5 * 1024 * 1024 * 1024
-    return {"used": used, "total": total}
+    conn = get_db_conn()
+    orphaned = conn.execute(
+        "SELECT COALESCE(SUM(bytes), 0) FROM scrub_issues WHERE kind IN (?,?)",
+        (scrubber.ORPHAN_FILE, scrubber.ORPHAN_MANUAL),
+    ).fetchone()[0]
+    history = versions.usage(conn.cursor())
+    conn.close()
+    # as of the last scrub; "used" still includes them until they are repaired
+    return {"used": used, "total": total, "orphaned": orphaned, "versions": history}
+
+
+def load_importers():
+    """The importers pull in requests; they are loaded on first use."""
+    from importers import common, makerworld, printables
+
+    common.stage_observer = metrics.observe_import_stage
+    return makerworld, printables
 
 
 def importer_for_url(url: str):
+    makerworld, printables = load_importers()
     if "makerworld.com" in url.lower():
         return makerworld.MakerWorldImporter(), "makerworld"
     return printables.PrintablesImporter(), "printables"
 
 
 def importer_for_source(source: str):
+    makerworld, printables = load_importers()
     if source == "makerworld":
         return makerworld.MakerWorldImporter(get_setting("makerworld_bambu_token")), "MakerWorld"
     return printables.PrintablesImporter(), "Printables"
@@ -608,6 +3050,7 @@ def update_makerworld_token(payload: dict):
 
 ## MODEL IMPORTS
 @app.post("/api/import/importid")
+@metrics.IMPORTS_IN_PROGRESS.track_inprogress()
 def import_model_by_id(payload: dict):
     source = payload.get("source", "printables")
     importer, source_label = importer_for_source(source)
@@ -624,15 +3067,27 @@ def import_model_by_id(payload: dict):
     
     filename = f"{mid}.{ext}"
     path = os.path.join(UPLOAD_DIR, filename)
+    inspected: Dict[str, Any] = {}
+
+    def embedded_thumbnail(content: bytes) -> Optional[str]:
+        # 3MF packages carry plate renders; use one instead of fetching the cover
+        if not is_3mf(ext):
+            return None
+        inspected["info"] = threemf.inspect_3mf(content)
+        return (inspected["info"] or {}).get("thumbnail")
 
     # Check if url is not None before calling importer
     try:
         if modelId is not None:
-            file, thumbnail = importer.importfromId(modelId, parentId, previewPath)
+            file, thumbnail = importer.importfromId(
+                modelId, parentId, previewPath, thumbnail_for=embedded_thumbnail
+            )
             if file is not None:
                 with open(path, "wb") as fh:
                     fh.write(file.content)
                 size = os.path.getsize(path)
+                digest = hashlib.sha256(file.content).hexdigest()
+                metrics.IMPORTED_BYTES.labels(source).inc(size)
             else:
                 raise ValueError("File Is Empty")
         else:
@@ -651,25 +3106,26 @@ def import_model_by_id(payload: dict):
         "description": f"Imported from {source_label}",
         "thumbnail": thumbnail
     }
+    info = inspected.get("info")
 
-    conn = get_db_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO models(id,name,folderId,url,size,dateAdded,tags,description,thumbnail) VALUES (?,?,?,?,?,?,?,?,?)",
-        (
-            model["id"],
-            model["name"],
-            model["folderId"],
-            model["url"],
-            model["size"],
-            model["dateAdded"],
-            json.dumps(model["tags"]),
-            model["description"],
-            model["thumbnail"],
-        ),
-    )
-    conn.commit()
-    conn.close()
+    conn = None
+    try:
+        conn = get_db_conn()
+        cur = conn.cursor()
+        insert_model(cur, model, digest, info)
+        bump_library_version(cur)
+        conn.commit()
+    except Exception:
+        # no row for the file: don't leave it behind as an orphan
+        if conn is not None:
+            conn.rollback()
+        remove_file(path)
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
+    process_new_files([(model["id"], path)])
+    model["printInfo"] = public_print_info(info)
     return model
 
 
@@ -690,6 +3146,63 @@ def import_model_options(payload: dict):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def import_options_results(urls: List[str]):
+    """NDJSON lines for the URLs of a batch, as each one is resolved. URLs
+    naming a model already in the batch are answered without a lookup."""
+    pool = import_options_pool()
+    first: Dict[Tuple, str] = {}
+    futures = {}
+    try:
+        for url in urls:
+            try:
+                importer, source = importer_for_url(url)
+                key = (source, *importer.modelKey(url))
+            except Exception as e:
+                yield orjson.dumps({"url": url, "status": "error", "detail": str(e)}) + b"\n"
+                continue
+            if key in first:
+                yield orjson.dumps({"url": url, "status": "duplicate", "of": first[key]}) + b"\n"
+                continue
+            first[key] = url
+            futures[pool.submit(importer.getModelOptions, url)] = (url, source)
+        for future in as_completed(futures):
+            url, source = futures[future]
+            try:
+                options = future.result()
+                if isinstance(options, int):
+                    raise ValueError(f"Upstream answered {options}")
+                if not options:
+                    raise ValueError("Collection Is Empty")
+                line = {"url": url, "status": "ok", "source": source, "options": options}
+            except Exception as e:
+                line = {"url": url, "status": "error", "detail": str(e)}
+            yield orjson.dumps(line) + b"\n"
+    finally:
+        # the client went away: skip lookups that haven't started
+        for future in futures:
+            future.cancel()
+
+
+@app.post("/api/import/options/batch")
+def import_model_options_batch(payload: dict):
+    """Options for many model URLs at once, streamed as NDJSON in the order
+    they resolve: {"url", "status": "ok", "source", "options"},
+    {"url", "status": "duplicate", "of"} or {"url", "status": "error", "detail"}."""
+    urls = payload.get("urls")
+    if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+        raise HTTPException(status_code=400, detail="urls must be a list of strings")
+    urls = [u.strip() for u in urls if u.strip()]
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if len(urls) > IMPORT_BATCH_MAX:
+        raise HTTPException(
+            status_code=400, detail=f"At most {IMPORT_BATCH_MAX} URLs per request"
+        )
+    return StreamingResponse(
+        import_options_results(urls), media_type="application/x-ndjson"
+    )
+
+
 ## PRINTABLES IMPORTS - compatibility aliases
 @app.post("/api/printables/importid")
 def import_printables_model_by_id(payload: dict):
@@ -702,18 +3215,82 @@ def import_printables_model_options(payload: dict):
     return import_model_options(payload)
 
 
-if __name__ == "__main__":
-    import uvicorn
-    
-    # Ensure upload directory exists
+# --- Startup ---
+_startup: Dict[str, Any] = {"startedAt": None, "servingAt": None, "readyAt": None, "warmup": {}}
+_ready = threading.Event()
+
+
+def warm_up():
+    """Load what the first import, upload or duplicate report would otherwise
+    wait for, while requests are already being served."""
+    steps = {
+        "importers": load_importers,
+        "fingerprint": lambda: importlib.import_module("fingerprint"),
+        "thumbnails": thumbnails.available,
+    }
+    for name, load in steps.items():
+        start = time.perf_counter()
+        try:
+            load()
+        except Exception:
+            log.exception("warm-up step %s failed", name)
+        _startup["warmup"][name] = round((time.perf_counter() - start) * 1000, 1)
+    _startup["readyAt"] = now_ms()
+    _ready.set()
+
+
+_read_listener_stop = threading.Event()
+
+
+def start_app():
+    _startup["startedAt"] = now_ms()
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    
-    port = int(os.getenv("PORT", "5173"))
-    
-    uvicorn.run(
-        "app:app",
-        host="0.0.0.0",
-        port=port,
-        reload=True,
-        log_level="info"
-    )
+    MANUAL_DIR.mkdir(parents=True, exist_ok=True)
+    init_db()
+    # next to the database, so every worker on this host maps the same one
+    read_generation.share(DB_PATH + "-readcache")
+    if db.POSTGRES:
+        _read_listener_stop.clear()
+        threading.Thread(
+            target=db.listen,
+            args=(READ_CACHE_CHANNEL, read_generation.advance, _read_listener_stop),
+            name="read-cache-listener",
+            daemon=True,
+        ).start()
+    if FILE_OFFLOAD and FILE_OFFLOAD not in ("x-accel-redirect", "x-sendfile"):
+        log.warning("FILE_OFFLOAD=%s is not x-accel-redirect or x-sendfile; "
+                    "files are sent from Python", FILE_OFFLOAD)
+    # runs on the event loop (lifespan), where the threadpool limiter lives
+    admission.reserve_threads(lanes, INTERACTIVE_THREADS)
+    coordinator.start()
+    _startup["servingAt"] = now_ms()
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def stop_app():
+    coordinator.stop()
+    _read_listener_stop.set()
+    read_generation.close()
+    if db.POSTGRES:
+        db.close_pool()
+
+
+@app.get("/api/ready")
+def readiness():
+    """200 once warm-up is done, 503 before; point load balancer and
+    container readiness checks here."""
+    body = {"ready": _ready.is_set(), **_startup}
+    return ORJSONResponse(body, status_code=200 if _ready.is_set() else 503)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render_latest()
+    return Response(body, media_type=content_type)
+
+
+if __name__ == "__main__":
+    import serve
+
+    # development server; production runs `python serve.py`
+    serve.main(default_port=5173, reload=True)
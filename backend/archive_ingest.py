@@ -0,0 +1,96 @@
+import hashlib
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+MODEL_EXTENSIONS = {".stl", ".3mf", ".step", ".stp"}
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_open_zips = {}
+_open_zips_lock = threading.Lock()
+
+
+def archive_kind(filename: str) -> Optional[str]:
+    lower = filename.lower()
+    if lower.endswith(".zip"):
+        return "zip"
+    if lower.endswith((".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")):
+        return "tar"
+    return None
+
+
+def split_member(name: str) -> Optional[Tuple[List[str], str]]:
+    """(directories, filename) for a model member, or None to skip it.
+
+    Rejects absolute paths and "..", and skips OS metadata like __MACOSX.
+    """
+    name = name.replace("\\", "/")
+    norm = posixpath.normpath(name)
+    if norm.startswith(("/", "../")) or norm == "..":
+        return None
+    parts = [p for p in norm.split("/") if p not in ("", ".")]
+    if not parts or any(p.startswith(".") or p == "__MACOSX" for p in parts):
+        return None
+    if os.path.splitext(parts[-1])[1].lower() not in MODEL_EXTENSIONS:
+        return None
+    return parts[:-1], parts[-1]
+
+
+def copy_hashed(src: BinaryIO, dest_path: str) -> Tuple[int, str]:
+    """Copy a stream to dest_path, returning (size, sha256 hex) in one pass."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(dest_path, "wb") as out:
+        while True:
+            chunk = src.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def zip_members(path: str) -> List[str]:
+    """Member names from the central directory, without reading any data."""
+    with zipfile.ZipFile(path) as zf:
+        return [i.filename for i in zf.infolist() if not i.is_dir()]
+
+
+def extract_zip_member(path: str, member: str, dest_path: str) -> Tuple[int, str]:
+    # one ZipFile per worker thread so reads don't serialize on a shared handle
+    key = (path, threading.get_ident())
+    zf = _open_zips.get(key)
+    if zf is None:
+        zf = zipfile.ZipFile(path)
+        with _open_zips_lock:
+            _open_zips[key] = zf
+    with zf.open(member) as src:
+        return copy_hashed(src, dest_path)
+
+
+def release_zip(path: str):
+    with _open_zips_lock:
+        keys = [k for k in _open_zips if k[0] == path]
+        for key in keys:
+            _open_zips.pop(key).close()
+
+
+def tar_members(path: str) -> Iterator[Tuple[str, BinaryIO]]:
+    """Stream regular files out of a (possibly compressed) tar in one pass."""
+    with tarfile.open(path, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            src = tf.extractfile(member)
+            if src is not None:
+                yield member.name, src
+
+
+def common_root(dirs: List[List[str]]) -> Optional[str]:
+    """The single top-level directory shared by every member, if any."""
+    tops = {d[0] if d else None for d in dirs}
+    return tops.pop() if len(tops) == 1 else None
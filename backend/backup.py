@@ -0,0 +1,408 @@
+"""Online, incremental backups of the vault and a matching restore.
+
+    python backup.py backup /backups/stlvault [--keep 14]
+    python backup.py restore /backups/stlvault [--snapshot 20260101T020000Z]
+    python backup.py list /backups/stlvault
+
+Layout of a backup directory:
+
+    blobs/ab/abcdef...    file contents by sha256, shared by every snapshot
+    snapshots/<name>/data.db
+    snapshots/<name>/manifest.json
+    LATEST
+
+Files are copied first and the database last, with the SQLite online
+backup API, so every file a snapshot's database refers to was already there
+when the walk started, unless it was added or replaced during the backup.
+The manifest records the library version before the walk and in the copied
+database; restore warns when they differ. With DATABASE_URL set to
+PostgreSQL, snapshots hold only the files; back the database up with
+pg_dump right after. Model files are compared by size and mtime against the
+previous manifest; only new or changed files are read, hashed and copied, so
+a nightly run over a large vault mostly costs one directory walk. Every
+snapshot is complete on its own and can be restored without the ones before
+it.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+import archive_ingest
+import db
+
+DB_PATH = os.getenv("DB_PATH", "data.db")
+UPLOAD_DIR = os.getenv("FILE_STORAGE", "./app/uploads")
+MANUAL_DIR = os.getenv("MANUAL_STORAGE", os.path.join(UPLOAD_DIR, "manuals"))
+BACKUP_WORKERS = int(os.getenv("BACKUP_WORKERS", "4"))
+# pages per step when the database is not in WAL mode
+BACKUP_PAGES = 1024
+
+# manifest entry: relative path -> [size, mtime_ns, sha256]
+Entry = List
+Manifest = Dict[str, Entry]
+
+
+def snapshot_db(src_path: str, dest_path: str):
+    """Consistent copy of a live database.
+
+    In WAL mode the copy is one read transaction, which never blocks
+    writers. Otherwise it goes in steps of BACKUP_PAGES with a pause between
+    them so writers can get in; SQLite restarts the copy if one does.
+    """
+    src = sqlite3.connect(src_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        mode = src.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode == "wal":
+            src.backup(dest)
+        else:
+            src.backup(dest, pages=BACKUP_PAGES, sleep=0.01)
+        dest.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dest.close()
+        src.close()
+
+
+def library_version(db_path: str) -> Optional[int]:
+    """The library version stored in a database, or None without one."""
+    if db.POSTGRES:
+        conn = db.connect()
+    elif os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+    else:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT value FROM settings WHERE key='library_version'"
+        ).fetchone()
+    except db.Error:
+        row = None
+    finally:
+        conn.close()
+    return int(row[0]) if row else None
+
+
+def walk_roots(roots: Dict[str, str]) -> List[Tuple[str, str, int, int]]:
+    """(manifest key, absolute path, size, mtime_ns) for every file to back up.
+    Hidden entries (in-flight ingest archives, drop folders) are skipped."""
+    found = []
+    for name, top in roots.items():
+        stack = [top]
+        while stack:
+            current = stack.pop()
+            try:
+                entries = list(os.scandir(current))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if not any(os.path.samefile(entry.path, r) for r in roots.values()):
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    rel = os.path.relpath(entry.path, top).replace(os.sep, "/")
+                    found.append((f"{name}/{rel}", entry.path, st.st_size, st.st_mtime_ns))
+    return found
+
+
+def blob_path(dest: str, digest: str) -> str:
+    return os.path.join(dest, "blobs", digest[:2], digest)
+
+
+def store_blob(dest: str, path: str) -> Tuple[str, int]:
+    """Copy a file into the blob store, returning (sha256, bytes copied)."""
+    tmp_dir = os.path.join(dest, "blobs", "tmp")
+    fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+    os.close(fd)
+    try:
+        with open(path, "rb") as src:
+            size, digest = archive_ingest.copy_hashed(src, tmp)
+        final = blob_path(dest, digest)
+        if os.path.exists(final):
+            os.remove(tmp)
+            return digest, 0
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(tmp, final)
+        return digest, size
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_manifest(dest: str, name: Optional[str] = None) -> Optional[dict]:
+    name = name or latest_snapshot(dest)
+    if not name:
+        return None
+    path = os.path.join(dest, "snapshots", name, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as fh:
+        return orjson.loads(fh.read())
+
+
+def latest_snapshot(dest: str) -> Optional[str]:
+    try:
+        with open(os.path.join(dest, "LATEST")) as fh:
+            return fh.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_snapshots(dest: str) -> List[str]:
+    root = os.path.join(dest, "snapshots")
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        n for n in os.listdir(root)
+        if os.path.exists(os.path.join(root, n, "manifest.json"))
+    )
+
+
+def new_snapshot_dir(dest: str, start: float) -> Tuple[str, str]:
+    """Create the directory of a new snapshot. Names have one-second
+    resolution; a second backup within the same second gets a -2, -3...
+    suffix, which still sorts after the first and before the next second."""
+    base = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(start))
+    os.makedirs(os.path.join(dest, "snapshots"), exist_ok=True)
+    attempt = 1
+    while True:
+        name = base if attempt == 1 else f"{base}-{attempt}"
+        snap_dir = os.path.join(dest, "snapshots", name)
+        try:
+            os.mkdir(snap_dir)
+            return name, snap_dir
+        except FileExistsError:
+            attempt += 1
+
+
+def backup(dest: str, db_path: str = DB_PATH, upload_dir: str = UPLOAD_DIR,
+           manual_dir: str = MANUAL_DIR, workers: int = BACKUP_WORKERS) -> dict:
+    start = time.time()
+    name, snap_dir = new_snapshot_dir(dest, start)
+    os.makedirs(os.path.join(dest, "blobs", "tmp"), exist_ok=True)
+
+    files_version = library_version(db_path)
+    roots = {"uploads": os.path.abspath(upload_dir)}
+    manuals = os.path.abspath(manual_dir)
+    if os.path.commonpath([manuals, roots["uploads"]]) != roots["uploads"]:
+        roots["manuals"] = manuals
+    # version history is hidden from the uploads walk but referenced by the db
+    history = os.path.join(roots["uploads"], ".versions")
+    if os.path.isdir(history):
+        roots["versions"] = history
+
+    previous: Manifest = (load_manifest(dest) or {}).get("files", {})
+    files: Manifest = {}
+    changed = []
+    for key, path, size, mtime_ns in walk_roots(roots):
+        prev = previous.get(key)
+        if prev and prev[0] == size and prev[1] == mtime_ns and os.path.exists(
+            blob_path(dest, prev[2])
+        ):
+            files[key] = prev
+        else:
+            changed.append((key, path, size, mtime_ns))
+
+    copied_bytes = 0
+    failed = []
+    with ThreadPoolExecutor(workers) as pool:
+        results = pool.map(lambda c: (c, _try_store(dest, c[1])), changed)
+        for (key, _path, size, mtime_ns), (result, error) in results:
+            if error is not None:
+                # vanished or unreadable mid-backup; it is not in this snapshot
+                failed.append(f"{key}: {error}")
+                continue
+            digest, written = result
+            files[key] = [size, mtime_ns, digest]
+            copied_bytes += written
+
+    # database last: models it refers to had their files in the walk above,
+    # unless the library changed in between (see libraryVersion)
+    database = None
+    if db.POSTGRES:
+        version = library_version(db_path)
+    else:
+        database = "data.db"
+        snapshot_db(db_path, os.path.join(snap_dir, database))
+        version = library_version(os.path.join(snap_dir, database))
+
+    manifest = {
+        "name": name,
+        "createdAt": int(start * 1000),
+        "database": database,
+        "libraryVersion": version,
+        "filesLibraryVersion": files_version,
+        "roots": list(roots),
+        "files": files,
+        "failed": failed,
+    }
+    with open(os.path.join(snap_dir, "manifest.json"), "wb") as fh:
+        fh.write(orjson.dumps(manifest))
+    with open(os.path.join(dest, "LATEST.tmp"), "w") as fh:
+        fh.write(name)
+    os.replace(os.path.join(dest, "LATEST.tmp"), os.path.join(dest, "LATEST"))
+    return {
+        "snapshot": name,
+        "files": len(files),
+        "changed": len(changed),
+        "copiedBytes": copied_bytes,
+        "failed": len(failed),
+        "libraryChanged": version != files_version,
+        "seconds": round(time.time() - start, 2),
+    }
+
+
+def _try_store(dest: str, path: str):
+    try:
+        return store_blob(dest, path), None
+    except OSError as e:
+        return None, e
+
+
+def prune(dest: str, keep: int) -> dict:
+    """Drop all but the newest `keep` snapshots, then blobs nothing refers to."""
+    names = list_snapshots(dest)
+    removed = names[:-keep] if keep > 0 else []
+    for name in removed:
+        shutil.rmtree(os.path.join(dest, "snapshots", name))
+    referenced = set()
+    for name in list_snapshots(dest):
+        referenced.update(e[2] for e in load_manifest(dest, name)["files"].values())
+    freed = 0
+    blobs = os.path.join(dest, "blobs")
+    for prefix in os.listdir(blobs):
+        if prefix == "tmp":
+            continue
+        for digest in os.listdir(os.path.join(blobs, prefix)):
+            if digest not in referenced:
+                path = os.path.join(blobs, prefix, digest)
+                freed += os.path.getsize(path)
+                os.remove(path)
+    return {"removedSnapshots": len(removed), "freedBytes": freed}
+
+
+def restore(src: str, snapshot: Optional[str] = None, db_path: str = DB_PATH,
+            upload_dir: str = UPLOAD_DIR, manual_dir: str = MANUAL_DIR,
+            workers: int = BACKUP_WORKERS) -> dict:
+    """Restore a snapshot into the configured locations. Stop the server
+    first. Files already present with the recorded size and mtime are left
+    alone, so restoring over a partially intact vault is quick; files the
+    snapshot doesn't list are moved to uploads/.quarantine/restore-<name>
+    rather than left behind as orphans."""
+    start = time.time()
+    manifest = load_manifest(src, snapshot)
+    if manifest is None:
+        raise SystemExit(f"no snapshot {snapshot or '(latest)'} in {src}")
+    roots = {
+        "uploads": upload_dir,
+        "manuals": manual_dir,
+        "versions": os.path.join(upload_dir, ".versions"),
+    }
+
+    def restore_file(item):
+        key, (size, mtime_ns, digest) = item
+        root, rel = key.split("/", 1)
+        target = os.path.join(roots[root], *rel.split("/"))
+        try:
+            st = os.stat(target)
+            if st.st_size == size and st.st_mtime_ns == mtime_ns:
+                return 0
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = target + ".restore"
+        shutil.copyfile(blob_path(src, digest), tmp)
+        os.utime(tmp, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp, target)
+        return size
+
+    with ThreadPoolExecutor(workers) as pool:
+        restored = [n for n in pool.map(restore_file, manifest["files"].items()) if n]
+
+    # "roots" is absent in the oldest snapshots
+    backed_up = manifest.get("roots") or sorted({k.split("/", 1)[0] for k in manifest["files"]})
+    quarantine = os.path.join(upload_dir, ".quarantine", f"restore-{manifest['name']}")
+    quarantined = 0
+    existing = {r: roots[r] for r in backed_up if os.path.isdir(roots[r])}
+    for key, path, _size, _mtime in walk_roots(existing):
+        if key in manifest["files"]:
+            continue
+        target = os.path.join(quarantine, *key.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+        quarantined += 1
+
+    # snapshots from before the "database" key always have data.db
+    database = manifest.get("database", "data.db")
+    if database and not db.POSTGRES:
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        tmp_db = db_path + ".restore"
+        shutil.copyfile(os.path.join(src, "snapshots", manifest["name"], database), tmp_db)
+        # a WAL left behind by the old database would be replayed into the new one
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        os.replace(tmp_db, db_path)
+    result = {
+        "snapshot": manifest["name"],
+        "files": len(manifest["files"]),
+        "restored": len(restored),
+        "restoredBytes": sum(restored),
+        "quarantined": quarantined,
+        "seconds": round(time.time() - start, 2),
+    }
+    # absent in snapshots from before the versions were recorded
+    before = manifest.get("filesLibraryVersion")
+    after = manifest.get("libraryVersion")
+    if before != after:
+        result["warning"] = (
+            f"the library changed while this snapshot was taken (version {before} "
+            f"to {after}); models added or replaced meanwhile may be missing their "
+            "files, run the scrubber to list them"
+        )
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="STLVault backup and restore")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("backup", help="take a snapshot of the live vault")
+    p.add_argument("dest")
+    p.add_argument("--keep", type=int, default=0,
+                   help="keep only the newest N snapshots (0 keeps all)")
+    p.add_argument("--workers", type=int, default=BACKUP_WORKERS)
+    p = sub.add_parser("restore", help="restore a snapshot (stop the server first)")
+    p.add_argument("src")
+    p.add_argument("--snapshot", help="snapshot name, defaults to the latest")
+    p.add_argument("--workers", type=int, default=BACKUP_WORKERS)
+    p = sub.add_parser("list", help="list snapshots")
+    p.add_argument("src")
+    args = parser.parse_args(argv)
+
+    if args.command == "backup":
+        result = backup(args.dest, workers=args.workers)
+        if args.keep:
+            result.update(prune(args.dest, args.keep))
+    elif args.command == "restore":
+        result = restore(args.src, args.snapshot, workers=args.workers)
+        if "warning" in result:
+            sys.stderr.write(f"warning: {result['warning']}\n")
+    else:
+        result = {"snapshots": list_snapshots(args.src), "latest": latest_snapshot(args.src)}
+    sys.stdout.write(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode() + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Interactive latency during an upload storm, with and without admission
+control.
+
+Starts `serve.py` on a throwaway vault seeded with `--models` models, then
+has one client fire `--storm` uploads over `--connections` parallel
+connections (retrying 429s after `Retry-After`) while a second client
+uploads `--small` files and a probe keeps listing models and folders. Runs
+once with the lanes effectively unlimited and once with the default limits,
+and reports probe latency percentiles, storm throughput, 429s and how long
+the small client took. Clients are told apart by X-Forwarded-For.
+
+    python benchmarks/bench_admission.py --storm 500 --connections 100
+"""
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import synthetic  # noqa: E402
+from load_test import Server, free_port, percentile, seed_vault  # noqa: E402
+
+UNLIMITED = {
+    "UPLOAD_CONCURRENCY": "100000",
+    "UPLOAD_CLIENT_CONCURRENCY": "100000",
+    "ADMISSION_QUEUE": "100000",
+    "INTERACTIVE_THREADS": "0",
+}
+
+
+def upload(base, body, name, client, stats):
+    while True:
+        start = time.perf_counter()
+        r = requests.post(
+            base + "/api/models/upload",
+            files={"file": (name, body)},
+            data={"folderId": "1"},
+            headers={"X-Forwarded-For": client},
+            timeout=600,
+        )
+        if r.status_code != 429:
+            r.raise_for_status()
+            stats["latency"].append(time.perf_counter() - start)
+            return
+        stats["rejected"] += 1
+        time.sleep(float(r.headers.get("Retry-After", "1")))
+
+
+def run(extra_env, args, body):
+    env = {"TRUST_FORWARDED_FOR": "1", **extra_env}
+    server = Server(tempfile.mkdtemp(prefix="stlvault-admission-"), free_port(), env)
+    try:
+        server.wait_ready()
+        seed_vault(server.base, 5, args.models, 5, 2000, 20000, 8)
+        stop = threading.Event()
+        probe = []
+
+        def probing():
+            with requests.Session() as s:
+                while not stop.is_set():
+                    for path in ("/api/models", "/api/folders"):
+                        start = time.perf_counter()
+                        s.get(server.base + path, timeout=600).raise_for_status()
+                        probe.append(time.perf_counter() - start)
+                    time.sleep(0.05)
+
+        storm = {"latency": [], "rejected": 0}
+        small = {"latency": [], "rejected": 0}
+        prober = threading.Thread(target=probing)
+        prober.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.connections) as pool, ThreadPoolExecutor(args.small) as other:
+            jobs = [pool.submit(upload, server.base, body, f"storm{i}.stl", "10.0.0.1", storm)
+                    for i in range(args.storm)]
+            time.sleep(0.5)  # the storm is already queued when the small client shows up
+            small_start = time.perf_counter()
+            small_jobs = [other.submit(upload, server.base, body, f"small{i}.stl", "10.0.0.2", small)
+                          for i in range(args.small)]
+            for job in small_jobs:
+                job.result()
+            small_seconds = time.perf_counter() - small_start
+            for job in jobs:
+                job.result()
+        storm_seconds = time.perf_counter() - start
+        stop.set()
+        prober.join()
+    finally:
+        server.stop()
+    probe.sort()
+    return {
+        "probeMs": {p: round(percentile(probe, int(p[1:])) * 1000, 1) for p in ("p50", "p95", "p99")}
+        | {"max": round(probe[-1] * 1000, 1), "count": len(probe)},
+        "stormSeconds": round(storm_seconds, 2),
+        "uploadsPerSecond": round(args.storm / storm_seconds, 1),
+        "rejected429": storm["rejected"] + small["rejected"],
+        "smallClientSeconds": round(small_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=500)
+    parser.add_argument("--storm", type=int, default=500)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--small", type=int, default=3)
+    parser.add_argument("--size", type=int, default=1024 * 1024, help="bytes per uploaded file")
+    args = parser.parse_args()
+
+    body = synthetic.stl_of_size(args.size)
+    result = {
+        "unlimited": run(UNLIMITED, args, body),
+        "admission": run({}, args, body),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
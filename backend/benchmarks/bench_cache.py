@@ -0,0 +1,121 @@
+"""Hot read paths with and without the in-process read caches.
+
+Seeds a throwaway vault with `--folders` folders and `--models` models (rows
+and empty files, written directly), then times the reads the UI and the
+importers repeat most: the setting the MakerWorld importer looks up, the
+folder tree (full and revalidated with If-None-Match), a revalidated model
+listing and a model download. Each runs `--calls` times with the caches
+enabled and disabled (READ_CACHE_SIZE=0), reporting the median per call and
+the SQLite connections opened per call.
+
+    python benchmarks/bench_cache.py --folders 200 --models 5000 --calls 500
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def seed(app, folders: int, models: int):
+    conn = app.get_db_conn()
+    ts = app.now_ms()
+    folder_ids = [str(uuid.uuid4()) for _ in range(folders)]
+    conn.executemany(
+        "INSERT INTO folders(id,name,parentId,updatedAt) VALUES (?,?,?,?)",
+        [(fid, f"folder {i}", "1", ts) for i, fid in enumerate(folder_ids)],
+    )
+    model_ids = [str(uuid.uuid4()) for _ in range(models)]
+    conn.executemany(
+        "INSERT INTO models(id,name,folderId,url,size,dateAdded,tags,description,updatedAt) "
+        "VALUES (?,?,?,?,?,?,?,?,?)",
+        [(mid, f"part {i}.stl", folder_ids[i % folders], "", 84, ts, "[]", "", ts)
+         for i, mid in enumerate(model_ids)],
+    )
+    conn.execute("INSERT INTO settings(key,value) VALUES ('makerworld_bambu_token','token')")
+    app.bump_library_version(conn.cursor())
+    conn.commit()
+    conn.close()
+    for mid in model_ids:
+        with open(os.path.join(app.UPLOAD_DIR, mid + ".stl"), "wb") as fh:
+            fh.write(b"\0" * 84)
+    return model_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folders", type=int, default=200)
+    parser.add_argument("--models", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stlvault-cache-")
+    os.environ["DB_PATH"] = os.path.join(workdir, "data.db")
+    os.environ["FILE_STORAGE"] = os.path.join(workdir, "uploads")
+    os.environ["SCRUB_INTERVAL_HOURS"] = "0"
+    from fastapi.testclient import TestClient
+
+    import app
+
+    opened = [0]
+    get_db_conn = app.get_db_conn
+
+    def counting_conn(*a, **kw):
+        opened[0] += 1
+        return get_db_conn(*a, **kw)
+
+    caches = (app.library_cache, app.setting_cache, app.model_cache)
+    sizes = [c.max_entries for c in caches]
+
+    with TestClient(app.app) as client:
+        model_ids = seed(app, args.folders, args.models)
+        folders_etag = client.get("/api/folders").headers["etag"]
+        models_etag = client.get("/api/models?thumbnails=0").headers["etag"]
+        app.get_db_conn = counting_conn
+
+        def download(i):
+            client.get(f"/api/models/{model_ids[i % 50]}/download").raise_for_status()
+
+        reads = {
+            "getSetting": lambda i: app.get_setting("makerworld_bambu_token"),
+            "folders": lambda i: client.get("/api/folders").raise_for_status(),
+            "foldersRevalidate": lambda i: client.get(
+                "/api/folders", headers={"If-None-Match": folders_etag}),
+            "modelsRevalidate": lambda i: client.get(
+                "/api/models?thumbnails=0", headers={"If-None-Match": models_etag}),
+            "download": download,
+        }
+        report = {}
+        for enabled in (False, True):
+            for cache, size in zip(caches, sizes):
+                cache.max_entries = size if enabled else 0
+                cache.clear()
+            results = {}
+            for name, read in reads.items():
+                read(0)
+                opened[0] = 0
+                times = []
+                for i in range(args.calls):
+                    start = time.perf_counter()
+                    read(i)
+                    times.append(time.perf_counter() - start)
+                results[name] = {
+                    "us": round(statistics.median(times) * 1e6, 1),
+                    "connectionsPerCall": round(opened[0] / args.calls, 2),
+                }
+            report["cached" if enabled else "uncached"] = results
+        app.get_db_conn = get_db_conn
+
+    report["config"] = vars(args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
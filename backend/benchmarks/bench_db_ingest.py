@@ -0,0 +1,183 @@
+"""Concurrent write throughput on SQLite and on PostgreSQL.
+
+Starts `serve.py` with `--workers` uvicorn workers on a throwaway vault,
+once per database, and runs two write-heavy loads against it:
+
+- ingest: `--archives` zip archives of `--members` small STLs each, posted
+  at once; measured until every ingest job is done, in models/s.
+- uploads: `--uploads` single-file uploads over `--connections` parallel
+  connections, in uploads/s with the median and p95 latency.
+
+PostgreSQL runs against a fresh database created on the server at
+`--database-url` (any database the user may CREATE DATABASE from). Without
+it, a private server is started with the `pgserver` package when that is
+installed; otherwise the PostgreSQL half is skipped.
+
+    python benchmarks/bench_db_ingest.py --workers 4 --archives 8 --members 200 --uploads 400
+    python benchmarks/bench_db_ingest.py --database-url postgresql://postgres@localhost/postgres
+"""
+import argparse
+import io
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+import synthetic  # noqa: E402
+from load_test import Server, free_port, session  # noqa: E402
+
+
+def archive(index: int, members: int) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(members):
+            zf.writestr(f"set{index}/part{i % 10}/p{i}.stl", synthetic.binary_stl(40, index * members + i))
+    return buf.getvalue()
+
+
+def run_ingest(base: str, args) -> dict:
+    bodies = [archive(i, args.members) for i in range(args.archives)]
+
+    def post(i):
+        r = session().post(
+            base + "/api/models/ingest",
+            files={"file": (f"set{i}.zip", bodies[i])},
+            data={"folderId": "1"},
+        )
+        r.raise_for_status()
+        return r.json()["id"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.archives) as pool:
+        job_ids = list(pool.map(post, range(args.archives)))
+    jobs = {}
+    deadline = time.monotonic() + 600
+    while len(jobs) < len(job_ids) and time.monotonic() < deadline:
+        for job_id in job_ids:
+            if job_id in jobs:
+                continue
+            job = session().get(f"{base}/api/models/ingest/{job_id}").json()
+            if job["status"] in ("done", "failed"):
+                jobs[job_id] = job
+        time.sleep(0.05)
+    seconds = time.perf_counter() - start
+    processed = sum(j["processed"] for j in jobs.values())
+    return {
+        "seconds": round(seconds, 2),
+        "models": processed,
+        "failed": sum(j["failed"] for j in jobs.values()) + len(job_ids) - len(jobs),
+        "modelsPerSecond": round(processed / seconds, 1),
+    }
+
+
+def run_uploads(base: str, args) -> dict:
+    body = synthetic.binary_stl(200)
+
+    def upload(i):
+        started = time.perf_counter()
+        r = session().post(
+            base + "/api/models/upload",
+            files={"file": (f"u{i}.stl", body)},
+            data={"folderId": "1", "tags": json.dumps([f"t{i % 20}"])},
+        )
+        return time.perf_counter() - started, r.ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.connections) as pool:
+        results = list(pool.map(upload, range(args.uploads)))
+    seconds = time.perf_counter() - start
+    latencies = sorted(t for t, _ in results)
+    return {
+        "seconds": round(seconds, 2),
+        "errors": sum(1 for _, ok in results if not ok),
+        "uploadsPerSecond": round(args.uploads / seconds, 1),
+        "p50Ms": round(statistics.median(latencies) * 1000, 1),
+        "p95Ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def run(args, database_url: str = "") -> dict:
+    workdir = tempfile.mkdtemp(prefix="stlvault-dbingest-")
+    server = Server(workdir, free_port(), {"DATABASE_URL": database_url}, workers=args.workers)
+    try:
+        server.wait_ready(60)
+        return {
+            "ingest": run_ingest(server.base, args),
+            "uploads": run_uploads(server.base, args),
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def local_postgres(workdir: str):
+    """A private PostgreSQL server from the pgserver package, or None."""
+    try:
+        import pgserver
+    except ImportError:
+        return None
+    return pgserver.get_server(workdir, cleanup_mode="stop")
+
+
+def create_database(admin_url: str) -> str:
+    import psycopg
+
+    name = f"stlvault_bench_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(admin_url, autocommit=True) as conn:
+        conn.execute(f"CREATE DATABASE {name}")
+    parts = urlsplit(admin_url)
+    return urlunsplit(parts._replace(path="/" + name))
+
+
+def drop_database(admin_url: str, url: str):
+    import psycopg
+
+    with psycopg.connect(admin_url, autocommit=True) as conn:
+        conn.execute(f"DROP DATABASE IF EXISTS {urlsplit(url).path[1:]} WITH (FORCE)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--archives", type=int, default=8)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--uploads", type=int, default=400)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--database-url", help="PostgreSQL server to create the database on")
+    args = parser.parse_args()
+
+    report = {"sqlite": run(args)}
+    pg_dir = tempfile.mkdtemp(prefix="stlvault-pg-")
+    server = None
+    try:
+        admin_url = args.database_url
+        if not admin_url:
+            server = local_postgres(pg_dir)
+            admin_url = server.get_uri() if server else None
+        if admin_url:
+            url = create_database(admin_url)
+            try:
+                report["postgres"] = run(args, url)
+            finally:
+                drop_database(admin_url, url)
+        else:
+            report["postgres"] = "skipped: no --database-url and pgserver isn't installed"
+    finally:
+        if server is not None:
+            server.cleanup()
+        shutil.rmtree(pg_dir, ignore_errors=True)
+    report["config"] = {k: v for k, v in vars(args).items() if k != "database_url"}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
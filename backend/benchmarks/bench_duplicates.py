@@ -0,0 +1,133 @@
+"""Vault-wide near-duplicate report over synthetic shape fingerprints.
+
+Computes real signatures for a set of distinct meshes, measures how far
+re-tessellated, rotated, rescaled and reordered copies of the same mesh land
+from each other, then fills a vault of `--models` fingerprints (distinct
+shapes plus noisy copies) and times the grid duplicate search against a
+chunked brute-force scan of every pair.
+
+    python benchmarks/bench_duplicates.py --models 50000
+"""
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import fingerprint  # noqa: E402
+
+
+def ellipsoid(rng, rows, stretch):
+    u = np.linspace(0, np.pi, rows)
+    v = np.linspace(0, 2 * np.pi, 2 * rows)
+    U, V = np.meshgrid(u, v, indexing="ij")
+    pts = np.stack(
+        [np.sin(U) * np.cos(V), np.sin(U) * np.sin(V), np.cos(U)], axis=-1
+    ) * stretch
+    quads = []
+    for i in range(rows - 1):
+        for j in range(2 * rows - 1):
+            quads.append([pts[i, j], pts[i + 1, j], pts[i + 1, j + 1]])
+            quads.append([pts[i, j], pts[i + 1, j + 1], pts[i, j + 1]])
+    return np.array(quads)
+
+
+def box(rng, dims):
+    corners = np.array(list(itertools.product(*[(0, d) for d in dims])), float)
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+             (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    return corners[np.array(faces)]
+
+
+def shape(rng, rows=24):
+    dims = rng.uniform(0.2, 3.0, size=3)
+    if rng.random() < 0.5:
+        return box(rng, dims)
+    return ellipsoid(rng, rows, dims)
+
+
+def variant(rng, tris):
+    """Same part as another exporter would write it."""
+    q, _ = np.linalg.qr(rng.standard_normal((3, 3)))
+    out = tris[rng.permutation(len(tris))] @ q.T * rng.uniform(0.1, 25.4)
+    return (out + rng.uniform(-100, 100, size=3)).astype(np.float32).astype(np.float64)
+
+
+def brute_force(matrix, threshold, chunk=2048):
+    norms = (matrix ** 2).sum(axis=1)
+    pairs = set()
+    for r in range(0, len(matrix), chunk):
+        d2 = norms[r:r + chunk, None] + norms[None, :] - 2 * matrix[r:r + chunk] @ matrix.T
+        a, b = np.nonzero(d2 <= threshold * threshold)
+        keep = b > a + r
+        pairs.update(zip((a[keep] + r).tolist(), b[keep].tolist()))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=50000)
+    parser.add_argument("--shapes", type=int, default=2000,
+                        help="distinct meshes to fingerprint for real")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3,
+                        help="share of the vault that are copies of another model")
+    parser.add_argument("--threshold", type=float, default=0.03)
+    parser.add_argument("--no-brute-force", action="store_true")
+    args = parser.parse_args()
+    rng = np.random.default_rng(7)
+
+    start = time.perf_counter()
+    meshes = [shape(rng) for _ in range(args.shapes)]
+    bases = np.stack([fingerprint.signature(m) for m in meshes])
+    per_sig = (time.perf_counter() - start) / args.shapes
+    print(f"{args.shapes} real signatures, {per_sig * 1000:.1f} ms each")
+
+    spread = []
+    for m, base in zip(meshes[:50], bases[:50]):
+        spread.append(np.linalg.norm(fingerprint.signature(variant(rng, m)) - base))
+    spread = np.array(spread)
+    print(f"copy-to-original distance: median {np.median(spread):.4f}, "
+          f"max {spread.max():.4f}")
+    nearest = fingerprint.FingerprintIndex(
+        [str(i) for i in range(200)], bases[:200]
+    )
+    gaps = [nearest.similar(str(i), 1)[0][1] for i in range(200)]
+    print(f"distinct-shape nearest neighbour: median {np.median(gaps):.4f}, "
+          f"min {min(gaps):.4f}")
+
+    # fill the vault: distinct shapes jittered within the copy spread
+    copies = int(args.models * args.duplicate_ratio)
+    originals = args.models - copies
+    noise = float(np.median(spread)) / np.sqrt(bases.shape[1])
+    uniques = bases[rng.integers(0, len(bases), originals)]
+    uniques = uniques + rng.normal(0, 0.05 / np.sqrt(bases.shape[1]), uniques.shape)
+    dupes = uniques[rng.integers(0, originals, copies)]
+    dupes = dupes + rng.normal(0, noise, dupes.shape)
+    matrix = np.concatenate([uniques, dupes]).astype(np.float16).astype(np.float32)
+    index = fingerprint.FingerprintIndex([str(i) for i in range(len(matrix))], matrix)
+
+    start = time.perf_counter()
+    found = index.duplicate_pairs(args.threshold)
+    grid = time.perf_counter() - start
+    print(f"\n{len(matrix)} fingerprints, threshold {args.threshold}")
+    print(f"duplicate_pairs: {grid:.2f} s, {len(found)} pairs")
+
+    start = time.perf_counter()
+    index.similar("0", 10)
+    print(f"similar(): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if not args.no_brute_force:
+        start = time.perf_counter()
+        truth = brute_force(matrix, args.threshold)
+        brute = time.perf_counter() - start
+        missed = len(truth - {(i, j) for i, j, _ in found})
+        print(f"brute force: {brute:.2f} s, {len(truth)} pairs, {missed} missed by the grid")
+
+
+if __name__ == "__main__":
+    main()
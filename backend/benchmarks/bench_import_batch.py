@@ -0,0 +1,105 @@
+"""Resolving a pasted list of model links, one by one vs in one batch.
+
+Starts benchmarks/fake_upstreams.py with `--latency-ms` per request, builds
+`--urls` Printables and MakerWorld links of which `--duplicates` repeat an
+earlier one, and resolves them twice, each time against a fresh `serve.py`:
+one `POST /api/import/options` after another with the Printables client uid
+scraped every time and no host pacing (how the importers used to behave),
+then one streamed `POST /api/import/options/batch`. Reports wall time, time
+to the first options and the upstream request count.
+
+    python benchmarks/bench_import_batch.py --urls 30 --duplicates 5 --latency-ms 300
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(BENCH_DIR.parent))
+from bench_importers import start_fake  # noqa: E402
+from load_test import Server, free_port  # noqa: E402
+
+
+def upstream_requests(fake):
+    return requests.get(fake + "/__stats").json()["requests"]
+
+
+def run(fake, env, urls, batch):
+    """Seconds in total and to the first options, and upstream requests."""
+    server = Server(tempfile.mkdtemp(prefix="stlvault-import-batch-"), free_port(), {
+        "PRINTABLES_WEB_URL": fake + "/",
+        "PRINTABLES_API_URL": fake + "/graphql/",
+        "PRINTABLES_FILES_URL": fake + "/",
+        "MAKERWORLD_API_BASE": fake + "/v1",
+        **env,
+    })
+    try:
+        server.wait_ready()
+        before = upstream_requests(fake)
+        start = time.perf_counter()
+        first = None
+        statuses = {}
+        if batch:
+            with requests.post(server.base + "/api/import/options/batch",
+                               json={"urls": urls}, stream=True, timeout=600) as r:
+                r.raise_for_status()
+                for line in r.iter_lines():
+                    if line:
+                        status = json.loads(line)["status"]
+                        if status == "ok":
+                            first = first or time.perf_counter() - start
+                        statuses[status] = statuses.get(status, 0) + 1
+        else:
+            for url in urls:
+                requests.post(server.base + "/api/import/options",
+                              json={"url": url}, timeout=600).raise_for_status()
+                first = first or time.perf_counter() - start
+        result = {
+            "seconds": round(time.perf_counter() - start, 2),
+            "firstOptionsSeconds": round(first, 2),
+            "upstreamRequests": upstream_requests(fake) - before,
+        }
+        if batch:
+            result["results"] = statuses
+        return result
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=30)
+    parser.add_argument("--duplicates", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    proc, fake = start_fake(free_port(), ["--latency-ms", str(args.latency_ms)])
+    distinct = []
+    for i in range(args.urls - args.duplicates):
+        if i % 2:
+            distinct.append(f"https://makerworld.com/en/models/{200000 + i}")
+        else:
+            distinct.append(f"{fake}/model/{100000 + i}-benchmark-part")
+    urls = distinct + distinct[:args.duplicates]
+    try:
+        report = {
+            # a fresh scrape per Printables link and no pacing, as before
+            "oneByOne": run(fake, {"PRINTABLES_CLIENT_UID_TTL": "0", "IMPORT_HOST_RPS": "0"},
+                            urls, batch=False),
+            "batch": run(fake, {}, urls, batch=True),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    report["config"] = vars(args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Offline import benchmark against benchmarks/fake_upstreams.py.
+
+Runs the fake Printables/MakerWorld server in a subprocess, points the
+importers at it through their base-URL environment variables, and drives
+`import_model_options` + `import_model_by_id` from app.py with concurrent
+workers on a throwaway vault. Reports imports/s, latency percentiles, bytes
+received, this process's peak RSS and the server's 429/503 counters.
+
+    python benchmarks/bench_importers.py --source both --imports 40 --concurrency 8 \\
+        --latency-ms 50 --rate-limit 40 --file-size 20000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(BENCH_DIR.parent))
+import fake_upstreams  # noqa: E402
+from load_test import free_port, percentile  # noqa: E402
+
+
+def start_fake(port, argv):
+    proc = subprocess.Popen(
+        [sys.executable, str(BENCH_DIR / "fake_upstreams.py"), "--port", str(port), *argv],
+        stdout=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base + "/__stats", timeout=1).ok:
+                return proc, base
+        except requests.RequestException:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("fake upstream server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=["printables", "makerworld", "both"], default="both")
+    parser.add_argument("--imports", type=int, default=20, help="models per source")
+    parser.add_argument("--concurrency", type=int, default=4)
+    fake_upstreams.add_config_arguments(parser)
+    args = parser.parse_args()
+
+    fake_argv = [
+        "--latency-ms", str(args.latency_ms),
+        "--rate-limit", str(args.rate_limit),
+        "--file-size", str(args.file_size),
+        "--files-per-model", str(args.files_per_model),
+        "--instances-per-design", str(args.instances_per_design),
+        "--fail-every", str(args.fail_every),
+    ]
+    proc, base = start_fake(free_port(), fake_argv)
+
+    workdir = tempfile.mkdtemp(prefix="stlvault-import-")
+    os.environ.update(
+        {
+            "DB_PATH": os.path.join(workdir, "data.db"),
+            "FILE_STORAGE": os.path.join(workdir, "uploads"),
+            "MAKERWORLD_BAMBU_TOKEN": "bench-token",
+            "PRINTABLES_WEB_URL": base + "/",
+            "PRINTABLES_API_URL": base + "/graphql/",
+            "PRINTABLES_FILES_URL": base + "/",
+            "MAKERWORLD_API_BASE": base + "/v1",
+        }
+    )
+    os.makedirs(os.environ["FILE_STORAGE"], exist_ok=True)
+    import app
+
+    app.init_db()
+    sources = ["printables", "makerworld"] if args.source == "both" else [args.source]
+    jobs = []
+    for source in sources:
+        for i in range(args.imports):
+            model_id = 100000 + i
+            if source == "printables":
+                url = f"{base}/model/{model_id}-benchmark-part"
+            else:
+                url = f"https://makerworld.com/en/models/{model_id}"
+            jobs.append((source, url))
+
+    def run(job):
+        source, url = job
+        start = time.perf_counter()
+        options = app.import_model_options({"url": url})
+        resolved = time.perf_counter()
+        option = options[0]
+        model = app.import_model_by_id(
+            {
+                "source": source,
+                "id": option["id"],
+                "name": option["name"],
+                "parentId": option["parentId"],
+                "previewPath": option["previewPath"],
+                "typeName": option["typeName"],
+                "folderId": "1",
+            }
+        )
+        done = time.perf_counter()
+        return source, (resolved - start) * 1000, (done - resolved) * 1000, model["size"]
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    wall = time.perf_counter()
+    errors = 0
+    results = []
+    try:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            futures = [pool.submit(run, job) for job in jobs]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception:
+                    errors += 1
+        wall = time.perf_counter() - wall
+        server_stats = requests.get(base + "/__stats").json()
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+    report = {"config": vars(args), "wallSeconds": round(wall, 2), "errors": errors}
+    for source in sources:
+        mine = [r for r in results if r[0] == source]
+        options_ms = sorted(r[1] for r in mine)
+        import_ms = sorted(r[2] for r in mine)
+        report[source] = {
+            "imports": len(mine),
+            "importsPerSecond": round(len(mine) / wall, 2),
+            "bytes": sum(r[3] for r in mine),
+            "optionsP50Ms": round(percentile(options_ms, 50) or 0, 1),
+            "optionsP95Ms": round(percentile(options_ms, 95) or 0, 1),
+            "importP50Ms": round(percentile(import_ms, 50) or 0, 1),
+            "importP95Ms": round(percentile(import_ms, 95) or 0, 1),
+        }
+    # ru_maxrss is KiB on Linux
+    report["peakRssKb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report["peakRssGrowthKb"] = report["peakRssKb"] - rss_before
+    report["upstream"] = server_stats
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Serialization time and wire size of a GET /api/models listing.
+
+Compares the original path (json.loads per row, jsonable_encoder, stdlib
+json.dumps) with the orjson path, and the size of the body under each
+content encoding the server can negotiate.
+
+    python benchmarks/bench_listing.py --models 10000
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def seed(app, count, thumb_bytes):
+    rng = random.Random(42)
+    words = ["bracket", "gear", "mini", "tank", "hinge", "case", "terrain", "clip"]
+    conn = app.get_db_conn()
+    rows = []
+    for i in range(count):
+        mid = f"bench-{i:06d}"
+        thumb = "data:image/png;base64," + base64.b64encode(
+            rng.randbytes(thumb_bytes)
+        ).decode()
+        tags = rng.sample(words, 3)
+        rows.append(
+            (
+                mid,
+                f"{rng.choice(words)}_{i}.stl",
+                rng.choice(["1", "2", "3", "4"]),
+                f"/api/models/{mid}/download",
+                rng.randint(10_000, 50_000_000),
+                app.now_ms(),
+                json.dumps(tags),
+                "Imported from Printables" if i % 3 == 0 else "",
+                thumb,
+                app.now_ms(),
+            )
+        )
+    conn.executemany(
+        "INSERT INTO models(id,name,folderId,url,size,dateAdded,tags,description,thumbnail,updatedAt) VALUES (?,?,?,?,?,?,?,?,?,?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_row_to_model(row):
+    tags = []
+    if row["tags"]:
+        try:
+            tags = json.loads(row["tags"])
+        except Exception:
+            tags = []
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "folderId": row["folderId"],
+        "url": row["url"],
+        "size": row["size"],
+        "dateAdded": row["dateAdded"],
+        "tags": tags,
+        "description": row["description"] or "",
+        "thumbnail": row["thumbnail"],
+        "manual": row["manual"] if "manual" in row.keys() else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=10000)
+    parser.add_argument("--thumb-bytes", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stlvault-bench-")
+    os.environ["DB_PATH"] = os.path.join(workdir, "data.db")
+    os.environ["FILE_STORAGE"] = os.path.join(workdir, "uploads")
+    os.makedirs(os.environ["FILE_STORAGE"], exist_ok=True)
+
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+
+    import app
+    import compression
+
+    app.init_db()
+
+    seed(app, args.models, args.thumb_bytes)
+    conn = app.get_db_conn()
+    rows = conn.execute("SELECT * FROM models").fetchall()
+    conn.close()
+
+    def before():
+        content = jsonable_encoder([legacy_row_to_model(r) for r in rows])
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def after():
+        return orjson.dumps([app.row_to_model(r) for r in rows])
+
+    body = after()
+    results = {
+        "models": args.models,
+        "thumbBytes": args.thumb_bytes,
+        "serializeMs": {
+            "before": round(best_of(before, args.repeat) * 1000, 1),
+            "after": round(best_of(after, args.repeat) * 1000, 1),
+        },
+        "wireBytes": {"identity": len(body)},
+        "compressMs": {},
+    }
+    for name in compression.available_encodings():
+        def encode():
+            encoder = compression.make_encoder(name)
+            return encoder.compress(body) + encoder.finish()
+
+        results["compressMs"][name] = round(best_of(encode, args.repeat) * 1000, 1)
+        results["wireBytes"][name] = len(encode())
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Download throughput and backend CPU with and without FILE_OFFLOAD.
+
+Seeds a throwaway vault with `--files` models of `--size` bytes through
+`serve.py`, then runs `--downloads` downloads of them over `--connections`
+parallel connections and reports MB/s, requests/s and the CPU seconds the
+backend process used. Two setups:
+
+- direct: clients talk to the backend. Without offload it sends the files;
+  with FILE_OFFLOAD=x-accel-redirect it only answers with the header, so
+  this shows what authorizing a download costs a worker.
+- nginx (when an nginx binary is found, or given with --nginx): clients
+  talk to nginx running deploy/nginx/stlvault.conf, which proxies every
+  byte without offload and serves the files itself with it.
+
+    python benchmarks/bench_offload.py --files 20 --size 20000000 --downloads 200 --connections 8
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent.parent
+sys.path.insert(0, str(BENCH_DIR))
+import synthetic  # noqa: E402
+from load_test import Server, free_port, session  # noqa: E402
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def cpu_seconds(pid: int) -> float:
+    """utime + stime of `pid` and its live children."""
+    total = 0.0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fh:
+                fields = fh.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        # fields[1] is the ppid; utime and stime are fields 14 and 15 of stat
+        if int(entry) == pid or int(fields[1]) == pid:
+            total += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    return total
+
+
+def start_nginx(nginx: str, workdir: str, port: int, backend_port: int, uploads: str):
+    conf = (REPO_DIR / "deploy" / "nginx" / "stlvault.conf").read_text()
+    conf = (conf.replace("server backend:8080;", f"server 127.0.0.1:{backend_port};")
+                .replace("listen 8080;", f"listen 127.0.0.1:{port};")
+                .replace("alias /app/uploads/;", f"alias {uploads.rstrip('/')}/;"))
+    prefix = os.path.join(workdir, "nginx")
+    os.makedirs(prefix, exist_ok=True)
+    with open(os.path.join(prefix, "nginx.conf"), "w") as fh:
+        fh.write(f"""
+daemon off;
+worker_processes 1;
+pid {prefix}/nginx.pid;
+error_log {prefix}/error.log warn;
+events {{ worker_connections 1024; }}
+http {{
+    access_log off;
+    client_body_temp_path {prefix}/body;
+    proxy_temp_path {prefix}/proxy;
+    {conf}
+}}
+""")
+    proc = subprocess.Popen([nginx, "-p", prefix, "-c", "nginx.conf"])
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base + "/api/folders", timeout=1)
+            return proc, base
+        except requests.RequestException:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("nginx did not start")
+
+
+def download(url: str) -> int:
+    received = 0
+    with session().get(url, stream=True, timeout=600) as r:
+        r.raise_for_status()
+        for chunk in r.iter_content(1024 * 1024):
+            received += len(chunk)
+    return received
+
+
+def run(args, offload: bool, nginx=None):
+    workdir = tempfile.mkdtemp(prefix="stlvault-offload-")
+    env = {"FILE_OFFLOAD": "x-accel-redirect"} if offload else {}
+    # admission control would dominate; this measures the transfer
+    env.update({"DOWNLOAD_CONCURRENCY": "1000", "DOWNLOAD_CLIENT_CONCURRENCY": "1000"})
+    server = Server(workdir, free_port(), env)
+    proxy = None
+    try:
+        server.wait_ready()
+        body = synthetic.stl_of_size(args.size)
+        ids = [
+            session().post(
+                server.base + "/api/models/upload",
+                files={"file": (f"m{i}.stl", body)},
+                data={"folderId": "1"},
+            ).json()["id"]
+            for i in range(args.files)
+        ]
+        base = server.base
+        if nginx:
+            proxy, base = start_nginx(nginx, workdir, free_port(), server.port,
+                                      os.path.join(workdir, "uploads"))
+        urls = [f"{base}/api/models/{ids[i % len(ids)]}/download" for i in range(args.downloads)]
+        cpu_before = cpu_seconds(server.proc.pid)
+        proxy_before = cpu_seconds(proxy.pid) if proxy else 0.0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.connections) as pool:
+            received = sum(pool.map(download, urls))
+        seconds = time.perf_counter() - start
+        result = {
+            "seconds": round(seconds, 2),
+            "requestsPerSecond": round(args.downloads / seconds, 1),
+            "mbPerSecond": round(received / seconds / 1e6, 1),
+            "backendCpuSeconds": round(cpu_seconds(server.proc.pid) - cpu_before, 2),
+        }
+        if proxy:
+            result["nginxCpuSeconds"] = round(cpu_seconds(proxy.pid) - proxy_before, 2)
+        return result
+    finally:
+        if proxy:
+            proxy.terminate()
+            proxy.wait(10)
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--size", type=int, default=20_000_000)
+    parser.add_argument("--downloads", type=int, default=200)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--nginx", default=shutil.which("nginx"), help="nginx binary")
+    args = parser.parse_args()
+
+    report = {
+        "direct": {
+            "sentByPython": run(args, offload=False),
+            "headerOnly": run(args, offload=True),
+        },
+    }
+    if args.nginx:
+        report["nginx"] = {
+            "proxied": run(args, offload=False, nginx=args.nginx),
+            "offloaded": run(args, offload=True, nginx=args.nginx),
+        }
+    else:
+        report["nginx"] = "skipped: no nginx binary (use --nginx)"
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
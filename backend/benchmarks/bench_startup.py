@@ -0,0 +1,107 @@
+"""Cold start of the API: process spawn to first served request.
+
+Starts `serve.py` with one worker against a throwaway vault, polls
+`GET /api/folders` until it answers and `GET /api/ready` until warm-up is
+done, and stops the server; repeated `--runs` times, the first run on an
+empty database and the rest on the migrated one. Also times a bare
+`import app`. Exits non-zero when the median time to the first request is
+over `--budget-ms`, so it can gate CI.
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1500
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from load_test import free_port  # noqa: E402
+
+
+def status(port: int, path: str):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+    try:
+        conn.request("GET", path)
+        return conn.getresponse().status
+    except OSError:
+        return None
+    finally:
+        conn.close()
+
+
+def wait_for(proc, port: int, path: str, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        if status(port, path) == 200:
+            return time.perf_counter()
+        time.sleep(0.005)
+    raise RuntimeError(f"{path} did not answer 200 within {timeout} s")
+
+
+def cold_start(env) -> dict:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        first = wait_for(proc, port, "/api/folders")
+        ready = wait_for(proc, port, "/api/ready")
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    return {"firstRequestMs": (first - start) * 1000, "readyMs": (ready - start) * 1000}
+
+
+def import_time(env, runs: int) -> float:
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True)
+        return time.perf_counter() - start
+
+    bare = statistics.median(run("pass") for _ in range(runs))
+    return (statistics.median(run("import app") for _ in range(runs)) - bare) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stlvault-startup-")
+    env = dict(os.environ)
+    env["DB_PATH"] = os.path.join(workdir, "data.db")
+    env["FILE_STORAGE"] = os.path.join(workdir, "uploads")
+
+    runs = [cold_start(env) for _ in range(args.runs)]
+    first = [r["firstRequestMs"] for r in runs]
+    ready = [r["readyMs"] for r in runs]
+    median = statistics.median(first[1:] or first)
+    result = {
+        "importAppMs": round(import_time(env, args.runs), 1),
+        "emptyDatabase": {k: round(v, 1) for k, v in runs[0].items()},
+        "firstRequestMs": {"median": round(median, 1), "max": round(max(first), 1)},
+        "readyMs": {"median": round(statistics.median(ready), 1), "max": round(max(ready), 1)},
+        "budgetMs": args.budget_ms,
+        "withinBudget": median <= args.budget_ms,
+    }
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["withinBudget"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Server-side STEP tessellation cost.
+
+Builds plates with an increasing number of drilled holes with OpenCascade,
+writes them as STEP and runs each through `stepmesh.mesh_step` (a child
+process with the production time and memory limits), reporting triangles,
+the time spent tessellating in the child, the job's wall time including the
+process start, and the STEP vs cached STL sizes. This is the one-off cost
+per upload; every later view is a plain STL download.
+
+    python benchmarks/bench_step.py --holes 4 16 32 --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import stepmesh  # noqa: E402
+
+
+def make_plate(path: str, holes: int):
+    from OCP.BRepAlgoAPI import BRepAlgoAPI_Cut
+    from OCP.BRepPrimAPI import BRepPrimAPI_MakeBox, BRepPrimAPI_MakeCylinder
+    from OCP.gp import gp_Ax2, gp_Dir, gp_Pnt
+    from OCP.STEPControl import STEPControl_AsIs, STEPControl_Writer
+
+    pitch = 12.0
+    side = holes * pitch + 4
+    shape = BRepPrimAPI_MakeBox(side, side, 5).Shape()
+    for i in range(holes):
+        for j in range(holes):
+            axis = gp_Ax2(gp_Pnt(8 + i * pitch, 8 + j * pitch, -1), gp_Dir(0, 0, 1))
+            shape = BRepAlgoAPI_Cut(shape, BRepPrimAPI_MakeCylinder(axis, 4, 10).Shape()).Shape()
+    writer = STEPControl_Writer()
+    writer.Transfer(shape, STEPControl_AsIs)
+    writer.Write(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--holes", type=int, nargs="+", default=[4, 16, 32],
+                        help="holes per side of each plate")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--memory-mb", type=int, default=2048)
+    args = parser.parse_args()
+
+    if not stepmesh.available():
+        sys.exit("OCP is not installed (pip install cadquery-ocp)")
+    workdir = tempfile.mkdtemp(prefix="stlvault-step-")
+    rows = []
+    for holes in args.holes:
+        src = os.path.join(workdir, f"plate{holes}.step")
+        dest = os.path.join(workdir, f"plate{holes}.stl")
+        make_plate(src, holes)
+        tessellate, wall = [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = stepmesh.mesh_step(src, dest, args.timeout, args.memory_mb)
+            wall.append(time.perf_counter() - start)
+            tessellate.append(result["seconds"])
+        rows.append({
+            "holes": holes * holes,
+            "triangles": result["triangles"],
+            "stepBytes": os.path.getsize(src),
+            "stlBytes": os.path.getsize(dest),
+            "tessellateMs": round(statistics.median(tessellate) * 1000, 1),
+            "jobMs": round(statistics.median(wall) * 1000, 1),
+        })
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
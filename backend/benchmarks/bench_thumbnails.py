@@ -0,0 +1,114 @@
+"""Bytes and time to fill a grid of model cards.
+
+Uploads `--models` models into a throwaway vault, each with a 300 px PNG
+thumbnail like the ones the browser renders (shaded isometric views made by
+`stepmesh.render_thumbnail`), then loads the grid two ways: the listing with
+thumbnails inlined as base64 data URLs, and the listing without them plus
+one `POST /api/thumbnails` for all the cards, before and after the cache
+has been filled.
+
+    python benchmarks/bench_thumbnails.py --models 200 --runs 5
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synthetic  # noqa: E402
+
+
+def thumbnail(seed: int) -> str:
+    import stepmesh
+
+    body = synthetic.binary_stl(2000, seed)
+    tris = np.frombuffer(body[84:], dtype=np.dtype([
+        ("normal", "<f4", 3), ("v", "<f4", (3, 3)), ("attr", "<u2")]))["v"]
+    png = stepmesh.render_thumbnail(tris, size=300, seed=seed)
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def timed(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        size = fn()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1000, 1), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20, help="different thumbnails")
+    parser.add_argument("--size", type=int, default=256, help="grid thumbnail size")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stlvault-thumbnails-")
+    os.environ["DB_PATH"] = os.path.join(workdir, "data.db")
+    os.environ["FILE_STORAGE"] = os.path.join(workdir, "uploads")
+    os.environ["SCRUB_INTERVAL_HOURS"] = "0"
+    from fastapi.testclient import TestClient
+
+    import app
+    import thumbnails
+
+    images = [thumbnail(i) for i in range(args.distinct)]
+    stl = synthetic.binary_stl(10)
+    with TestClient(app.app) as client:
+        for i in range(args.models):
+            client.post(
+                "/api/models/upload",
+                files={"file": (f"m{i}.stl", stl)},
+                data={"folderId": "1", "thumbnail": images[i % args.distinct]},
+            ).raise_for_status()
+
+        def inline():
+            r = client.get("/api/models", headers={"Accept-Encoding": "identity"})
+            r.raise_for_status()
+            return len(r.content)
+
+        def batched():
+            r = client.get("/api/models?thumbnails=0", headers={"Accept-Encoding": "identity"})
+            r.raise_for_status()
+            ids = [m["id"] for m in r.json()]
+            t = client.post("/api/thumbnails", json={"ids": ids, "size": args.size})
+            t.raise_for_status()
+            return len(r.content) + len(t.content)
+
+        def clear_cache():
+            conn = app.get_db_conn()
+            conn.execute("DELETE FROM thumbnail_cache")
+            conn.commit()
+            conn.close()
+
+        inline_ms, inline_bytes = timed(inline, args.runs)
+        cold = []
+        for _ in range(args.runs):
+            clear_cache()
+            ms, cold_bytes = timed(batched, 1)
+            cold.append(ms)
+        warm_ms, warm_bytes = timed(batched, args.runs)
+
+    print(json.dumps({
+        "models": args.models,
+        "pillow": thumbnails.available(),
+        "inline": {"requests": 1, "bytes": inline_bytes, "ms": inline_ms},
+        "batchedCold": {"requests": 2, "bytes": cold_bytes, "ms": statistics.median(cold)},
+        "batchedWarm": {"requests": 2, "bytes": warm_bytes, "ms": warm_ms},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Replace latency and disk use of the version history.
+
+Uploads `--models` models of `--size` bytes into a throwaway vault, then
+replaces each one `--replaces` times through `PUT /api/models/{id}/file`,
+cycling through `--distinct` different contents per model, so re-exports
+that come back to an earlier file are common. Reports replace latency
+percentiles, the time one collection pass takes, and the bytes the history
+holds against what storing every version separately would cost.
+
+    python benchmarks/bench_versions.py --models 20 --replaces 20 --size 5000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from load_test import percentile  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=20)
+    parser.add_argument("--replaces", type=int, default=20)
+    parser.add_argument("--distinct", type=int, default=4)
+    parser.add_argument("--size", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stlvault-versions-")
+    os.environ["DB_PATH"] = os.path.join(workdir, "data.db")
+    os.environ["FILE_STORAGE"] = os.path.join(workdir, "uploads")
+    os.environ["VERSION_KEEP"] = "0"
+    os.environ["SCRUB_INTERVAL_HOURS"] = "0"
+    from fastapi.testclient import TestClient
+
+    import app
+
+    contents = [synthetic.stl_of_size(args.size, seed=i) for i in range(args.distinct)]
+    latencies = []
+    with TestClient(app.app) as client:
+        ids = [
+            client.post(
+                "/api/models/upload",
+                files={"file": (f"m{i}.stl", contents[0])},
+                data={"folderId": "1"},
+            ).json()["id"]
+            for i in range(args.models)
+        ]
+        for n in range(1, args.replaces + 1):
+            body = contents[n % args.distinct]
+            for mid in ids:
+                start = time.perf_counter()
+                r = client.put(f"/api/models/{mid}/file", files={"file": ("m.stl", body)})
+                latencies.append(time.perf_counter() - start)
+                r.raise_for_status()
+        start = time.perf_counter()
+        app.collect_versions()
+        collect_seconds = time.perf_counter() - start
+        usage = client.get("/api/storage-stats").json()["versions"]
+
+    latencies.sort()
+    print(json.dumps({
+        "replaces": len(latencies),
+        "replaceMs": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1),
+        },
+        "collectMs": round(collect_seconds * 1000, 1),
+        "historyBytes": usage["stored"],
+        "withoutDedupBytes": usage["logical"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Local stand-in for the Printables and MakerWorld (Bambu) endpoints the
+importers talk to, with injectable latency, rate limiting and file sizes.
+
+    python benchmarks/fake_upstreams.py --port 9100 --latency-ms 80 --file-size 50000000
+
+prints the environment variables that point the backend at it. Routes:
+
+    GET  /                                       Printables landing page with data-client-uid
+    GET  /model/<id>-<slug>                      Printables model page
+    POST /graphql/                               MODELQUERY (ModelFiles) and FILEQUERY (GetDownloadLink)
+    GET  /v1/design-service/design/<id>          MakerWorld design with instances
+    GET  /v1/iot-service/api/user/profile/<pid>  MakerWorld download link (needs a Bearer token)
+    GET  /files/<name>                           generated file body of --file-size bytes
+    GET  /media/<name>                           preview image
+    GET  /__stats                                request, 429 and byte counters as JSON
+"""
+import argparse
+import json
+import math
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import synthetic  # noqa: E402
+
+CLIENT_UID = "0f8d9c1e-5b7a-4c3e-9a21-bench000000"
+PNG_1PX = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+CHUNK = 256 * 1024
+
+
+class Config:
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        rate_limit: float = 0.0,
+        file_size: int = 1_000_000,
+        files_per_model: int = 4,
+        instances_per_design: int = 2,
+        fail_every: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.rate_limit = rate_limit
+        self.file_size = file_size
+        self.files_per_model = files_per_model
+        self.instances_per_design = instances_per_design
+        self.fail_every = fail_every
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.bytes_sent = 0
+        self.by_route = {}
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "rateLimited": self.rate_limited,
+                "failed": self.failed,
+                "bytesSent": self.bytes_sent,
+                "byRoute": dict(self.by_route),
+            }
+
+
+class TokenBucket:
+    """Requests per second across all clients; 0 disables limiting."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        """0 when allowed, otherwise seconds until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeUpstreams"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- plumbing ---
+    def _base(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def _route(self, name):
+        stats = self.server.stats
+        with stats.lock:
+            stats.requests += 1
+            stats.by_route[name] = stats.by_route.get(name, 0) + 1
+            count = stats.requests
+        cfg = self.server.config
+        if cfg.latency_ms:
+            time.sleep(cfg.latency_ms / 1000)
+        if name != "stats":
+            wait = self.server.bucket.take()
+            if wait:
+                with stats.lock:
+                    stats.rate_limited += 1
+                retry_after = {"Retry-After": str(math.ceil(wait))}
+                self._send(429, b"rate limited", "text/plain", retry_after)
+                return False
+            if cfg.fail_every and count % cfg.fail_every == 0:
+                with stats.lock:
+                    stats.failed += 1
+                self._send(503, b"unavailable", "text/plain")
+                return False
+        return True
+
+    def _send(self, status, body: bytes, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.stats.lock:
+            self.server.stats.bytes_sent += len(body)
+
+    def _json(self, payload, status=200):
+        self._send(status, json.dumps(payload).encode(), "application/json")
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    # --- routes ---
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if path == "/__stats":
+            self._route("stats")
+            return self._json(self.server.stats.as_dict())
+        if path == "/" or path.startswith("/model/"):
+            if not self._route("client-uid"):
+                return
+            html = f'<html><body data-client-uid="{CLIENT_UID}"></body></html>'
+            return self._send(200, html.encode(), "text/html")
+        match = re.match(r"^/v1/design-service/design/(\d+)$", path)
+        if match:
+            if not self._route("design-service"):
+                return
+            return self._json({"data": self._design(match.group(1))})
+        match = re.match(r"^/v1/iot-service/api/user/profile/(\d+)$", path)
+        if match:
+            if not self._route("iot-service"):
+                return
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                return self._json({"message": "unauthorized"}, 401)
+            model_id = parse_qs(parsed.query).get("model_id", [""])[0]
+            url = f"{self._base()}/files/mw-{model_id}-{match.group(1)}.3mf"
+            return self._json({"data": {"name": f"{match.group(1)}.3mf", "url": url}})
+        if path.startswith("/files/"):
+            if not self._route("file"):
+                return
+            return self._stream_file(path.rsplit("/", 1)[-1])
+        if path.startswith("/media/"):
+            if not self._route("media"):
+                return
+            return self._send(200, PNG_1PX, "image/png")
+        self._json({"message": "not found"}, 404)
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/graphql":
+            return self._json({"message": "not found"}, 404)
+        payload = self._read_json()
+        query = payload.get("query", "")
+        variables = payload.get("variables", {})
+        if "GetDownloadLink" in query:
+            if not self._route("graphql-file"):
+                return
+            link = f"{self._base()}/files/pr-{variables.get('modelId')}-{variables.get('id')}.stl"
+            return self._json(
+                {
+                    "data": {
+                        "getDownloadLink": {
+                            "ok": True,
+                            "errors": [],
+                            "output": {"link": link, "count": 1, "ttl": 60},
+                        }
+                    }
+                }
+            )
+        if not self._route("graphql-model"):
+            return
+        model_id = str(variables.get("id"))
+        stls = [
+            {
+                "id": f"{model_id}{i:03d}",
+                "name": f"part_{i}.stl",
+                "folder": "",
+                "filePreviewPath": f"media/{model_id}_{i}.png",
+            }
+            for i in range(self.server.config.files_per_model)
+        ]
+        self._json({"data": {"model": {"id": model_id, "stls": stls}}})
+
+    def _design(self, model_id):
+        base = self._base()
+        return {
+            "id": int(model_id),
+            "modelId": f"US{model_id}",
+            "title": f"Benchmark design {model_id}",
+            "cover": f"{base}/media/cover_{model_id}.png",
+            "instances": [
+                {
+                    "id": int(model_id) * 10 + i,
+                    "profileId": int(model_id) * 100 + i,
+                    "name": f"Plate set {i}",
+                    "cover": f"{base}/media/inst_{model_id}_{i}.png",
+                }
+                for i in range(self.server.config.instances_per_design)
+            ],
+        }
+
+    def _stream_file(self, name):
+        size = self.server.config.file_size
+        block = self.server.file_block
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.send_header("Content-Disposition", f'attachment; filename="{name}"')
+        self.end_headers()
+        sent = 0
+        while sent < size:
+            piece = block[: min(len(block), size - sent)]
+            self.wfile.write(piece)
+            sent += len(piece)
+        with self.server.stats.lock:
+            self.server.stats.bytes_sent += sent
+
+
+class FakeUpstreams(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, config: Config = None):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.config = config or Config()
+        self.stats = Stats()
+        self.bucket = TokenBucket(self.config.rate_limit)
+        # one STL-shaped block repeated for large bodies, generated once
+        self.file_block = synthetic.stl_of_size(CHUNK)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def env(self):
+        """Environment that points the importers at this server."""
+        base = self.base_url
+        return {
+            "PRINTABLES_WEB_URL": base + "/",
+            "PRINTABLES_API_URL": base + "/graphql/",
+            "PRINTABLES_FILES_URL": base + "/",
+            "MAKERWORLD_API_BASE": base + "/v1",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/s, 0 = off")
+    parser.add_argument("--file-size", type=int, default=1_000_000, help="bytes per file")
+    parser.add_argument("--files-per-model", type=int, default=4)
+    parser.add_argument("--instances-per-design", type=int, default=2)
+    parser.add_argument("--fail-every", type=int, default=0, help="503 every Nth request")
+
+
+def config_from_args(args) -> Config:
+    return Config(
+        latency_ms=args.latency_ms,
+        rate_limit=args.rate_limit,
+        file_size=args.file_size,
+        files_per_model=args.files_per_model,
+        instances_per_design=args.instances_per_design,
+        fail_every=args.fail_every,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    server = FakeUpstreams(args.port, config_from_args(args))
+    for key, value in server.env().items():
+        print(f"export {key}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
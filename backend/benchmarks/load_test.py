@@ -0,0 +1,350 @@
+"""Load test for the backend API against a local uvicorn.
+
+Starts the app in a subprocess on a throwaway vault, seeds folders and models
+through the real endpoints (`init_db` runs on startup, files go through
+`/api/models/upload`), then drives each scenario with concurrent clients and
+prints throughput, latency percentiles and the server's peak RSS as JSON.
+
+    python benchmarks/load_test.py --models 2000 --concurrency 16
+    python benchmarks/load_test.py --output new.json --baseline old.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import synthetic  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_kb(pid: int):
+    """VmHWM of the server process; None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Server:
+    def __init__(self, workdir: str, port: int, extra_env=None, workers: int = 1):
+        self.port = port
+        self.base = f"http://127.0.0.1:{port}"
+        env = dict(os.environ)
+        env["DB_PATH"] = os.path.join(workdir, "data.db")
+        env["FILE_STORAGE"] = os.path.join(workdir, "uploads")
+        env.update(extra_env or {})
+        os.makedirs(env["FILE_STORAGE"], exist_ok=True)
+        self.started_at = time.perf_counter()
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, "serve.py",
+                "--host", "127.0.0.1", "--port", str(port),
+                "--workers", str(workers), "--log-level", "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+
+    def wait_ready(self, timeout: float = 30.0) -> float:
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                if requests.get(self.base + "/api/folders", timeout=1).ok:
+                    return time.perf_counter() - self.started_at
+            except requests.RequestException:
+                time.sleep(0.05)
+        raise RuntimeError("server did not become ready")
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+_local = threading.local()
+
+
+def session() -> requests.Session:
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def seed_vault(base, folders, models, tags, min_size, max_size, concurrency):
+    rng = random.Random(1)
+    folder_ids = []
+    parent = None
+    for i in range(folders):
+        # every fourth folder nests under the previous one
+        res = session().post(
+            base + "/api/folders",
+            json={"name": f"Folder {i}", "parentId": parent if i % 4 == 3 else None},
+        )
+        res.raise_for_status()
+        parent = res.json()["id"]
+        folder_ids.append(parent)
+
+    # a small pool of bodies keeps generation cheap while sizes still vary
+    bodies = [
+        synthetic.stl_of_size(rng.randint(min_size, max_size), seed=i)
+        for i in range(min(models, 16))
+    ]
+    jobs = [
+        (
+            f"{rng.choice(synthetic.WORDS)}_{i}.stl",
+            bodies[i % len(bodies)],
+            rng.choice(folder_ids),
+            synthetic.random_tags(rng, tags),
+        )
+        for i in range(models)
+    ]
+
+    def upload(job):
+        name, body, folder_id, tag_list = job
+        res = session().post(
+            base + "/api/models/upload",
+            files={"file": (name, body, "application/octet-stream")},
+            data={"folderId": folder_id, "tags": json.dumps(tag_list)},
+        )
+        res.raise_for_status()
+        return res.json()["id"]
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        model_ids = list(pool.map(upload, jobs))
+    return folder_ids, model_ids, bodies
+
+
+def run_scenario(name, make_request, requests_count, concurrency, pid):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            res = make_request(i)
+            ok = res.status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(requests_count)))
+    wall = time.perf_counter() - wall
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": requests_count,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughputRps": round(requests_count / wall, 1),
+        "p50Ms": round(percentile(latencies, 50), 2),
+        "p95Ms": round(percentile(latencies, 95), 2),
+        "p99Ms": round(percentile(latencies, 99), 2),
+        "peakRssKb": peak_rss_kb(pid),
+    }
+
+
+_etag_cache = {}
+
+
+def _etag(base):
+    if base not in _etag_cache:
+        _etag_cache[base] = requests.get(base + "/api/models").headers.get("etag", "")
+    return _etag_cache[base]
+
+
+def build_scenarios(base, folder_ids, model_ids, bodies, batch):
+    rng = random.Random(2)
+
+    def ids_batch():
+        return rng.sample(model_ids, min(batch, len(model_ids)))
+
+    return [
+        ("list_models", lambda i: session().get(base + "/api/models")),
+        (
+            "list_models_folder",
+            lambda i: session().get(
+                base + "/api/models", params={"folderId": rng.choice(folder_ids)}
+            ),
+        ),
+        (
+            "list_models_revalidate",
+            lambda i: session().get(
+                base + "/api/models", headers={"If-None-Match": _etag(base)}
+            ),
+        ),
+        (
+            "download",
+            lambda i: session().get(
+                base + f"/api/models/{rng.choice(model_ids)}/download"
+            ),
+        ),
+        (
+            "upload",
+            lambda i: session().post(
+                base + "/api/models/upload",
+                files={"file": (f"load_{i}.stl", bodies[i % len(bodies)])},
+                data={"folderId": rng.choice(folder_ids)},
+            ),
+        ),
+        (
+            "bulk_tag",
+            lambda i: session().post(
+                base + "/api/models/bulk-tag",
+                json={"ids": ids_batch(), "tags": ["bench"]},
+            ),
+        ),
+        (
+            "bulk_move",
+            lambda i: session().post(
+                base + "/api/models/bulk-move",
+                json={"ids": ids_batch(), "folderId": rng.choice(folder_ids)},
+            ),
+        ),
+        ("storage_stats", lambda i: session().get(base + "/api/storage-stats")),
+    ]
+
+
+def compare(results, baseline):
+    """Relative change per scenario against a previous run's JSON."""
+    previous = {s["scenario"]: s for s in baseline.get("scenarios", [])}
+    out = {}
+    for s in results["scenarios"]:
+        old = previous.get(s["scenario"])
+        if not old:
+            continue
+        out[s["scenario"]] = {
+            key: round((s[key] - old[key]) / old[key] * 100, 1)
+            for key in ("throughputRps", "p50Ms", "p95Ms", "p99Ms")
+            if old.get(key)
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folders", type=int, default=20)
+    parser.add_argument("--models", type=int, default=1000)
+    parser.add_argument("--tags", type=int, default=3, help="tags per model")
+    parser.add_argument("--min-size", type=int, default=10_000, help="STL bytes")
+    parser.add_argument("--max-size", type=int, default=2_000_000, help="STL bytes")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="per scenario")
+    parser.add_argument("--batch", type=int, default=50, help="ids per bulk op")
+    parser.add_argument("--scenarios", help="comma separated subset to run")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="server processes")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stlvault-load-")
+    server = Server(workdir, args.port or free_port(), workers=args.workers)
+    try:
+        startup = server.wait_ready()
+        seed_start = time.perf_counter()
+        folder_ids, model_ids, bodies = seed_vault(
+            server.base, args.folders, args.models, args.tags,
+            args.min_size, args.max_size, args.concurrency,
+        )
+        seed_seconds = time.perf_counter() - seed_start
+
+        wanted = set(args.scenarios.split(",")) if args.scenarios else None
+        scenarios = []
+        for name, make_request in build_scenarios(
+            server.base, folder_ids, model_ids, bodies, args.batch
+        ):
+            if wanted and name not in wanted:
+                continue
+            scenarios.append(
+                run_scenario(
+                    name, make_request, args.requests, args.concurrency, server.proc.pid
+                )
+            )
+
+        # bulk delete last, in batches over the seeded models
+        if not wanted or "bulk_delete" in wanted:
+            chunks = [
+                model_ids[i:i + args.batch] for i in range(0, len(model_ids), args.batch)
+            ]
+            scenarios.append(
+                run_scenario(
+                    "bulk_delete",
+                    lambda i: session().post(
+                        server.base + "/api/models/bulk-delete", json={"ids": chunks[i]}
+                    ),
+                    len(chunks),
+                    args.concurrency,
+                    server.proc.pid,
+                )
+            )
+
+        results = {
+            "config": vars(args),
+            "startupSeconds": round(startup, 3),
+            "seed": {
+                "folders": len(folder_ids),
+                "models": len(model_ids),
+                "seconds": round(seed_seconds, 2),
+                "uploadsPerSecond": round(len(model_ids) / seed_seconds, 1),
+            },
+            "scenarios": scenarios,
+            "peakRssKb": peak_rss_kb(server.proc.pid),
+        }
+        if args.baseline:
+            with open(args.baseline) as fh:
+                results["changePercent"] = compare(results, json.load(fh))
+    finally:
+        server.stop()
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Synthetic vault content shared by the benchmark scripts."""
+import math
+import random
+import struct
+
+WORDS = [
+    "bracket", "gear", "mini", "tank", "hinge", "case", "terrain", "clip",
+    "mount", "knob", "spool", "tower", "wheel", "dragon", "vase", "lid",
+]
+
+
+def binary_stl(triangles: int, seed: int = 0) -> bytes:
+    """A valid binary STL of a wobbly sphere with `triangles` facets."""
+    rng = random.Random(seed)
+    out = bytearray(b"STLVault synthetic".ljust(80, b" "))
+    out += struct.pack("<I", triangles)
+    facet = struct.Struct("<12fH")
+    for i in range(triangles):
+        theta = 2 * math.pi * i / max(triangles, 1)
+        r = 10 + rng.random()
+        v = [
+            (r * math.cos(theta), r * math.sin(theta), rng.uniform(-r, r)),
+            (r * math.cos(theta + 0.01), r * math.sin(theta + 0.01), rng.uniform(-r, r)),
+            (0.0, 0.0, rng.uniform(-r, r)),
+        ]
+        out += facet.pack(0.0, 0.0, 1.0, *v[0], *v[1], *v[2], 0)
+    return bytes(out)
+
+
+def stl_of_size(size_bytes: int, seed: int = 0) -> bytes:
+    return binary_stl(max(1, (size_bytes - 84) // 50), seed)
+
+
+def random_tags(rng: random.Random, count: int):
+    return rng.sample(WORDS, min(count, len(WORDS)))
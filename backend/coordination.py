@@ -0,0 +1,134 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, List, Optional, Set
+
+import db
+
+log = logging.getLogger(__name__)
+
+# unique per process, also across replicas that share the database
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class Coordinator:
+    """Heartbeats this process into the `workers` table and elects one
+    leader through a lease row in `leases`.
+
+    Every process (uvicorn worker or replica) runs one. The leader renews
+    its lease every `heartbeat` seconds; if it dies, another process takes
+    over once the lease has been expired for `lease_seconds`. Background
+    work that must run once per deployment is started in `on_elected` and
+    stopped in `on_demoted`. A failed renew is retried every `retry`
+    seconds, and the leader keeps its role until its lease has actually
+    expired, so one "database is locked" doesn't restart the background work.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        lease_seconds: float = 30.0,
+        heartbeat: float = 5.0,
+        retry: float = 1.0,
+        on_elected: Optional[List[Callable[[], None]]] = None,
+        on_demoted: Optional[List[Callable[[], None]]] = None,
+    ):
+        self.connect = connect
+        self.lease_ms = int(lease_seconds * 1000)
+        self.heartbeat = heartbeat
+        self.retry = retry
+        self.on_elected = on_elected if on_elected is not None else []
+        self.on_demoted = on_demoted if on_demoted is not None else []
+        self.is_leader = False
+        # when the lease we last wrote runs out (ms); 0 when not leader
+        self.lease_expiry = 0
+        self._failing = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._tick()
+        self._thread = threading.Thread(target=self._run, name="coordinator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.heartbeat + 5)
+        if self.is_leader:
+            self._set_leader(False)
+        try:
+            conn = self.connect()
+            conn.execute("DELETE FROM workers WHERE id=?", (INSTANCE_ID,))
+            conn.execute(
+                "UPDATE leases SET expiresAt=0 WHERE name='leader' AND owner=?", (INSTANCE_ID,)
+            )
+            conn.commit()
+            conn.close()
+        except db.Error:
+            pass
+
+    def live_workers(self, cur) -> Set[str]:
+        horizon = now_ms() - self.lease_ms
+        return {
+            r[0] for r in cur.execute("SELECT id FROM workers WHERE heartbeatAt >= ?", (horizon,))
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.retry if self._failing else self.heartbeat):
+            self._tick()
+
+    def _tick(self):
+        try:
+            leader = self._renew()
+            self._failing = False
+        except db.Error as e:
+            # the lease we hold is still ours until it expires; step down
+            # only then, and try again soon
+            log.warning("coordination heartbeat failed: %s", e)
+            self._failing = True
+            leader = self.is_leader and now_ms() < self.lease_expiry
+        if leader != self.is_leader:
+            self._set_leader(leader)
+
+    def _renew(self) -> bool:
+        ts = now_ms()
+        conn = self.connect()
+        try:
+            conn.execute(
+                "INSERT INTO workers(id,host,pid,startedAt,heartbeatAt) VALUES (?,?,?,?,?) "
+                "ON CONFLICT(id) DO UPDATE SET heartbeatAt=excluded.heartbeatAt",
+                (INSTANCE_ID, socket.gethostname(), os.getpid(), ts, ts),
+            )
+            conn.execute(
+                "INSERT INTO leases(name,owner,expiresAt) VALUES ('leader',?,?) "
+                "ON CONFLICT(name) DO UPDATE SET owner=excluded.owner, expiresAt=excluded.expiresAt "
+                "WHERE leases.owner=excluded.owner OR leases.expiresAt < ?",
+                (INSTANCE_ID, ts + self.lease_ms, ts),
+            )
+            # forget workers that stopped heartbeating long ago
+            conn.execute("DELETE FROM workers WHERE heartbeatAt < ?", (ts - 10 * self.lease_ms,))
+            owner = conn.execute("SELECT owner FROM leases WHERE name='leader'").fetchone()[0]
+            conn.commit()
+        finally:
+            conn.close()
+        # counted from before the write, so never later than the stored expiry
+        self.lease_expiry = ts + self.lease_ms if owner == INSTANCE_ID else 0
+        return owner == INSTANCE_ID
+
+    def _set_leader(self, leader: bool):
+        self.is_leader = leader
+        log.info("%s %s leadership", INSTANCE_ID, "acquired" if leader else "released")
+        for callback in self.on_elected if leader else self.on_demoted:
+            try:
+                callback()
+            except Exception:
+                log.exception("leadership callback failed")
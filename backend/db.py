@@ -0,0 +1,319 @@
+"""Database connections: SQLite by default, PostgreSQL with DATABASE_URL.
+
+The app's SQL is written once, in the dialect both databases share, with
+SQLite's `?` placeholders. On PostgreSQL every statement is translated once
+and the result cached:
+
+- `?` becomes `%s`, and literal `%` is escaped. SQLite's null-safe `IS ?`
+  becomes `IS NOT DISTINCT FROM %s`.
+- `BEGIN IMMEDIATE` and `BEGIN EXCLUSIVE` become a transaction-scoped
+  advisory lock. Writers that rely on SQLite's single write lock (file
+  swaps, version GC, migrations) stay serialized against each other. Every
+  other write only takes row locks.
+- In CREATE/ALTER TABLE, INTEGER becomes BIGINT (timestamps are in ms),
+  REAL becomes DOUBLE PRECISION and BLOB becomes BYTEA. ADD COLUMN gets IF
+  NOT EXISTS, because a failed statement aborts a PostgreSQL transaction.
+
+Connections come from a per-process pool (psycopg_pool). `close()` returns
+one to the pool, so callers keep the SQLite pattern of one connection per
+call. As with the sqlite3 module, a transaction starts implicitly only
+before INSERT/UPDATE/DELETE. Reads run in autocommit, so a connection
+returned after reads needs no rollback. Rows behave like sqlite3.Row:
+by index, or by case-insensitive column name. PostgreSQL folds the
+unquoted camelCase names to lower case.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# connections per process; each uvicorn worker has its own pool
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+# seconds a request waits for a free pooled connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# values per statement for IN (...) lists on SQLite; PostgreSQL takes one array
+SQLITE_BATCH = 500
+# advisory lock key standing in for SQLite's database write lock
+WRITE_LOCK = 0x57A7
+
+try:
+    import psycopg
+    from psycopg import pq
+    from psycopg.adapt import Loader
+    from psycopg_pool import ConnectionPool
+except ImportError:  # optional; only needed for a PostgreSQL DATABASE_URL
+    psycopg = None
+
+if psycopg is not None:
+    Error: Tuple[type, ...] = (sqlite3.Error, psycopg.Error)
+    IntegrityError: Tuple[type, ...] = (sqlite3.IntegrityError, psycopg.IntegrityError)
+else:
+    Error = (sqlite3.Error,)
+    IntegrityError = (sqlite3.IntegrityError,)
+
+# set by configure()
+DATABASE_URL = ""
+POSTGRES = False
+# case-insensitive LIKE, as SQLite's LIKE is for ASCII
+LIKE = "LIKE"
+
+
+def nocase_equals(column: str) -> str:
+    """`column = ?`, ignoring case; matches the idx_models_printer index."""
+    return f"lower({column})=lower(?)" if POSTGRES else f"{column}=? COLLATE NOCASE"
+
+
+def in_list(values: Sequence[Any]) -> Tuple[str, Tuple[Any, ...]]:
+    """SQL and parameters for `column <sql>` matching any of `values`."""
+    if POSTGRES:
+        return "= ANY(?)", (list(values),)
+    return f"IN ({','.join('?' * len(values))})", tuple(values)
+
+
+def batches(values: Sequence[Any]) -> Iterator[Sequence[Any]]:
+    """`values`, sorted, in slices small enough for one `in_list`. Sorted,
+    so concurrent bulk writes lock rows in the same order and can't
+    deadlock on PostgreSQL."""
+    values = sorted(set(values))
+    size = (len(values) or 1) if POSTGRES else SQLITE_BATCH
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def schema_version(cur) -> int:
+    if not POSTGRES:
+        return cur.execute("PRAGMA user_version").fetchone()[0]
+    if cur.execute("SELECT to_regclass('schema_version')").fetchone()[0] is None:
+        return 0
+    row = cur.execute("SELECT version FROM schema_version").fetchone()
+    return row[0] if row else 0
+
+
+def set_schema_version(cur, version: int):
+    if not POSTGRES:
+        cur.execute(f"PRAGMA user_version={int(version)}")
+        return
+    cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    cur.execute("DELETE FROM schema_version")
+    cur.execute("INSERT INTO schema_version(version) VALUES (?)", (version,))
+
+
+# --- PostgreSQL ---
+_PLACEHOLDER_SPLIT = re.compile(r"('(?:[^']|'')*')")
+_DDL_TYPES = (
+    (re.compile(r"\bINTEGER PRIMARY KEY AUTOINCREMENT\b", re.I),
+     "BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY"),
+    (re.compile(r"\bINTEGER\b", re.I), "BIGINT"),
+    (re.compile(r"\bREAL\b", re.I), "DOUBLE PRECISION"),
+    (re.compile(r"\bBLOB\b", re.I), "BYTEA"),
+    (re.compile(r"\bADD COLUMN\b(?! IF NOT EXISTS)", re.I), "ADD COLUMN IF NOT EXISTS"),
+)
+_NULL_SAFE = re.compile(r"\bIS\s+(NOT\s+)?\?")
+_WRITES = ("INSERT", "UPDATE", "DELETE")
+
+
+@lru_cache(maxsize=2048)
+def translate(sql: str) -> Tuple[str, bool]:
+    """PostgreSQL text of an app statement, and whether it writes (and so
+    must run inside a transaction)."""
+    head = sql.lstrip()[:24].upper()
+    if head.startswith(("BEGIN IMMEDIATE", "BEGIN EXCLUSIVE")):
+        return f"SELECT pg_advisory_xact_lock({WRITE_LOCK})", True
+    if head.startswith(("CREATE TABLE", "ALTER TABLE")):
+        for pattern, replacement in _DDL_TYPES:
+            sql = pattern.sub(replacement, sql)
+    parts = _PLACEHOLDER_SPLIT.split(sql)
+    for i, part in enumerate(parts):
+        part = part.replace("%", "%%")
+        # odd parts are string literals
+        if not i % 2:
+            part = _NULL_SAFE.sub(
+                lambda m: "IS DISTINCT FROM ?" if m.group(1) else "IS NOT DISTINCT FROM ?", part
+            ).replace("?", "%s")
+        parts[i] = part
+    return "".join(parts), head.startswith(_WRITES)
+
+
+class Row(tuple):
+    """sqlite3.Row for PostgreSQL results."""
+
+    __slots__ = ()
+    _names: Tuple[str, ...] = ()
+    _index: Dict[str, int] = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key.lower()])
+        return tuple.__getitem__(self, key)
+
+    def keys(self) -> List[str]:
+        return list(self._names)
+
+
+@lru_cache(maxsize=256)
+def _row_class(names: Tuple[str, ...]) -> type:
+    return type("Row", (Row,), {
+        "__slots__": (), "_names": names,
+        "_index": {n.lower(): i for i, n in enumerate(names)},
+    })
+
+
+def _row_factory(cursor) -> Callable[[Sequence[Any]], Any]:
+    if cursor.description is None:
+        return tuple
+    return _row_class(tuple(c.name for c in cursor.description))
+
+
+if psycopg is not None:
+    class NumericLoader(Loader):
+        """SUM() and friends return numeric; load whole numbers as int, as
+        SQLite would, instead of Decimal (which orjson can't encode)."""
+
+        def load(self, data):
+            text = bytes(data).decode()
+            try:
+                return int(text)
+            except ValueError:
+                return float(text)
+
+    class _Translating:
+        def _prepare(self, query: str, params):
+            sql, writes = translate(query)
+            conn = self.connection
+            if (writes and conn.autocommit
+                    and conn.info.transaction_status == pq.TransactionStatus.IDLE):
+                super().execute("BEGIN")
+            return sql, (params if params is not None else ())
+
+        def execute(self, query, params=None, **kwargs):
+            sql, params = self._prepare(query, params)
+            start = time.perf_counter()
+            try:
+                return super().execute(sql, params, **kwargs)
+            finally:
+                metrics.observe_db(query, time.perf_counter() - start)
+
+        def executemany(self, query, params_seq, **kwargs):
+            sql, _ = self._prepare(query, ())
+            start = time.perf_counter()
+            try:
+                return super().executemany(sql, params_seq, **kwargs)
+            finally:
+                metrics.observe_db(query, time.perf_counter() - start)
+
+    class PgCursor(_Translating, psycopg.Cursor):
+        pass
+
+    class PgServerCursor(_Translating, psycopg.ServerCursor):
+        pass
+
+    class PgConnection(psycopg.Connection):
+        @property
+        def in_transaction(self) -> bool:
+            return self.info.transaction_status != pq.TransactionStatus.IDLE
+
+        def close(self):
+            # like closing a sqlite3 connection: uncommitted work is dropped
+            if getattr(self, "_pool", None) is not None and not self.closed and self.in_transaction:
+                try:
+                    self.rollback()
+                except psycopg.Error:
+                    pass
+            super().close()
+
+    def _configure(conn):
+        conn.autocommit = True
+        conn.row_factory = _row_factory
+        conn.cursor_factory = PgCursor
+        conn.server_cursor_factory = PgServerCursor
+        conn.adapters.register_loader("numeric", NumericLoader)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool(connection_class: Optional[type] = None):
+    """The process's connection pool, opened on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DATABASE_URL,
+                    connection_class=connection_class or PgConnection,
+                    min_size=DB_POOL_MIN,
+                    max_size=max(DB_POOL_MIN, DB_POOL_MAX),
+                    timeout=DB_POOL_TIMEOUT,
+                    configure=_configure,
+                    close_returns=True,
+                    name="stlvault",
+                    open=True,
+                )
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def configure(url: str):
+    """Use PostgreSQL if `url` is a postgres:// URL, SQLite otherwise. Runs
+    on import with $DATABASE_URL; the tests call it to switch databases."""
+    global DATABASE_URL, POSTGRES, LIKE
+    postgres = url.startswith(("postgres://", "postgresql://"))
+    if postgres and psycopg is None:
+        raise RuntimeError("DATABASE_URL is PostgreSQL but psycopg is not installed "
+                           "(pip install 'psycopg[binary,pool]')")
+    close_pool()
+    DATABASE_URL, POSTGRES = url, postgres
+    LIKE = "ILIKE" if postgres else "LIKE"
+
+
+def connect(connection_class: Optional[type] = None):
+    """A pooled PostgreSQL connection; `close()` gives it back."""
+    return pool(connection_class).getconn()
+
+
+def stream_cursor(conn):
+    """A cursor whose SELECT is read in batches by `fetchmany` instead of
+    all at once. On PostgreSQL that needs a server-side cursor, which lives
+    in a transaction; closing the connection ends both."""
+    if not POSTGRES:
+        return conn.cursor()
+    if conn.info.transaction_status == pq.TransactionStatus.IDLE:
+        conn.execute("BEGIN")
+    return conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+
+
+def listen(channel: str, callback: Callable[[], None], stop: threading.Event):
+    """Call `callback` for every NOTIFY on `channel` until `stop` is set,
+    and once after each reconnect, for notifications that were missed."""
+    while not stop.is_set():
+        try:
+            with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+                conn.execute(f"LISTEN {channel}")
+                callback()
+                while not stop.is_set():
+                    for _notify in conn.notifies(timeout=1.0):
+                        callback()
+        except psycopg.Error as e:
+            log.warning("LISTEN %s failed (%s); retrying", channel, e)
+            stop.wait(5)
+
+
+configure(os.getenv("DATABASE_URL", ""))
@@ -0,0 +1,346 @@
+import ctypes
+import ctypes.util
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import select
+import shutil
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import archive_ingest
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# ioctl(2) request to share a file's extents (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+_EVENT = struct.Struct("iIII")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+log = logging.getLogger(__name__)
+
+
+class DropDir(NamedTuple):
+    path: str
+    folder_id: str
+
+
+class DroppedFile(NamedTuple):
+    root: DropDir
+    dirs: List[str]
+    name: str
+    path: str
+    size: int
+    mtime_ns: int
+
+
+def parse_drop_dirs(spec: str, default_folder: str = "1") -> List[DropDir]:
+    """"/srv/drop=folderId;/mnt/slicer" -> DropDirs; the folder defaults to
+    `default_folder` when no mapping is given."""
+    dirs = []
+    for part in spec.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        path, _, folder = part.partition("=")
+        dirs.append(DropDir(os.path.abspath(path.strip()), folder.strip() or default_folder))
+    return dirs
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def clone_file(src: str, dest: str):
+    """Copy-on-write clone of src at dest; raises OSError where the
+    filesystem can't share extents."""
+    with open(src, "rb") as fin, open(dest, "wb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        except OSError:
+            fout.close()
+            os.remove(dest)
+            raise
+
+
+def place_file(src: str, dest: str, action: str) -> Tuple[int, str]:
+    """Put a dropped file at dest, returning (size, sha256).
+
+    "move" renames when both paths are on the same filesystem. "link" leaves
+    the source in place and gives the vault its own bytes: a reflink where
+    the filesystem supports one, so nothing is copied. Not a hardlink, since
+    a tool re-exporting into the drop folder would rewrite the stored model.
+    Otherwise the file is copied (and the source removed for "move").
+    """
+    if action == "link":
+        try:
+            clone_file(src, dest)
+            shutil.copystat(src, dest)
+            return os.path.getsize(dest), file_sha256(dest)
+        except OSError:
+            pass
+    else:
+        try:
+            os.rename(src, dest)
+            return os.path.getsize(dest), file_sha256(dest)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM):
+                raise
+    with open(src, "rb") as fh:
+        size, digest = archive_ingest.copy_hashed(fh, dest)
+    shutil.copystat(src, dest)
+    if action != "link":
+        os.remove(src)
+    return size, digest
+
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths: Dict[int, str] = {}
+
+    def add(self, path: str):
+        wd = self._add(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.paths[wd] = path
+
+    def read(self, timeout: float) -> List[Tuple[Optional[str], int]]:
+        """(absolute path, mask) events; path is None after a queue overflow."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+            elif mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+            elif wd in self.paths and name:
+                events.append((os.path.join(self.paths[wd], os.fsdecode(name)), mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DropWatcher:
+    """Watches drop directories and hands settled model files to `on_batch`.
+
+    Changes are picked up through inotify where available and by rescanning
+    every `poll_interval` seconds otherwise. With inotify the tree is still
+    rescanned every `rescan_interval` seconds, since network shares don't
+    deliver events for remote writers. A file is ready once its size and
+    mtime have not changed for `settle` seconds, so slicers and SMB copies
+    that write in several passes are not ingested half-written.
+
+    `on_batch` returns the files it could not take, or raises if it could
+    take none of them. Those are not marked seen but queued again, after a
+    delay that doubles with each failure, so a locked database or a full
+    disk only postpones a drop.
+    """
+
+    def __init__(
+        self,
+        dirs: List[DropDir],
+        on_batch: Callable[[List[DroppedFile]], Optional[List[DroppedFile]]],
+        settle: float = 2.0,
+        poll_interval: float = 5.0,
+        rescan_interval: float = 300.0,
+        batch_size: int = 500,
+        mode: str = "auto",
+        seen: Optional[Dict[str, Tuple[int, int]]] = None,
+        retry_delay: float = 5.0,
+        retry_max_delay: float = 600.0,
+    ):
+        self.dirs = dirs
+        self.on_batch = on_batch
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.batch_size = batch_size
+        self.mode = mode
+        # path -> (size, mtime_ns) already handed over; left-behind sources
+        # of "link" drops must not be ingested again
+        self.seen: Dict[str, Tuple[int, int]] = dict(seen or {})
+        self._pending: Dict[str, Tuple[int, int, float]] = {}
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        # path -> failed attempts, for the backoff
+        self._failures: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[_Inotify] = None
+
+    def start(self):
+        if self.mode in ("auto", "inotify"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                if self.mode == "inotify":
+                    raise
+                self._inotify = None
+        self._thread = threading.Thread(target=self._run, name="dropwatch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        if self._inotify is not None:
+            self._inotify.close()
+
+    @property
+    def inotify_active(self) -> bool:
+        return self._inotify is not None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _root_for(self, path: str) -> Optional[DropDir]:
+        for root in self.dirs:
+            if path == root.path or path.startswith(root.path + os.sep):
+                return root
+        return None
+
+    def _watch_tree(self, top: str):
+        if self._inotify is None:
+            return
+        for dirpath, dirnames, _files in os.walk(top):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            try:
+                self._inotify.add(dirpath)
+            except OSError:
+                pass
+
+    def _candidate(self, path: str):
+        root = self._root_for(path)
+        if root is None or path in self._pending:
+            return
+        if archive_ingest.split_member(os.path.relpath(path, root.path)) is None:
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        if self.seen.get(path) == (st.st_size, st.st_mtime_ns):
+            return
+        self._pending[path] = (st.st_size, st.st_mtime_ns, time.monotonic())
+
+    def scan(self):
+        for root in self.dirs:
+            for dirpath, dirnames, files in os.walk(root.path):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for name in files:
+                    self._candidate(os.path.join(dirpath, name))
+
+    def _settled(self) -> List[DroppedFile]:
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = (st.st_size, st.st_mtime_ns, now)
+            elif now - since >= self.settle:
+                del self._pending[path]
+                root = self._root_for(path)
+                dirs, name = archive_ingest.split_member(os.path.relpath(path, root.path))
+                ready.append(DroppedFile(root, dirs, name, path, size, mtime_ns))
+        return ready
+
+    def _retry_later(self, f: DroppedFile):
+        """Queue a file that failed again, after a delay that doubles with
+        every failure, up to retry_max_delay."""
+        if not os.path.exists(f.path):
+            return
+        failures = self._failures.get(f.path, 0) + 1
+        self._failures[f.path] = failures
+        delay = min(self.retry_max_delay, self.retry_delay * 2 ** (failures - 1))
+        log.warning("will retry %s in %.0f s (attempt %d failed)", f.path, delay, failures)
+        # settles `delay` seconds from now
+        self._pending[f.path] = (f.size, f.mtime_ns, time.monotonic() + delay - self.settle)
+
+    def _flush(self, ready: List[DroppedFile]):
+        for i in range(0, len(ready), self.batch_size):
+            batch = ready[i:i + self.batch_size]
+            try:
+                failed = self.on_batch(batch) or []
+            except Exception:
+                log.exception("drop folder batch of %d files failed", len(batch))
+                failed = batch
+            failed_paths = {f.path for f in failed}
+            for f in batch:
+                if f.path in failed_paths:
+                    self._retry_later(f)
+                    continue
+                self._failures.pop(f.path, None)
+                # sources left behind by "link" drops must not come back
+                if os.path.exists(f.path):
+                    self.seen[f.path] = (f.size, f.mtime_ns)
+
+    def _run(self):
+        for root in self.dirs:
+            os.makedirs(root.path, exist_ok=True)
+            self._watch_tree(root.path)
+        self.scan()
+        last_scan = time.monotonic()
+        interval = self.rescan_interval if self._inotify is not None else self.poll_interval
+        while not self._stop.is_set():
+            tick = min(0.5, self.settle / 2) if self._pending else 1.0
+            if self._inotify is not None:
+                for path, mask in self._inotify.read(tick):
+                    if path is None:
+                        self.scan()
+                    elif mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            # files may land before the watch is in place
+                            self._watch_tree(path)
+                            for dirpath, _dirs, files in os.walk(path):
+                                for name in files:
+                                    self._candidate(os.path.join(dirpath, name))
+                    else:
+                        self._candidate(path)
+            else:
+                self._stop.wait(tick)
+            if time.monotonic() - last_scan >= interval:
+                self.scan()
+                last_scan = time.monotonic()
+            ready = self._settled()
+            if ready:
+                self._flush(ready)
@@ -0,0 +1,216 @@
+import itertools
+import os
+import re
+import zipfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# bump when the signature changes so stored vectors get recomputed
+SIGNATURE_VERSION = 1
+D2_BINS = 32
+D2_RANGE = 3.0
+SAMPLES = 20000
+# moments carry shape proportions the distance histogram blurs together
+MOMENT_WEIGHT = 0.5
+BLOCK_ROWS = 1024
+
+_STL_DTYPE = np.dtype(
+    [("normal", "<f4", 3), ("v", "<f4", (3, 3)), ("attr", "<u2")]
+)
+_ASCII_VERTEX = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+_VERTEX = re.compile(rb'<vertex\s+x="([^"]+)"\s+y="([^"]+)"\s+z="([^"]+)"')
+_TRIANGLE = re.compile(rb'<triangle\s+v1="(\d+)"\s+v2="(\d+)"\s+v3="(\d+)"')
+_OBJECT = re.compile(rb"<object\b")
+
+
+def _load_stl(path: str) -> Optional[np.ndarray]:
+    size = os.path.getsize(path)
+    with open(path, "rb") as fh:
+        header = fh.read(84)
+    if len(header) == 84:
+        count = int.from_bytes(header[80:84], "little")
+        if 84 + count * 50 == size:
+            data = np.fromfile(path, dtype=_STL_DTYPE, count=count, offset=84)
+            return data["v"].astype(np.float64)
+    with open(path, "rb") as fh:
+        coords = _ASCII_VERTEX.findall(fh.read())
+    if not coords or len(coords) % 3:
+        return None
+    return np.array(coords, dtype=np.float64).reshape(-1, 3, 3)
+
+
+def _load_3mf(path: str) -> Optional[np.ndarray]:
+    """Triangles from every mesh in the package. Build-item and component
+    transforms are ignored; the signature does not depend on placement."""
+    parts = []
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            if not name.lower().endswith(".model"):
+                continue
+            data = zf.read(name)
+            # split per <object> so triangle indices stay local to their mesh
+            for chunk in _OBJECT.split(data)[1:]:
+                verts = _VERTEX.findall(chunk)
+                tris = _TRIANGLE.findall(chunk)
+                if not verts or not tris:
+                    continue
+                v = np.array(verts, dtype=np.float64)
+                t = np.array(tris, dtype=np.int64)
+                if t.max() >= len(v):
+                    continue
+                parts.append(v[t])
+    if not parts:
+        return None
+    return np.concatenate(parts)
+
+
+def load_triangles(path: str) -> Optional[np.ndarray]:
+    """(n, 3, 3) float64 triangle array, or None for unsupported files."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".stl":
+            return _load_stl(path)
+        if ext == ".3mf":
+            return _load_3mf(path)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+    return None
+
+
+def signature(tris: np.ndarray, samples: int = SAMPLES, seed: int = 0) -> Optional[np.ndarray]:
+    """Shape descriptor invariant to translation, rotation and uniform scale:
+    a D2 histogram of distances between random surface point pairs, normalized
+    by their mean, plus the normalized principal moments of the surface."""
+    if tris is None or len(tris) == 0:
+        return None
+    v0, v1, v2 = tris[:, 0], tris[:, 1], tris[:, 2]
+    area = 0.5 * np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1)
+    total = area.sum()
+    if not np.isfinite(total) or total <= 0:
+        return None
+
+    rng = np.random.default_rng(seed)
+    # area-weighted triangle choice via the cumulative sum is much faster
+    # than rng.choice(p=...) for large meshes
+    cdf = np.cumsum(area)
+    idx = np.searchsorted(cdf, rng.random(2 * samples) * cdf[-1])
+    idx = np.minimum(idx, len(tris) - 1)
+    r1 = np.sqrt(rng.random(2 * samples))
+    r2 = rng.random(2 * samples)
+    pts = (
+        (1 - r1)[:, None] * v0[idx]
+        + (r1 * (1 - r2))[:, None] * v1[idx]
+        + (r1 * r2)[:, None] * v2[idx]
+    )
+
+    d = np.linalg.norm(pts[:samples] - pts[samples:], axis=1)
+    mean = d.mean()
+    if mean <= 0:
+        return None
+    hist = np.histogram(d / mean, bins=D2_BINS, range=(0.0, D2_RANGE))[0] / samples
+
+    centered = pts - pts.mean(axis=0)
+    eig = np.sort(np.linalg.eigvalsh(centered.T @ centered / len(pts)))[::-1]
+    eig = np.sqrt(np.clip(eig, 0, None))
+    eig = eig / eig.sum() if eig.sum() > 0 else eig
+    return np.concatenate([hist, MOMENT_WEIGHT * eig]).astype(np.float32)
+
+
+def compute(path: str) -> Optional[Tuple[np.ndarray, int, float]]:
+    """(signature, triangle count, surface area) for a model file."""
+    tris = load_triangles(path)
+    if tris is None:
+        return None
+    vec = signature(tris)
+    if vec is None:
+        return None
+    v0, v1, v2 = tris[:, 0], tris[:, 1], tris[:, 2]
+    area = float(0.5 * np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1).sum())
+    return vec, len(tris), area
+
+
+def to_blob(vec: np.ndarray) -> bytes:
+    # float16 keeps a fingerprint at 70 bytes; histogram bins are >= 1/SAMPLES
+    return vec.astype("<f2").tobytes()
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f2").astype(np.float32)
+
+
+class FingerprintIndex:
+    """All signatures as one matrix; nearest neighbours are a single
+    vectorized distance computation and duplicates a grid search."""
+
+    def __init__(self, ids: Sequence[str], vectors: np.ndarray):
+        self.ids = list(ids)
+        self.pos = {mid: i for i, mid in enumerate(self.ids)}
+        self.matrix = vectors.astype(np.float32) if len(ids) else np.zeros((0, 1), np.float32)
+        self.norms = (self.matrix ** 2).sum(axis=1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def similar(self, model_id: str, limit: int = 10,
+                max_distance: Optional[float] = None) -> List[Tuple[str, float]]:
+        i = self.pos.get(model_id)
+        if i is None:
+            return []
+        q = self.matrix[i]
+        d2 = self.norms - 2 * (self.matrix @ q) + self.norms[i]
+        dist = np.sqrt(np.clip(d2, 0, None))
+        dist[i] = np.inf
+        k = min(limit, len(dist) - 1)
+        if k <= 0:
+            return []
+        nearest = np.argpartition(dist, k - 1)[:k]
+        nearest = nearest[np.argsort(dist[nearest])]
+        return [
+            (self.ids[j], float(dist[j]))
+            for j in nearest
+            if max_distance is None or dist[j] <= max_distance
+        ]
+
+    def duplicate_pairs(self, threshold: float, dims: int = 3) -> List[Tuple[int, int, float]]:
+        """Every pair within `threshold` (L2) as (i, j, distance), i < j.
+
+        Vectors are bucketed on a grid of width `threshold` over their top
+        principal components. Projection never lengthens a distance, so a
+        pair can only match if it sits in the same or an adjacent cell; each
+        occupied cell is compared against its neighbourhood in one matrix
+        product and the cost follows the local density instead of n^2.
+        """
+        n = len(self.ids)
+        if n < 2 or threshold <= 0:
+            return []
+        centered = self.matrix - self.matrix.mean(axis=0)
+        dims = min(dims, centered.shape[1])
+        axes = np.linalg.svd(centered[:: max(1, n // 20000)], full_matrices=False)[2][:dims]
+        cells = np.floor(centered @ axes.T / threshold).astype(np.int64)
+
+        buckets: Dict[Tuple[int, ...], np.ndarray] = {}
+        order = np.lexsort(cells.T[::-1])
+        sorted_cells = cells[order]
+        bounds = np.flatnonzero(np.any(sorted_cells[1:] != sorted_cells[:-1], axis=1)) + 1
+        for members in np.split(order, bounds):
+            buckets[tuple(cells[members[0]])] = members
+
+        offsets = list(itertools.product((-1, 0, 1), repeat=dims))
+        limit = threshold * threshold
+        pairs: List[Tuple[int, int, float]] = []
+        for cell, rows in buckets.items():
+            near = [buckets.get(tuple(c + o for c, o in zip(cell, off))) for off in offsets]
+            cols = np.concatenate([m for m in near if m is not None])
+            for r in range(0, len(rows), BLOCK_ROWS):
+                chunk = rows[r:r + BLOCK_ROWS]
+                d2 = (
+                    self.norms[chunk][:, None]
+                    + self.norms[cols][None, :]
+                    - 2 * (self.matrix[chunk] @ self.matrix[cols].T)
+                )
+                # the global i < j test keeps each pair once across cells
+                a, b = np.nonzero((d2 <= limit) & (chunk[:, None] < cols[None, :]))
+                dist = np.sqrt(np.clip(d2[a, b], 0, None))
+                pairs.extend(zip(chunk[a].tolist(), cols[b].tolist(), dist.tolist()))
+        return pairs
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+IMPORT_RETRIES = int(os.getenv("IMPORT_RETRIES", "3"))
+IMPORT_RETRY_BACKOFF = float(os.getenv("IMPORT_RETRY_BACKOFF", "0.5"))
+# per upstream host, across every import running in this process
+IMPORT_HOST_CONCURRENCY = int(os.getenv("IMPORT_HOST_CONCURRENCY", "4"))
+IMPORT_HOST_RPS = float(os.getenv("IMPORT_HOST_RPS", "5"))
+
+# set by the app to receive (source, stage, seconds) for every importer stage
+stage_observer = None
+
+
+@contextmanager
+def timed_stage(source, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stage_observer is not None:
+            stage_observer(source, stage, time.perf_counter() - start)
+
+
+class HostLimiter:
+    """Caps requests in flight and requests started per second for each
+    host. A rate of 0 means unlimited."""
+
+    def __init__(self, concurrency: int, rate: float):
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.next_start = {}
+
+    @contextmanager
+    def slot(self, host: str):
+        with self.lock:
+            sem = self.slots.get(host)
+            if sem is None:
+                sem = self.slots[host] = threading.BoundedSemaphore(self.concurrency)
+        with sem:
+            if self.rate > 0:
+                with self.lock:
+                    now = time.monotonic()
+                    start = max(now, self.next_start.get(host, now))
+                    self.next_start[host] = start + 1 / self.rate
+                if start > now:
+                    time.sleep(start - now)
+            yield
+
+
+host_limiter = HostLimiter(IMPORT_HOST_CONCURRENCY, IMPORT_HOST_RPS)
+
+
+class LimitedAdapter(HTTPAdapter):
+    """Holds a `host_limiter` slot for each request, retries included."""
+
+    def send(self, request, *args, **kwargs):
+        with host_limiter.slot(urlparse(request.url).netloc):
+            return super().send(request, *args, **kwargs)
+
+
+def make_session():
+    """requests.Session that retries rate limits and transient upstream errors,
+    honouring Retry-After. GraphQL goes over POST, so all methods are retried."""
+    retry = Retry(
+        total=IMPORT_RETRIES,
+        backoff_factor=IMPORT_RETRY_BACKOFF,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = LimitedAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
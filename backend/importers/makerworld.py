@@ -1,16 +1,21 @@
 import base64
+import os
 import re
 from urllib.parse import urlparse
 
 import requests
 
+from importers.common import make_session, timed_stage
+
+MAKERWORLD_API_BASE = os.getenv("MAKERWORLD_API_BASE", "https://api.bambulab.com/v1")
+
 
 class MakerWorldImporter:
     """Handles imports from MakerWorld."""
 
-    def __init__(self, token=None):
+    def __init__(self, token=None, api_base=None):
         self.session: requests.Session
-        self.api_base = "https://api.bambulab.com/v1"
+        self.api_base = (api_base or MAKERWORLD_API_BASE).rstrip("/")
         self.token = token
 
     def _headers(self, token=None):
@@ -48,12 +53,19 @@ class MakerWorldImporter:
                 return requested_id
         return requested_id
 
+    def modelKey(self, url):
+        """What identifies the options behind `url`, without a request: the
+        model, and the print profile if the URL names one."""
+        match = re.search(r"profileId[-=](\d+)", url)
+        return (self._extract_model_id(url), match.group(1) if match else None)
+
     def _get_design(self, model_id):
-        response = self.session.get(
-            f"{self.api_base}/design-service/design/{model_id}",
-            headers=self._headers(),
-            timeout=30,
-        )
+        with timed_stage("makerworld", "design"):
+            response = self.session.get(
+                f"{self.api_base}/design-service/design/{model_id}",
+                headers=self._headers(),
+                timeout=30,
+            )
         response.raise_for_status()
         data = response.json()
         return data.get("data") or data
@@ -73,14 +85,15 @@ class MakerWorldImporter:
     def _make_thumbnail(self, url):
         if not url:
             return ""
-        response = self.session.get(url, allow_redirects=True, timeout=30)
+        with timed_stage("makerworld", "thumbnail"):
+            response = self.session.get(url, allow_redirects=True, timeout=30)
         response.raise_for_status()
         encoded = base64.b64encode(response.content).decode()
         content_type = response.headers.get("content-type", "image/png").split(";")[0]
         return f"data:{content_type};base64,{encoded}"
 
     def getModelOptions(self, url):
-        self.session = requests.Session()
+        self.session = make_session()
         try:
             model_id = self._extract_model_id(url)
             design = self._get_design(model_id)
@@ -127,12 +140,13 @@ class MakerWorldImporter:
                 "MakerWorld downloads require a Bambu Cloud token in Settings"
             )
 
-        response = self.session.get(
-            f"{self.api_base}/iot-service/api/user/profile/{profile_id}",
-            params={"model_id": model_id},
-            headers=self._headers(self.token),
-            timeout=30,
-        )
+        with timed_stage("makerworld", "link"):
+            response = self.session.get(
+                f"{self.api_base}/iot-service/api/user/profile/{profile_id}",
+                params={"model_id": model_id},
+                headers=self._headers(self.token),
+                timeout=30,
+            )
         response.raise_for_status()
         data = response.json()
         payload = data.get("data") or data
@@ -148,13 +162,18 @@ class MakerWorldImporter:
 
         raise ValueError("MakerWorld did not return a downloadable file URL")
 
-    def importfromId(self, profile_id, model_id, preview_path):
-        self.session = requests.Session()
+    def importfromId(self, profile_id, model_id, preview_path, thumbnail_for=None):
+        """thumbnail_for(content) may return the 3MF's embedded plate image,
+        which skips the cover download."""
+        self.session = make_session()
         try:
             download_url = self._download_link(model_id, profile_id)
-            file = self.session.get(download_url, allow_redirects=True, timeout=120)
+            with timed_stage("makerworld", "download"):
+                file = self.session.get(download_url, allow_redirects=True, timeout=120)
             file.raise_for_status()
-            thumbnail = self._make_thumbnail(preview_path)
+            thumbnail = thumbnail_for(file.content) if thumbnail_for else None
+            if not thumbnail:
+                thumbnail = self._make_thumbnail(preview_path)
             return file, thumbnail
         finally:
             self.session.close()
@@ -1,8 +1,26 @@
+import os
 import requests
+import threading
 import time
 import re
 import base64
 
+from importers.common import make_session, timed_stage
+
+PRINTABLES_WEB_URL = os.getenv("PRINTABLES_WEB_URL", "https://www.printables.com/")
+PRINTABLES_API_URL = os.getenv(
+    "PRINTABLES_API_URL", "https://api.printables.com/graphql/"
+)
+PRINTABLES_FILES_URL = os.getenv(
+    "PRINTABLES_FILES_URL", "https://files.printables.com/"
+)
+# data-client-uid belongs to the site, not the page; scrape it this often
+CLIENT_UID_TTL = float(os.getenv("PRINTABLES_CLIENT_UID_TTL", "900"))
+
+# web url -> (client uid, monotonic time scraped)
+_client_uids = {}
+_client_uids_lock = threading.Lock()
+
 
 MODELQUERY = """
 query ModelFiles($id: ID!) {
@@ -140,9 +158,11 @@ fragment Error on ErrorType {
 class PrintablesImporter:
     """Handles the import from printables site"""
 
-    def __init__(self):
+    def __init__(self, web_url=None, graph_url=None, files_url=None):
         self.session: requests.Session
-        self.graphurl = "https://api.printables.com/graphql/"
+        self.weburl = web_url or PRINTABLES_WEB_URL
+        self.graphurl = graph_url or PRINTABLES_API_URL
+        self.filesurl = files_url or PRINTABLES_FILES_URL
         self.clientId = ""
         self.fileResult: bool
         self.fileDownloadLink = ""
@@ -156,7 +176,8 @@ class PrintablesImporter:
             "priority": "u=0, i",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
         }
-        response = self.session.get(url, headers=header)
+        with timed_stage("printables", "client_uid"):
+            response = self.session.get(url, headers=header)
         if response.status_code != 200:
             return response.status_code
 
@@ -164,6 +185,26 @@ class PrintablesImporter:
 
         return True
 
+    def _use_client_data(self, url, refresh=False):
+        """Take the site's client uid from the last scrape if it is recent,
+        scraping `url` otherwise. Returns True if it scraped."""
+        with _client_uids_lock:
+            cached = _client_uids.get(self.weburl)
+            if cached and not refresh and time.monotonic() - cached[1] < CLIENT_UID_TTL:
+                self.clientId = cached[0]
+                return False
+            # under the lock, so a batch of lookups scrapes once
+            if self._set_client_data(url) is True:
+                _client_uids[self.weburl] = (self.clientId, time.monotonic())
+            return True
+
+    def modelKey(self, url):
+        """What identifies the model behind `url`, without a request."""
+        match = re.search(r"model/(\d+)", url)
+        if match is None:
+            raise ValueError("Could not find a Printables model ID in the URL")
+        return (match[1],)
+
     def _get_model_info(self, modelId):
         header = {
             "accept": "application/graphql-response+json, application/graphql+json, application/json, text/event-stream, multipart/mixed",
@@ -178,11 +219,12 @@ class PrintablesImporter:
         }
         variables = {"id": modelId}
 
-        response = self.session.post(
-            self.graphurl,
-            json={"query": MODELQUERY, "variables": variables},
-            headers=header,
-        )
+        with timed_stage("printables", "graphql"):
+            response = self.session.post(
+                self.graphurl,
+                json={"query": MODELQUERY, "variables": variables},
+                headers=header,
+            )
 
         if response.status_code != 200:
             return response.status_code
@@ -197,8 +239,7 @@ class PrintablesImporter:
                         "id": model["id"],
                         "name": model["name"],
                         "folder": model["folder"],
-                        "previewPath": "https://files.printables.com/"
-                        + model["filePreviewPath"],
+                        "previewPath": self.filesurl + model["filePreviewPath"],
                         "typeName": model["name"].split(".")[-1],
                     }
                 )
@@ -225,11 +266,12 @@ class PrintablesImporter:
             "source": "model_detail",
         }
 
-        response = self.session.post(
-            self.graphurl,
-            json={"query": FILEQUERY, "variables": variables},
-            headers=header,
-        )
+        with timed_stage("printables", "link"):
+            response = self.session.post(
+                self.graphurl,
+                json={"query": FILEQUERY, "variables": variables},
+                headers=header,
+            )
         if response.status_code != 200:
             return None
         fileData = response.json()
@@ -251,9 +293,10 @@ class PrintablesImporter:
                 "priority": "u=1, i",
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
             }
-            file = self.session.get(
-                self.fileDownloadLink, allow_redirects=True, headers=fileheader
-            )
+            with timed_stage("printables", "download"):
+                file = self.session.get(
+                    self.fileDownloadLink, allow_redirects=True, headers=fileheader
+                )
             return file
 
     def _make_thumbnail(self, url):
@@ -267,20 +310,27 @@ class PrintablesImporter:
                 "priority": "u=1, i",
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
             }
-            file = self.session.get(url, allow_redirects=True, headers=fileheader)
+            with timed_stage("printables", "thumbnail"):
+                file = self.session.get(url, allow_redirects=True, headers=fileheader)
             encoded_string = base64.b64encode(file.content)
             return "data:image/png;base64," + encoded_string.decode()
 
         return ""
 
-    def importfromId(self, modelId, parentId, previewPath):
-        self.session = requests.Session()
+    def importfromId(self, modelId, parentId, previewPath, thumbnail_for=None):
+        """thumbnail_for(content) may return a thumbnail found inside the file,
+        which skips fetching previewPath."""
+        self.session = make_session()
         try:
-            self._set_client_data("https://www.printables.com/")
-            time.sleep(0.1)
+            if self._use_client_data(self.weburl):
+                time.sleep(0.1)
             file = self._get_file(modelId, parentId)
-            time.sleep(0.1)
-            thumbnail = self._make_thumbnail(previewPath)
+            thumbnail = None
+            if file is not None and thumbnail_for is not None:
+                thumbnail = thumbnail_for(file.content)
+            if not thumbnail:
+                time.sleep(0.1)
+                thumbnail = self._make_thumbnail(previewPath)
             return file, thumbnail
         except Exception as e:
             raise e
@@ -288,14 +338,20 @@ class PrintablesImporter:
             self.session.close()
 
     def getModelOptions(self, url):
-        self.session = requests.Session()
+        self.session = make_session()
         modelId = re.search(r"model/(\d+)", url)[1]
         if modelId is None:
             return None
         try:
-            self._set_client_data(url)
-            time.sleep(0.2)
+            if self._use_client_data(url):
+                time.sleep(0.2)
+                return self._get_model_info(modelId)
             modelData = self._get_model_info(modelId)
+            if isinstance(modelData, int):
+                # the reused uid may have gone stale
+                self._use_client_data(url, refresh=True)
+                time.sleep(0.2)
+                modelData = self._get_model_info(modelId)
             return modelData
         except Exception as e:
             raise e
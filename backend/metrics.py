@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "").lower() in ("1", "true", "yes")
+# set by serve.py when running several workers; each process writes its
+# samples there and /metrics aggregates them
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_SECONDS = Histogram(
+    "stlvault_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+REQUEST_BYTES = Counter(
+    "stlvault_http_request_bytes_total",
+    "Request body bytes received (uploads) by route",
+    ["method", "route"],
+)
+RESPONSE_BYTES = Counter(
+    "stlvault_http_response_bytes_total",
+    "Response body bytes sent (downloads) by route",
+    ["method", "route"],
+)
+IN_FLIGHT = Gauge(
+    "stlvault_http_requests_in_flight", "Requests being handled", multiprocess_mode="livesum"
+)
+DB_SECONDS = Histogram(
+    "stlvault_db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ["op"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+FILE_SCAN_SECONDS = Histogram(
+    "stlvault_file_scan_duration_seconds",
+    "Time spent listing or walking the storage directories",
+    ["op"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+IMPORT_STAGE_SECONDS = Histogram(
+    "stlvault_import_stage_duration_seconds",
+    "Importer stage latency (client_uid, graphql, design, link, download, thumbnail)",
+    ["source", "stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 120.0),
+)
+IMPORTED_BYTES = Counter(
+    "stlvault_imported_bytes_total", "Bytes written by model imports", ["source"]
+)
+IMPORTS_IN_PROGRESS = Gauge(
+    "stlvault_imports_in_progress", "Imports currently running", multiprocess_mode="livesum"
+)
+ADMISSION_ACTIVE = Gauge(
+    "stlvault_admission_active", "Requests admitted and running, by lane", ["lane"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "stlvault_admission_queued", "Requests waiting for admission, by lane", ["lane"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTED = Counter(
+    "stlvault_admission_rejected_total", "Requests answered 429 by admission control", ["lane"]
+)
+FILES_OFFLOADED = Counter(
+    "stlvault_files_offloaded_total", "Downloads handed to the reverse proxy (FILE_OFFLOAD)"
+)
+# refreshed by the process that serves the scrape, so per process
+THREADPOOL_BUSY = Gauge(
+    "stlvault_threadpool_busy", "Worker threads running sync endpoints",
+    multiprocess_mode="liveall",
+)
+THREADPOOL_QUEUED = Gauge(
+    "stlvault_threadpool_queued", "Sync endpoint calls waiting for a worker thread",
+    multiprocess_mode="liveall",
+)
+
+# per-request stage totals for Server-Timing: name -> [seconds, count]
+_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "server_timings", default=None
+)
+
+
+def record_timing(name: str, seconds: float):
+    timings = _timings.get()
+    if timings is not None:
+        entry = timings.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def file_scan(op: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        FILE_SCAN_SECONDS.labels(op).observe(elapsed)
+        record_timing("fs", elapsed)
+
+
+_in_flight = 0
+
+
+def in_flight() -> int:
+    """Requests in flight in this process (IN_FLIGHT adds up all workers,
+    but only for the scrape)."""
+    return _in_flight
+
+
+def observe_import_stage(source: str, stage: str, seconds: float):
+    IMPORT_STAGE_SECONDS.labels(source, stage).observe(seconds)
+    record_timing(f"import-{stage}", seconds)
+
+
+def observe_db(sql: str, seconds: float):
+    op = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else "other"
+    DB_SECONDS.labels(op).observe(seconds)
+    record_timing("db", seconds)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe_db(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe_db(sql, time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection factory that times every statement."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def render_latest():
+    """Exposition body and content type; refreshes the threadpool gauges, so
+    call it from the event loop."""
+    try:
+        import anyio.to_thread
+
+        stats = anyio.to_thread.current_default_thread_limiter().statistics()
+        THREADPOOL_BUSY.set(stats.borrowed_tokens)
+        THREADPOOL_QUEUED.set(stats.tasks_waiting)
+    except Exception:
+        pass
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def _server_timing_header(timings: Dict[str, List[float]], total: float) -> str:
+    parts = []
+    for name, (seconds, count) in timings.items():
+        parts.append(f'{name};dur={seconds * 1000:.2f};desc="{count}x"')
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """Times every request per route template, counts body bytes both ways and,
+    when SERVER_TIMING is enabled, reports per-stage totals in a Server-Timing
+    header so slow requests can be read straight from browser devtools."""
+
+    def __init__(self, app: ASGIApp, server_timing: bool = SERVER_TIMING) -> None:
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        timings: Dict[str, List[float]] = {}
+        token = _timings.set(timings)
+        status = 500
+        received = 0
+        sent = 0
+
+        def route() -> str:
+            matched = scope.get("route")
+            return getattr(matched, "path", None) or "unmatched"
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def timed_send(message: Message) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        _server_timing_header(timings, time.perf_counter() - start),
+                    )
+                    headers.append("Timing-Allow-Origin", "*")
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        global _in_flight
+        _in_flight += 1
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, counting_receive, timed_send)
+        finally:
+            _in_flight -= 1
+            IN_FLIGHT.dec()
+            _timings.reset(token)
+            name = route()
+            REQUEST_SECONDS.labels(method, name, str(status)).observe(
+                time.perf_counter() - start
+            )
+            if received:
+                REQUEST_BYTES.labels(method, name).inc(received)
+            if sent:
+                RESPONSE_BYTES.labels(method, name).inc(sent)
@@ -0,0 +1,140 @@
+"""In-process read-through caches for hot, rarely written data.
+
+Each entry remembers the generation it was loaded at and is served only
+while the generation hasn't moved. Writers advance it after they commit
+(app.py does so for every transaction that bumps `library_version`), so a
+read that starts after the commit never sees an older entry. An entry that
+was loaded while a write was committing is stored under the generation it
+started with, and the advance makes it miss on the next read.
+
+The generation lives in an 8-byte file next to the database, mapped into
+every process. Checking it is a memory read, so a hit never touches SQLite,
+and a write made by one uvicorn worker reaches the others on their next
+read. Like SQLite's own WAL index (the -shm file), this only works between
+processes on one host. Where the file can't be mapped, the generation is
+process-local and `max_age` bounds how long another process's write can go
+unseen.
+"""
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# native byte order and alignment: an aligned 8-byte load, so a reader
+# never sees half of an update
+_COUNTER = struct.Struct("q")
+
+
+class Generation:
+    """A counter that only goes up; shared between processes once `share`d."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = 0
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    @property
+    def shared(self) -> bool:
+        return self._map is not None
+
+    def share(self, path: str) -> bool:
+        """Map the counter file at `path`, creating it if needed."""
+        self.close()
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            log.warning("read cache counter %s unavailable (%s); caches are per process", path, e)
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < _COUNTER.size:
+                    os.ftruncate(fd, _COUNTER.size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, _COUNTER.size)
+        except (OSError, ValueError) as e:
+            os.close(fd)
+            log.warning("read cache counter %s unavailable (%s); caches are per process", path, e)
+            return False
+        self._fd = fd
+        return True
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def get(self) -> int:
+        if self._map is None:
+            return self._local
+        return _COUNTER.unpack_from(self._map, 0)[0]
+
+    def advance(self):
+        with self._lock:
+            self._local += 1
+            if self._map is None:
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                _COUNTER.pack_into(self._map, 0, _COUNTER.unpack_from(self._map, 0)[0] + 1)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class ReadCache:
+    """Bounded LRU of `key -> value`, filled by `get(key, load)`.
+
+    `load` runs outside the lock; two threads missing on the same key at
+    once both load it, which is cheaper than making one wait.
+    """
+
+    def __init__(self, name: str, generation: Generation, max_entries: int,
+                 max_age: float):
+        self.name = name
+        self.generation = generation
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        if self.max_entries <= 0:
+            return load()
+        generation = self.generation.get()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation and now - entry[1] < self.max_age:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        value = load()
+        with self._lock:
+            self._entries[key] = (generation, now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
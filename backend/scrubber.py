@@ -0,0 +1,344 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 1024 * 1024
+ID_LENGTH = 36
+
+# kinds of problem the scrubber reports
+MISSING_FILE = "missing_file"  # row whose model file is gone
+ORPHAN_FILE = "orphan_file"  # file with no row (or a stale ingest archive)
+MISSING_MANUAL = "missing_manual"
+ORPHAN_MANUAL = "orphan_manual"
+SIZE_MISMATCH = "size_mismatch"
+HASH_MISMATCH = "hash_mismatch"  # content changed on disk: corruption
+UNHASHED = "unhashed"  # no stored hash yet; detail carries the computed one
+KINDS = (
+    MISSING_FILE, ORPHAN_FILE, MISSING_MANUAL, ORPHAN_MANUAL,
+    SIZE_MISMATCH, HASH_MISMATCH, UNHASHED,
+)
+UPSERT_ISSUE = (
+    "INSERT INTO scrub_issues(kind,ref,modelId,path,detail,bytes,foundAt) VALUES (?,?,?,?,?,?,?) "
+    "ON CONFLICT(kind,ref) DO UPDATE SET modelId=excluded.modelId, path=excluded.path, "
+    "detail=excluded.detail, bytes=excluded.bytes, foundAt=excluded.foundAt"
+)
+
+
+class IOBudget:
+    """Token bucket over bytes read; `consume` sleeps once the budget for
+    the current second is spent."""
+
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self.tokens = bytes_per_second
+        self.updated = time.monotonic()
+
+    def consume(self, n: int):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= n
+        if self.tokens < 0:
+            time.sleep(-self.tokens / self.rate)
+
+
+class Scrubber:
+    """Cross-checks model rows against the files in upload_dir/manual_dir.
+
+    Rows are walked in id order in batches; the last id of each finished
+    batch is saved, so a run interrupted by a restart resumes where it
+    stopped. Hash verification reads files through an IOBudget. Before
+    each batch and each chunk it reads, the scrubber waits while `busy()`
+    reports foreground requests in flight, but never longer than
+    `max_yield` seconds, so a long download or streamed export slows a run
+    down instead of stalling it.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        upload_dir: str,
+        manual_dir: str,
+        io_budget: float,
+        batch_size: int = 200,
+        orphan_grace: float = 3600.0,
+        busy: Optional[Callable[[], bool]] = None,
+        max_yield: float = 0.5,
+    ):
+        self.connect = connect
+        self.upload_dir = str(upload_dir)
+        self.manual_dir = str(manual_dir)
+        self.io_budget = io_budget
+        self.batch_size = batch_size
+        self.orphan_grace = orphan_grace
+        self.busy = busy or (lambda: False)
+        self.max_yield = max_yield
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # --- state kept in the settings table ---
+    def _state(self, cur) -> Dict[str, Any]:
+        row = cur.execute("SELECT value FROM settings WHERE key='scrub_state'").fetchone()
+        return json.loads(row[0]) if row else {"status": "idle"}
+
+    def _save(self, cur, state: Dict[str, Any]):
+        cur.execute(
+            "INSERT INTO settings(key,value) VALUES ('scrub_state',?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (json.dumps(state),),
+        )
+
+    def state(self) -> Dict[str, Any]:
+        conn = self.connect()
+        state = self._state(conn.cursor())
+        conn.close()
+        return state
+
+    def status(self) -> Dict[str, Any]:
+        conn = self.connect()
+        cur = conn.cursor()
+        state = self._state(cur)
+        counts = {
+            r[0]: {"count": r[1], "bytes": r[2] or 0}
+            for r in cur.execute(
+                "SELECT kind, COUNT(*), SUM(bytes) FROM scrub_issues GROUP BY kind"
+            )
+        }
+        conn.close()
+        # the run may belong to another process; go by the shared state
+        state["running"] = state.get("status") in ("requested", "running")
+        state["issues"] = counts
+        return state
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def request(self, verify_hashes: bool = False) -> bool:
+        """Ask whichever process runs the scrubber for a run; False if one
+        is already requested or going."""
+        conn = self.connect()
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        state = self._state(cur)
+        if state.get("status") in ("requested", "running"):
+            conn.rollback()
+            conn.close()
+            return False
+        state.update(status="requested", verifyHashes=verify_hashes)
+        self._save(cur, state)
+        conn.commit()
+        conn.close()
+        return True
+
+    def start(self, verify_hashes: bool = False, resume: bool = False) -> bool:
+        """Start (or resume) a run on a background thread. False if one is
+        already going."""
+        with self._lock:
+            if self.running:
+                return False
+            conn = self.connect()
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            state = self._state(cur)
+            if not (resume and state.get("status") == "running"):
+                state = {
+                    "status": "running",
+                    "verifyHashes": verify_hashes,
+                    "startedAt": int(time.time() * 1000),
+                    "finishedAt": None,
+                    "cursor": "",
+                    "checked": 0,
+                    "bytesRead": 0,
+                }
+                cur.execute("DELETE FROM scrub_issues")
+                self._save(cur, state)
+            conn.commit()
+            conn.close()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(state,), name="scrubber", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _wait_idle(self):
+        deadline = time.monotonic() + self.max_yield
+        while self.busy() and time.monotonic() < deadline and not self._stop.is_set():
+            self._stop.wait(0.05)
+
+    # --- the run itself ---
+    def _list_uploads(self) -> Dict[str, List[Tuple[str, int, float]]]:
+        """id prefix -> [(filename, size, mtime), ...] for top-level model
+        files, sorted by name; usually one per prefix."""
+        files: Dict[str, List[Tuple[str, int, float]]] = {}
+        with os.scandir(self.upload_dir) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat()
+                files.setdefault(entry.name[:ID_LENGTH], []).append(
+                    (entry.name, st.st_size, st.st_mtime)
+                )
+        for found in files.values():
+            found.sort()
+        return files
+
+    def _list_manuals(self) -> Dict[str, Tuple[str, int, float]]:
+        files = {}
+        if not os.path.isdir(self.manual_dir):
+            return files
+        with os.scandir(self.manual_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False):
+                    st = entry.stat()
+                    files[entry.name[:-3]] = (entry.name, st.st_size, st.st_mtime)
+        return files
+
+    def _hash(self, path: str, budget: IOBudget, state: Dict[str, Any]) -> Optional[str]:
+        digest = hashlib.sha256()
+        try:
+            with open(path, "rb") as fh:
+                while not self._stop.is_set():
+                    self._wait_idle()
+                    chunk = fh.read(READ_CHUNK_SIZE)
+                    if not chunk:
+                        return digest.hexdigest()
+                    budget.consume(len(chunk))
+                    state["bytesRead"] += len(chunk)
+                    digest.update(chunk)
+        except OSError:
+            return None
+        return None
+
+    def _run(self, state: Dict[str, Any]):
+        try:
+            self._scrub(state)
+        except Exception:
+            log.exception("scrub failed")
+            conn = self.connect()
+            state["status"] = "failed"
+            self._save(conn.cursor(), state)
+            conn.commit()
+            conn.close()
+
+    def _scrub(self, state: Dict[str, Any]):
+        budget = IOBudget(self.io_budget)
+        uploads = self._list_uploads()
+        manuals = self._list_manuals()
+        verify = state.get("verifyHashes", False)
+        conn = self.connect()
+        cur = conn.cursor()
+        ids = set()
+
+        while not self._stop.is_set():
+            self._wait_idle()
+            rows = cur.execute(
+                "SELECT id, size, hash, manual FROM models WHERE id > ? ORDER BY id LIMIT ?",
+                (state["cursor"], self.batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            issues: List[tuple] = []
+            now = int(time.time() * 1000)
+            for row in rows:
+                mid = row["id"]
+                ids.add(mid)
+                stored = uploads.get(mid)
+                if not stored:
+                    issues.append((MISSING_FILE, mid, mid, None, None, None, now))
+                else:
+                    # with several files for one id, check the one of the recorded size
+                    name, size, _mtime = next(
+                        (f for f in stored if f[1] == row["size"]), stored[0]
+                    )
+                    path = os.path.join(self.upload_dir, name)
+                    if row["size"] is not None and row["size"] != size:
+                        issues.append((
+                            SIZE_MISMATCH, mid, mid, name,
+                            json.dumps({"recorded": row["size"], "actual": size}), size, now,
+                        ))
+                    if verify:
+                        digest = self._hash(path, budget, state)
+                        if digest is None:
+                            pass
+                        elif row["hash"] is None:
+                            issues.append((UNHASHED, mid, mid, name, digest, size, now))
+                        elif digest != row["hash"]:
+                            issues.append((
+                                HASH_MISMATCH, mid, mid, name,
+                                json.dumps({"recorded": row["hash"], "actual": digest}), size, now,
+                            ))
+                if row["manual"] and mid not in manuals:
+                    issues.append((MISSING_MANUAL, mid, mid, None, None, None, now))
+            if self._stop.is_set():
+                # the last row may be half checked; redo this batch on resume
+                break
+            cur.executemany(UPSERT_ISSUE, issues)
+            state["cursor"] = rows[-1]["id"]
+            state["checked"] += len(rows)
+            self._save(cur, state)
+            conn.commit()
+        if self._stop.is_set():
+            conn.close()
+            return
+
+        # files added while the rows were walked are not missing after all
+        present = self._list_uploads()
+        missing = cur.execute(
+            "SELECT ref FROM scrub_issues WHERE kind=?", (MISSING_FILE,)
+        ).fetchall()
+        cur.executemany(
+            "DELETE FROM scrub_issues WHERE kind=? AND ref=?",
+            [(MISSING_FILE, r[0]) for r in missing if r[0] in present],
+        )
+
+        # resumed runs skipped the rows before the cursor; fetch every id now
+        ids.update(r[0] for r in cur.execute("SELECT id FROM models"))
+        horizon = time.time() - self.orphan_grace
+        now = int(time.time() * 1000)
+        issues = []
+        # an upload writes its file before inserting the row, so young
+        # files are left alone
+        for prefix, found in uploads.items():
+            if prefix in ids:
+                continue
+            for name, size, mtime in found:
+                if mtime < horizon:
+                    issues.append((ORPHAN_FILE, name, None, name, None, size, now))
+        for mid, (name, size, mtime) in manuals.items():
+            if mid not in ids and mtime < horizon:
+                issues.append((ORPHAN_MANUAL, name, None, name, None, size, now))
+        ingest_dir = os.path.join(self.upload_dir, ".ingest")
+        if os.path.isdir(ingest_dir):
+            active = {
+                r[0] for r in cur.execute(
+                    "SELECT id FROM ingest_jobs WHERE status IN ('queued','running')"
+                )
+            }
+            for name in os.listdir(ingest_dir):
+                path = os.path.join(ingest_dir, name)
+                st = os.stat(path)
+                if name[:ID_LENGTH] not in active and st.st_mtime < horizon:
+                    rel = f".ingest/{name}"
+                    issues.append((ORPHAN_FILE, rel, None, rel, None, st.st_size, now))
+        cur.executemany(UPSERT_ISSUE, issues)
+        state["status"] = "done"
+        state["finishedAt"] = now
+        self._save(cur, state)
+        conn.commit()
+        conn.close()
@@ -0,0 +1,61 @@
+"""Production entrypoint: uvicorn with several worker processes.
+
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8080]
+
+The worker count defaults to WEB_CONCURRENCY, else the number of CPUs.
+Workers share the SQLite database; schema migrations run once under a lock
+and background jobs run only in the elected leader (see coordination.py).
+Several replicas behind a load balancer work the same way as long as they
+share DB_PATH and FILE_STORAGE.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+
+
+def prepare_metrics_dir(workers: int):
+    """Workers are separate processes; prometheus_client needs a shared
+    directory to add up their samples. Stale files from a previous run
+    would be counted too, so it starts out empty."""
+    if workers < 2:
+        return
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path = tempfile.mkdtemp(prefix="stlvault-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    os.makedirs(path, exist_ok=True)
+
+
+def main(argv=None, default_port: int = 8080, reload: bool = False):
+    parser = argparse.ArgumentParser(description="Run the STLVault API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", default_port)))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--reload", action="store_true", default=reload,
+                        help="restart on code changes (development, one worker)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    workers = 1 if args.reload else args.workers or default_workers()
+    prepare_metrics_dir(workers)
+    uvicorn.run(
+        "app:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        reload=args.reload,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
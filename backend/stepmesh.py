@@ -0,0 +1,279 @@
+"""Server-side STEP tessellation.
+
+Each job runs in its own child process (forked from a forkserver that has
+OpenCascade loaded already) with an address-space limit and a wall-clock
+timeout, so a pathological file can neither take the API down nor run
+forever. The child writes the mesh as binary STL and reports the triangle
+count, the bounding-box size and a rendered thumbnail.
+"""
+import base64
+import importlib.util
+import multiprocessing
+import os
+import resource
+import struct
+import time
+import zlib
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# chordal deviation as a fraction of the bounding-box diagonal
+LINEAR_TOLERANCE = 0.0005
+ANGULAR_TOLERANCE = 0.35  # radians
+THUMBNAIL_SIZE = 256
+# viewer material colour (#3b82f6)
+BASE_COLOR = (59, 130, 246)
+
+# NumPy is imported inside the functions that run in the child, so that
+# `import stepmesh` (and with it `import app`) stays free of it.
+_STL_FIELDS = [("normal", "<f4", 3), ("v", "<f4", (3, 3)), ("attr", "<u2")]
+
+
+class TessellationError(Exception):
+    pass
+
+
+def available() -> bool:
+    return importlib.util.find_spec("OCP") is not None
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    if "forkserver" in methods:
+        ctx = multiprocessing.get_context("forkserver")
+        # jobs fork from a server that has these imported already
+        ctx.set_forkserver_preload(["stepmesh", "numpy", "OCP.STEPControl", "OCP.BRepMesh"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+_ctx = None
+
+
+# --- runs in the child ---
+def read_step(path: str):
+    from OCP.IFSelect import IFSelect_RetDone
+    from OCP.STEPControl import STEPControl_Reader
+
+    reader = STEPControl_Reader()
+    if reader.ReadFile(path) != IFSelect_RetDone:
+        raise TessellationError("not a readable STEP file")
+    if reader.TransferRoots() == 0:
+        raise TessellationError("STEP file has no transferable shapes")
+    return reader.OneShape()
+
+
+def triangulate(shape, linear_tolerance: float, angular_tolerance: float) -> "np.ndarray":
+    """(n, 3, 3) float32 triangles of every face, outward winding."""
+    import numpy as np
+    from OCP.Bnd import Bnd_Box
+    from OCP.BRep import BRep_Tool
+    from OCP.BRepBndLib import BRepBndLib
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.TopAbs import TopAbs_FACE, TopAbs_REVERSED
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS
+
+    box = Bnd_Box()
+    BRepBndLib.Add_s(shape, box)
+    if box.IsVoid():
+        raise TessellationError("STEP file has no geometry")
+    diagonal = box.CornerMin().Distance(box.CornerMax()) or 1.0
+    BRepMesh_IncrementalMesh(
+        shape, diagonal * linear_tolerance, False, angular_tolerance, True
+    )
+
+    # a static method before OCP 7.8, a namespace function since
+    to_face = getattr(TopoDS, "Face_s", None) or TopoDS.Face
+    parts = []
+    explorer = TopExp_Explorer(shape, TopAbs_FACE)
+    while explorer.More():
+        face = to_face(explorer.Current())
+        location = TopLoc_Location()
+        mesh = BRep_Tool.Triangulation_s(face, location)
+        explorer.Next()
+        if mesh is None or mesh.NbTriangles() == 0:
+            continue
+        trsf = location.Transformation()
+        nodes = np.empty((mesh.NbNodes() + 1, 3), dtype=np.float64)
+        for i in range(1, mesh.NbNodes() + 1):
+            p = mesh.Node(i).Transformed(trsf)
+            nodes[i] = (p.X(), p.Y(), p.Z())
+        index = np.array(
+            [mesh.Triangle(i).Get() for i in range(1, mesh.NbTriangles() + 1)], dtype=np.int64
+        )
+        if face.Orientation() == TopAbs_REVERSED:
+            index = index[:, ::-1]
+        parts.append(nodes[index])
+    if not parts:
+        raise TessellationError("STEP file produced no triangles")
+    return np.concatenate(parts).astype(np.float32)
+
+
+def write_stl(path: str, tris: "np.ndarray"):
+    import numpy as np
+
+    normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    records = np.zeros(len(tris), dtype=np.dtype(_STL_FIELDS))
+    records["normal"] = normals
+    records["v"] = tris
+    with open(path, "wb") as fh:
+        fh.write(b"STLVault tessellated STEP".ljust(80, b" "))
+        fh.write(struct.pack("<I", len(tris)))
+        records.tofile(fh)
+
+
+def _png(rgba: "np.ndarray") -> bytes:
+    import numpy as np
+
+    height, width = rgba.shape[:2]
+    raw = np.concatenate(
+        [np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, -1)], axis=1
+    ).tobytes()
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+
+def render_thumbnail(tris: "np.ndarray", size: int = THUMBNAIL_SIZE, seed: int = 0) -> bytes:
+    """Isometric PNG of the mesh with a transparent background.
+
+    Points are sampled over every triangle in proportion to its projected
+    area, densely enough that each pixel gets several, and the nearest one
+    per pixel is kept and Lambert-shaded with its face normal.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    tris = tris.astype(np.float64)
+    tris = tris - tris.reshape(-1, 3).mean(axis=0)
+    # Z up, seen from the front-right and above
+    yaw, pitch = np.radians(-45.0), np.radians(-60.0)
+    rz = np.array([[np.cos(yaw), -np.sin(yaw), 0], [np.sin(yaw), np.cos(yaw), 0], [0, 0, 1]])
+    rx = np.array([[1, 0, 0], [0, np.cos(pitch), -np.sin(pitch)], [0, np.sin(pitch), np.cos(pitch)]])
+    view = tris @ (rx @ rz).T
+
+    lo = view.reshape(-1, 3).min(axis=0)
+    hi = view.reshape(-1, 3).max(axis=0)
+    scale = (size - 8) / max(hi[0] - lo[0], hi[1] - lo[1], 1e-9)
+    offset = (size - (hi[:2] - lo[:2]) * scale) / 2
+
+    normals = np.cross(view[:, 1] - view[:, 0], view[:, 2] - view[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    projected = np.abs(normals[:, 2]) * lengths[:, 0] / 2 * scale * scale
+    total = projected.sum()
+    if total <= 0:
+        return _png(np.zeros((size, size, 4), dtype=np.uint8))
+    samples = int(min(4_000_000, max(50_000, 8 * total)))
+    counts = rng.multinomial(samples, projected / total)
+    face = np.repeat(np.arange(len(view)), counts)
+    u, v = rng.random((2, len(face)))
+    flip = u + v > 1
+    u[flip], v[flip] = 1 - u[flip], 1 - v[flip]
+    a, b, c = view[face, 0], view[face, 1], view[face, 2]
+    points = a + (b - a) * u[:, None] + (c - a) * v[:, None]
+
+    px = ((points[:, 0] - lo[0]) * scale + offset[0]).astype(np.int64)
+    py = (size - 1 - ((points[:, 1] - lo[1]) * scale + offset[1])).astype(np.int64)
+    inside = (px >= 0) & (px < size) & (py >= 0) & (py < size)
+    pixel = py[inside] * size + px[inside]
+    depth = points[inside, 2]
+    face = face[inside]
+    # nearest sample per pixel: sort by pixel, then depth, keep the last
+    order = np.lexsort((depth, pixel))
+    pixel, face = pixel[order], face[order]
+    last = np.r_[pixel[1:] != pixel[:-1], True]
+    pixel, face = pixel[last], face[last]
+
+    light = np.array([-0.3, 0.4, 0.87])
+    light /= np.linalg.norm(light)
+    shade = 0.35 + 0.65 * np.abs(normals[face] @ light)
+    image = np.zeros((size * size, 4), dtype=np.uint8)
+    image[pixel, :3] = np.clip(np.array(BASE_COLOR, dtype=np.float32) * shade[:, None], 0, 255).astype(np.uint8)
+    image[pixel, 3] = 255
+    return _png(image.reshape(size, size, 4))
+
+
+def tessellate(src: str, dest: str, linear_tolerance: float = LINEAR_TOLERANCE,
+               angular_tolerance: float = ANGULAR_TOLERANCE,
+               thumbnail: bool = True) -> Dict[str, Any]:
+    start = time.perf_counter()
+    tris = triangulate(read_step(src), linear_tolerance, angular_tolerance)
+    write_stl(dest, tris)
+    flat = tris.reshape(-1, 3)
+    size = flat.max(axis=0) - flat.min(axis=0)
+    result: Dict[str, Any] = {
+        "triangles": int(len(tris)),
+        "size": [round(float(s), 3) for s in size],
+        "thumbnail": None,
+    }
+    if thumbnail:
+        result["thumbnail"] = "data:image/png;base64," + base64.b64encode(
+            render_thumbnail(tris)
+        ).decode()
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _child(src: str, dest: str, options: Dict[str, Any], memory_mb: int, conn):
+    if memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        conn.send(tessellate(src, dest, **options))
+    except MemoryError:
+        conn.send({"error": f"out of memory (limit {memory_mb} MB)"})
+    except Exception as e:
+        conn.send({"error": str(e) or type(e).__name__})
+    finally:
+        conn.close()
+
+
+# --- runs in the API process ---
+def mesh_step(src: str, dest: str, timeout: float, memory_mb: int,
+              **options) -> Dict[str, Any]:
+    """Tessellate src into dest (binary STL) in a child process. Raises
+    TessellationError on failure, timeout or when the limit is hit."""
+    global _ctx
+    if _ctx is None:
+        _ctx = _context()
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    receiver, sender = _ctx.Pipe(duplex=False)
+    proc = _ctx.Process(target=_child, args=(src, tmp, options, memory_mb, sender), daemon=True)
+    proc.start()
+    sender.close()
+    result: Optional[Dict[str, Any]] = None
+    try:
+        # also returns once the child dies without answering
+        if receiver.poll(timeout):
+            try:
+                result = receiver.recv()
+            except EOFError:
+                proc.join(5)
+                result = {"error": f"tessellation process died (exit code {proc.exitcode}); "
+                                   f"memory limit is {memory_mb} MB"}
+        else:
+            result = {"error": f"timed out after {timeout:g} s"}
+    finally:
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        receiver.close()
+    if "error" in result:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise TessellationError(result["error"])
+    os.replace(tmp, dest)
+    return result
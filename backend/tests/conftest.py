@@ -0,0 +1,137 @@
+"""Shared fixtures.
+
+Every test that uses `client` or `conn` runs once on SQLite and, when
+DATABASE_URL points at a PostgreSQL server, once more on a throwaway
+database created there (the URL's user needs CREATEDB):
+
+    python -m pytest tests
+    DATABASE_URL=postgresql://postgres@localhost/postgres python -m pytest tests
+
+The app is imported once, against a temporary DB_PATH and FILE_STORAGE;
+`db.configure` switches it between the two databases.
+"""
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+POSTGRES_URL = os.environ.pop("DATABASE_URL", "")
+_WORKDIR = tempfile.mkdtemp(prefix="stlvault-tests-")
+os.environ.update({
+    "DB_PATH": os.path.join(_WORKDIR, "data.db"),
+    "FILE_STORAGE": os.path.join(_WORKDIR, "uploads"),
+    "SCRUB_INTERVAL_HOURS": "0",
+    "FINGERPRINT_WORKERS": "1",
+    "STEP_WORKERS": "1",
+})
+
+BACKENDS = ["sqlite"] + (["postgres"] if POSTGRES_URL else [])
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+
+def _create_database(admin_url: str) -> str:
+    import psycopg
+
+    name = f"stlvault_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(admin_url, autocommit=True) as conn:
+        conn.execute(f"CREATE DATABASE {name}")
+    return urlunsplit(urlsplit(admin_url)._replace(path="/" + name))
+
+
+def _drop_database(admin_url: str, url: str):
+    import psycopg
+
+    with psycopg.connect(admin_url, autocommit=True) as conn:
+        conn.execute(f"DROP DATABASE IF EXISTS {urlsplit(url).path[1:]} WITH (FORCE)")
+
+
+@pytest.fixture(scope="session", params=BACKENDS)
+def database(request):
+    """The backend name, with `db` configured for it and an empty database."""
+    import db
+
+    if request.param == "sqlite":
+        for suffix in ("", "-wal", "-shm"):
+            Path(os.environ["DB_PATH"] + suffix).unlink(missing_ok=True)
+        db.configure("")
+        yield "sqlite"
+        return
+    url = _create_database(POSTGRES_URL)
+    db.configure(url)
+    try:
+        yield "postgres"
+    finally:
+        db.configure("")
+        _drop_database(POSTGRES_URL, url)
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    """A TestClient for `app`, started on the current database with empty
+    storage."""
+    from fastapi.testclient import TestClient
+
+    import app
+
+    shutil.rmtree(app.UPLOAD_DIR, ignore_errors=True)
+    for cache in (app.library_cache, app.setting_cache, app.model_cache):
+        cache.clear()
+    with TestClient(app.app) as client:
+        yield client
+
+
+@pytest.fixture
+def app_module(client):
+    import app
+
+    return app
+
+
+@pytest.fixture
+def conn(app_module):
+    conn = app_module.get_db_conn()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def folder(client):
+    """A new, empty folder's id, so tests don't see each other's models."""
+    r = client.post("/api/folders", json={"name": f"test {uuid.uuid4().hex[:6]}", "parentId": "1"})
+    r.raise_for_status()
+    return r.json()["id"]
+
+
+def stl(seed: int = 0, triangles: int = 4) -> bytes:
+    """A small binary STL; different seeds give different bytes."""
+    out = bytearray(f"test {seed}".encode().ljust(80, b" "))
+    out += struct.pack("<I", triangles)
+    for i in range(triangles):
+        out += struct.pack("<12fH", 0, 0, 1, seed, i, 0, i + 1, 0, 0, 0, 1, 1, 0)
+    return bytes(out)
+
+
+@pytest.fixture
+def upload(client, folder):
+    """upload(name="part.stl", body=None, **form) -> the new model."""
+    def upload(name: str = "part.stl", body: bytes = None, **form):
+        r = client.post(
+            "/api/models/upload",
+            files={"file": (name, stl() if body is None else body)},
+            data={"folderId": folder, **form},
+        )
+        r.raise_for_status()
+        return r.json()
+    return upload
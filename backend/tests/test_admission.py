@@ -0,0 +1,28 @@
+import asyncio
+
+from admission import Lane
+
+
+def test_cancelling_an_evicted_waiter_keeps_the_slot_count():
+    async def scenario():
+        lane = Lane("uploads", [], concurrency=1, client_concurrency=1, queue=2)
+        await lane.acquire("a")
+        waiters = [asyncio.ensure_future(lane.acquire("a")) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert lane.queued == 2
+
+        # "b" pushes out a's newest waiter, whose client disconnects at once
+        assert lane._evict_for("b")
+        waiters[1].cancel()
+        await asyncio.gather(waiters[1], return_exceptions=True)
+        assert lane.active == 1
+        assert lane.active_by_client == {"a": 1}
+
+        lane.release("a", None)
+        await waiters[0]
+        assert lane.active == 1
+        assert lane.queued == 0
+        lane.release("a", None)
+        assert lane.active == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR, stl
+
+
+def test_model_round_trip(client, folder, upload):
+    body = stl(seed=7)
+    model = upload("bracket.stl", body, tags='["mount"]')
+    assert model["folderId"] == folder
+    assert model["size"] == len(body)
+
+    listed = client.get("/api/models", params={"folderId": folder}).json()
+    assert [m["id"] for m in listed] == [model["id"]]
+    assert listed[0]["tags"] == ["mount"]
+
+    r = client.get(f"/api/models/{model['id']}/download")
+    assert r.status_code == 200
+    assert r.content == body
+
+    r = client.patch(f"/api/models/{model['id']}",
+                     json={"name": "Bracket v2", "tags": ["mount", "wall"]})
+    assert r.json()["name"] == "Bracket v2"
+    found = client.get("/api/models", params={"folderId": folder, "q": "BRACKET"}).json()
+    assert [m["tags"] for m in found] == [["mount", "wall"]]
+
+    assert client.delete(f"/api/models/{model['id']}").json() == {"ok": True}
+    assert client.get("/api/models", params={"folderId": folder}).json() == []
+    assert client.get(f"/api/models/{model['id']}/download").status_code == 404
+
+
+def test_folders(client, folder):
+    child = client.post("/api/folders", json={"name": "child", "parentId": folder}).json()
+    assert client.delete(f"/api/folders/{folder}").status_code == 400
+    renamed = client.patch(f"/api/folders/{child['id']}", json={"name": "renamed"}).json()
+    assert renamed == {"id": child["id"], "name": "renamed", "parentId": folder}
+    assert client.delete(f"/api/folders/{child['id']}").json() == {"ok": True}
+    ids = {f["id"] for f in client.get("/api/folders").json()}
+    assert folder in ids and child["id"] not in ids
+
+
+def test_bulk_operations(client, folder, upload):
+    ids = [upload(f"p{i}.stl", stl(seed=i))["id"] for i in range(3)]
+    other = client.post("/api/folders", json={"name": "other", "parentId": "1"}).json()["id"]
+
+    client.post("/api/models/bulk-tag", json={"ids": ids, "tags": ["batch"]}).raise_for_status()
+    client.post("/api/models/bulk-move",
+                json={"ids": ids[:2], "folderId": other}).raise_for_status()
+    moved = client.get("/api/models", params={"folderId": other}).json()
+    assert sorted(m["id"] for m in moved) == sorted(ids[:2])
+    assert all("batch" in m["tags"] for m in moved)
+
+    client.post("/api/models/bulk-delete", json={"ids": ids}).raise_for_status()
+    assert client.get("/api/models", params={"folderId": other}).json() == []
+    assert client.get("/api/models", params={"folderId": folder}).json() == []
+
+
+def test_import_app_stays_light():
+    # heavy modules load on first use, not when the app is imported
+    code = "import sys, app; print(sorted({'numpy', 'OCP'} & set(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=os.environ,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,91 @@
+import os
+
+import backup
+import db
+from conftest import stl
+
+
+def run_backup(app_module, dest):
+    return backup.backup(str(dest), db_path=app_module.DB_PATH,
+                         upload_dir=app_module.UPLOAD_DIR, manual_dir=app_module.MANUAL_DIR)
+
+
+def test_files_are_copied_before_the_database(app_module, upload, tmp_path, monkeypatch):
+    upload("kept.stl", stl(seed=50))
+    order = []
+    store_blob, snapshot_db = backup.store_blob, backup.snapshot_db
+    monkeypatch.setattr(backup, "store_blob",
+                        lambda *a: order.append("file") or store_blob(*a))
+    monkeypatch.setattr(backup, "snapshot_db",
+                        lambda *a: order.append("database") or snapshot_db(*a))
+
+    result = run_backup(app_module, tmp_path / "backups")
+    assert not result["libraryChanged"]
+    assert "file" in order
+    if not db.POSTGRES:
+        assert order[-1] == "database"
+
+
+def test_restore_round_trip(app_module, upload, tmp_path):
+    model = upload("round.stl", stl(seed=51))
+    run_backup(app_module, tmp_path / "backups")
+
+    target = tmp_path / "restored"
+    result = backup.restore(str(tmp_path / "backups"), db_path=str(target / "data.db"),
+                            upload_dir=str(target / "uploads"),
+                            manual_dir=str(target / "manuals"))
+    assert "warning" not in result
+    stored = app_module.get_model_info(model["id"])["file"]
+    with open(target / "uploads" / stored, "rb") as fh:
+        assert fh.read() == stl(seed=51)
+    if not db.POSTGRES:
+        assert backup.library_version(str(target / "data.db")) == backup.library_version(
+            app_module.DB_PATH)
+
+
+def test_changes_during_the_backup_are_flagged(app_module, client, upload, tmp_path, monkeypatch):
+    upload("before.stl", stl(seed=52))
+    walk_roots = backup.walk_roots
+
+    def walk_then_upload(roots):
+        found = walk_roots(roots)
+        upload("during.stl", stl(seed=53))
+        return found
+
+    monkeypatch.setattr(backup, "walk_roots", walk_then_upload)
+    result = run_backup(app_module, tmp_path / "backups")
+    assert result["libraryChanged"]
+
+    manifest = backup.load_manifest(str(tmp_path / "backups"))
+    assert manifest["libraryVersion"] > manifest["filesLibraryVersion"]
+    target = tmp_path / "restored"
+    restored = backup.restore(str(tmp_path / "backups"), db_path=str(target / "data.db"),
+                              upload_dir=str(target / "uploads"),
+                              manual_dir=str(target / "manuals"))
+    assert "library changed" in restored["warning"]
+
+
+def test_backups_in_the_same_second_get_their_own_snapshot(tmp_path):
+    dest = str(tmp_path / "backups")
+    first, _ = backup.new_snapshot_dir(dest, 1_800_000_000.0)
+    second, second_dir = backup.new_snapshot_dir(dest, 1_800_000_000.5)
+    assert second == f"{first}-2"
+    assert os.path.isdir(second_dir)
+    later, _ = backup.new_snapshot_dir(dest, 1_800_000_001.0)
+    assert sorted([later, second, first]) == [first, second, later]
+
+
+def test_restore_quarantines_files_the_snapshot_does_not_list(app_module, upload, tmp_path):
+    upload("listed.stl", stl(seed=55))
+    snapshot = run_backup(app_module, tmp_path / "backups")["snapshot"]
+    target = tmp_path / "restored"
+    (target / "uploads").mkdir(parents=True)
+    (target / "uploads" / "stray.stl").write_bytes(stl(seed=56))
+
+    result = backup.restore(str(tmp_path / "backups"), db_path=str(target / "data.db"),
+                            upload_dir=str(target / "uploads"),
+                            manual_dir=str(target / "manuals"))
+    assert result["quarantined"] == 1
+    assert not (target / "uploads" / "stray.stl").exists()
+    moved = target / "uploads" / ".quarantine" / f"restore-{snapshot}" / "uploads" / "stray.stl"
+    assert moved.read_bytes() == stl(seed=56)
@@ -0,0 +1,39 @@
+import sqlite3
+
+import coordination
+
+
+def test_a_failed_renew_keeps_leadership_until_the_lease_expires(tmp_path):
+    path = str(tmp_path / "coordination.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE workers (id TEXT PRIMARY KEY, host TEXT, pid INTEGER, "
+                     "startedAt INTEGER, heartbeatAt INTEGER)")
+        conn.execute("CREATE TABLE leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, "
+                     "expiresAt INTEGER NOT NULL)")
+    locked = []
+
+    def connect():
+        if locked:
+            raise sqlite3.OperationalError("database is locked")
+        return sqlite3.connect(path)
+
+    events = []
+    coordinator = coordination.Coordinator(
+        connect, lease_seconds=30,
+        on_elected=[lambda: events.append("elected")],
+        on_demoted=[lambda: events.append("demoted")],
+    )
+    coordinator._tick()
+    assert coordinator.is_leader and events == ["elected"]
+
+    locked.append(True)
+    coordinator._tick()
+    assert coordinator.is_leader and events == ["elected"]
+
+    coordinator.lease_expiry = coordination.now_ms() - 1
+    coordinator._tick()
+    assert not coordinator.is_leader and events == ["elected", "demoted"]
+
+    locked.clear()
+    coordinator._tick()
+    assert coordinator.is_leader and events == ["elected", "demoted", "elected"]
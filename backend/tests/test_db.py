@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+import db
+
+
+# --- translation to PostgreSQL (pure, runs without a server) ---
+def test_placeholders_become_format_params():
+    sql, writes = db.translate("SELECT * FROM models WHERE id=? AND folderId=?")
+    assert sql == "SELECT * FROM models WHERE id=%s AND folderId=%s"
+    assert not writes
+
+
+def test_placeholders_and_percent_inside_literals():
+    sql, _ = db.translate("SELECT 'why?' , name FROM models WHERE name LIKE '50%' AND id=?")
+    assert sql == "SELECT 'why?' , name FROM models WHERE name LIKE '50%%' AND id=%s"
+
+
+def test_null_safe_is():
+    sql, _ = db.translate("SELECT id FROM folders WHERE parentId IS ? AND name IS NOT ?")
+    assert sql == (
+        "SELECT id FROM folders WHERE parentId IS NOT DISTINCT FROM %s "
+        "AND name IS DISTINCT FROM %s"
+    )
+    # IS NULL has no placeholder and is left alone
+    assert db.translate("SELECT 1 WHERE x IS NULL")[0] == "SELECT 1 WHERE x IS NULL"
+
+
+@pytest.mark.parametrize("begin", ["BEGIN IMMEDIATE", "begin exclusive", "  BEGIN IMMEDIATE"])
+def test_begin_immediate_takes_the_advisory_lock(begin):
+    sql, writes = db.translate(begin)
+    assert sql == f"SELECT pg_advisory_xact_lock({db.WRITE_LOCK})"
+    assert writes
+
+
+def test_writes_are_detected():
+    for sql in ("INSERT INTO t VALUES (?)", "update t SET a=?", " DELETE FROM t"):
+        assert db.translate(sql)[1]
+    upsert, writes = db.translate(
+        "INSERT INTO settings(key,value) VALUES (?,?) "
+        "ON CONFLICT(key) DO UPDATE SET value=excluded.value"
+    )
+    assert writes
+    assert upsert.endswith("ON CONFLICT(key) DO UPDATE SET value=excluded.value")
+
+
+def test_ddl_types():
+    sql, _ = db.translate(
+        "CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, n INTEGER, r REAL, b BLOB)"
+    )
+    assert sql == (
+        "CREATE TABLE t (id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, "
+        "n BIGINT, r DOUBLE PRECISION, b BYTEA)"
+    )
+    assert db.translate("ALTER TABLE t ADD COLUMN c INTEGER")[0] == (
+        "ALTER TABLE t ADD COLUMN IF NOT EXISTS c BIGINT"
+    )
+    # only DDL is rewritten
+    assert db.translate("SELECT CAST(x AS INTEGER)")[0] == "SELECT CAST(x AS INTEGER)"
+
+
+def test_row_lookup_ignores_case():
+    row = db._row_class(("id", "foldername"))(("a", "b"))
+    assert row["folderName"] == row[1] == "b"
+    assert row.keys() == ["id", "foldername"]
+
+
+def test_batches_are_sorted_and_unique(monkeypatch):
+    monkeypatch.setattr(db, "POSTGRES", False)
+    monkeypatch.setattr(db, "SQLITE_BATCH", 2)
+    assert list(db.batches([3, 1, 2, 1])) == [[1, 2], [3]]
+    monkeypatch.setattr(db, "POSTGRES", True)
+    assert list(db.batches([3, 1, 2])) == [[1, 2, 3]]
+    assert list(db.batches([])) == []
+
+
+# --- against the configured database ---
+def test_upsert(conn):
+    sql = (
+        "INSERT INTO settings(key,value) VALUES (?,?) "
+        "ON CONFLICT(key) DO UPDATE SET value=excluded.value"
+    )
+    conn.execute(sql, ("test_upsert", "a"))
+    conn.execute(sql, ("test_upsert", "b"))
+    conn.execute(
+        "INSERT INTO settings(key,value) VALUES (?,?) ON CONFLICT(key) DO NOTHING",
+        ("test_upsert", "c"),
+    )
+    conn.commit()
+    rows = conn.execute("SELECT value FROM settings WHERE key=?", ("test_upsert",)).fetchall()
+    assert [r["value"] for r in rows] == ["b"]
+
+
+def test_null_safe_comparison(conn):
+    conn.execute(
+        "INSERT INTO folders(id,name,parentId,updatedAt) VALUES (?,?,?,?)",
+        ("test-null-root", "test null root", None, 0),
+    )
+    conn.commit()
+    ids = [r[0] for r in conn.execute(
+        "SELECT id FROM folders WHERE parentId IS ? AND name=?", (None, "test null root"))]
+    assert ids == ["test-null-root"]
+
+
+def test_in_list(conn):
+    sql, params = db.in_list(["1", "no-such-folder"])
+    rows = conn.execute(f"SELECT id FROM folders WHERE id {sql}", params).fetchall()
+    assert [r["id"] for r in rows] == ["1"]
+
+
+def test_uncommitted_writes_are_dropped_on_close(app_module):
+    conn = app_module.get_db_conn()
+    conn.execute("INSERT INTO settings(key,value) VALUES ('test_dropped','x')")
+    conn.close()
+    conn = app_module.get_db_conn()
+    assert conn.execute("SELECT 1 FROM settings WHERE key='test_dropped'").fetchone() is None
+    conn.close()
+
+
+def test_begin_immediate_serializes_writers(app_module):
+    first = app_module.get_db_conn()
+    second = app_module.get_db_conn(check_same_thread=False)
+    acquired = []
+    try:
+        first.execute("BEGIN IMMEDIATE")
+
+        def take():
+            second.execute("BEGIN IMMEDIATE")
+            acquired.append(time.monotonic())
+            second.rollback()
+
+        thread = threading.Thread(target=take)
+        thread.start()
+        time.sleep(0.3)
+        assert not acquired
+        released = time.monotonic()
+        first.rollback()
+        thread.join(10)
+        assert acquired and acquired[0] >= released
+    finally:
+        first.close()
+        second.close()
+
+
+def test_migrations_are_current_and_idempotent(app_module, conn):
+    cur = conn.cursor()
+    assert db.schema_version(cur) == app_module.SCHEMA_VERSION
+    # replay every migration over the existing schema and data
+    db.set_schema_version(cur, 0)
+    conn.commit()
+    app_module.migrate_db(conn)
+    assert db.schema_version(conn.cursor()) == app_module.SCHEMA_VERSION
+    for table in ("folders", "models", "settings", "tombstones", "fingerprints",
+                  "model_versions", "ingest_jobs", "workers"):
+        conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+    root = conn.execute("SELECT id FROM folders WHERE id='1'").fetchone()
+    assert root is not None
@@ -0,0 +1,95 @@
+import os
+import time
+
+import pytest
+
+import dropwatch
+from conftest import stl
+
+
+def watcher_for(tmp_path, on_batch, **kwargs):
+    root = tmp_path / "drop"
+    (root / "brackets").mkdir(parents=True)
+    (root / "brackets" / "arm.stl").write_bytes(stl(seed=50))
+    watcher = dropwatch.DropWatcher(
+        [dropwatch.DropDir(str(root), "1")], on_batch, settle=0, mode="poll", **kwargs
+    )
+    return watcher, str(root / "brackets" / "arm.stl")
+
+
+def step(watcher):
+    watcher.scan()
+    watcher._flush(watcher._settled())
+
+
+def test_failed_batch_is_retried_not_marked_seen(tmp_path):
+    calls = []
+
+    def on_batch(batch):
+        calls.append([f.path for f in batch])
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+
+    watcher, path = watcher_for(tmp_path, on_batch, retry_delay=0)
+    step(watcher)
+    assert path not in watcher.seen
+    assert watcher.pending_count == 1
+    step(watcher)
+    assert calls == [[path], [path]]
+    assert path in watcher.seen and watcher.pending_count == 0
+    step(watcher)
+    assert len(calls) == 2
+
+
+def test_retries_back_off(tmp_path):
+    watcher, path = watcher_for(tmp_path, lambda batch: batch,
+                                retry_delay=30, retry_max_delay=100)
+    watcher.scan()
+    dropped = watcher._settled()
+    delays = []
+    for _ in range(4):
+        watcher._flush(dropped)
+        delays.append(watcher._pending[path][2] - time.monotonic())
+        # not due yet
+        assert watcher._settled() == []
+    assert [round(d) for d in delays] == [30, 60, 100, 100]
+    assert path not in watcher.seen
+
+
+def test_failed_transaction_puts_moved_files_back(app_module, tmp_path, monkeypatch):
+    root = tmp_path / "drop"
+    root.mkdir()
+    src = root / "gear.stl"
+    src.write_bytes(stl(seed=51))
+    st = os.stat(src)
+    dropped = dropwatch.DroppedFile(dropwatch.DropDir(str(root), "1"), [], "gear.stl",
+                                    str(src), st.st_size, st.st_mtime_ns)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    before = set(os.listdir(app_module.UPLOAD_DIR))
+    monkeypatch.setattr(app_module, "DROP_ACTION", "move")
+    monkeypatch.setattr(app_module, "insert_model", broken)
+    with pytest.raises(RuntimeError):
+        app_module.ingest_dropped([dropped])
+    assert src.read_bytes() == stl(seed=51)
+    assert set(os.listdir(app_module.UPLOAD_DIR)) == before
+
+    monkeypatch.undo()
+    assert app_module.ingest_dropped([dropped]) == []
+    assert not src.exists()
+
+
+def test_link_gives_the_vault_its_own_bytes(tmp_path):
+    src, dest = tmp_path / "gear.stl", tmp_path / "stored.stl"
+    src.write_bytes(stl(seed=52))
+    size, digest = dropwatch.place_file(str(src), str(dest), "link")
+    assert src.exists() and size == len(stl(seed=52))
+    assert os.stat(src).st_ino != os.stat(dest).st_ino
+    # a slicer re-exporting in place must not touch the stored model
+    with open(src, "r+b") as fh:
+        fh.truncate(0)
+        fh.write(stl(seed=53))
+    assert dest.read_bytes() == stl(seed=52)
+    assert dropwatch.file_sha256(str(dest)) == digest
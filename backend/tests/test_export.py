@@ -0,0 +1,52 @@
+import io
+import os
+import zipfile
+
+import orjson
+
+import db
+import zipstream
+from conftest import stl
+
+
+def unzip(body: bytes) -> zipfile.ZipFile:
+    zf = zipfile.ZipFile(io.BytesIO(body))
+    assert zf.testzip() is None
+    return zf
+
+
+def test_old_and_far_future_mtimes_are_clamped(tmp_path):
+    old, future = tmp_path / "old.stl", tmp_path / "future.stl"
+    old.write_bytes(b"old")
+    future.write_bytes(b"future")
+    os.utime(old, (0, 0))
+    os.utime(future, (2 ** 33, 2 ** 33))
+    zf = unzip(b"".join(zipstream.stream_zip([("old.stl", str(old)), ("future.stl", str(future))])))
+    assert zf.getinfo("old.stl").date_time == (1980, 1, 1, 0, 0, 0)
+    assert zf.getinfo("future.stl").date_time == (2107, 12, 31, 23, 59, 58)
+    assert zf.read("old.stl") == b"old"
+
+
+def test_folder_export_spans_batches(client, folder, upload, monkeypatch):
+    monkeypatch.setattr(db, "SQLITE_BATCH", 2)
+    parent = folder
+    for depth in range(4):
+        upload(f"part{depth}.stl", stl(seed=60 + depth), folderId=parent)
+        parent = client.post("/api/folders", json={"name": f"sub{depth}", "parentId": parent}).json()["id"]
+    r = client.get(f"/api/folders/{folder}/export")
+    assert r.status_code == 200
+    zf = unzip(r.content)
+    manifest = orjson.loads(zf.read("manifest.json"))
+    assert len(manifest["models"]) == 4
+    paths = [m["path"] for m in manifest["models"]]
+    assert all(p in zf.namelist() for p in paths)
+    assert any(p.endswith("sub0/sub1/sub2/part3.stl") for p in paths)
+
+
+def test_model_export_spans_batches(client, upload, monkeypatch):
+    monkeypatch.setattr(db, "SQLITE_BATCH", 2)
+    ids = [upload(f"m{i}.stl", stl(seed=70 + i))["id"] for i in range(5)]
+    r = client.post("/api/models/export", json={"ids": ids + ids[:1], "flat": True})
+    assert r.status_code == 200
+    manifest = orjson.loads(unzip(r.content).read("manifest.json"))
+    assert sorted(m["id"] for m in manifest["models"]) == sorted(ids)
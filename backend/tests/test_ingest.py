@@ -0,0 +1,29 @@
+import os
+import zipfile
+
+from conftest import stl
+
+
+def test_failed_batch_leaves_no_files_behind(app_module, conn, folder, monkeypatch, tmp_path):
+    archive = tmp_path / "pack.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for i in range(5):
+            zf.writestr(f"pack/part{i}.stl", stl(seed=80 + i))
+    update = app_module.update_ingest_job
+
+    def locked(cur, job_id, **fields):
+        # the job's own status updates work; the batch flush doesn't
+        if "status" not in fields:
+            raise RuntimeError("database is locked")
+        update(cur, job_id, **fields)
+
+    monkeypatch.setattr(app_module, "INGEST_BATCH_SIZE", 2)
+    monkeypatch.setattr(app_module, "update_ingest_job", locked)
+    os.makedirs(app_module.UPLOAD_DIR, exist_ok=True)
+    before = set(os.listdir(app_module.UPLOAD_DIR))
+    rows = conn.execute("SELECT COUNT(*) FROM models").fetchone()[0]
+    app_module.run_ingest("job", str(archive), "zip", "pack", folder, [])
+
+    assert set(os.listdir(app_module.UPLOAD_DIR)) == before
+    assert conn.execute("SELECT COUNT(*) FROM models").fetchone()[0] == rows
+    assert not archive.exists()
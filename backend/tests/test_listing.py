@@ -0,0 +1,100 @@
+from conftest import stl
+
+
+def delta(client, since, **params):
+    r = client.get("/api/models", params={"modifiedSince": since, **params})
+    r.raise_for_status()
+    body = r.json()
+    assert body["full"] is False
+    return {m["id"] for m in body["changed"]}, set(body["deleted"]), body["serverTime"]
+
+
+def test_etag_revalidation(client, upload):
+    r = client.get("/api/models")
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"lib-')
+    assert client.get("/api/models", headers={"If-None-Match": etag}).status_code == 304
+
+    # without thumbnails the body differs, so the tag does too
+    lean = client.get("/api/models", params={"thumbnails": 0}).headers["etag"]
+    assert lean != etag
+
+    upload()
+    r = client.get("/api/models", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+    folders = client.get("/api/folders").headers["etag"]
+    assert client.get("/api/folders", headers={"If-None-Match": folders}).status_code == 304
+
+
+def test_delta_reports_changes_and_deletes(client, folder, upload):
+    kept = upload("kept.stl")
+    gone = upload("gone.stl", stl(seed=1))
+    since = client.get("/api/models", params={"modifiedSince": 0}).json()["serverTime"]
+
+    client.patch(f"/api/models/{kept['id']}", json={"description": "edited"})
+    client.delete(f"/api/models/{gone['id']}")
+    added = upload("added.stl", stl(seed=2))
+
+    changed, deleted, _ = delta(client, since, folderId=folder)
+    assert changed == {kept["id"], added["id"]}
+    assert deleted == {gone["id"]}
+
+
+def test_delta_applies_the_listing_filters(client, folder, upload):
+    match = upload("gear.stl", stl(seed=3))
+    other = upload("bolt.stl", stl(seed=4))
+    since = client.get("/api/models", params={"modifiedSince": 0}).json()["serverTime"]
+
+    client.patch(f"/api/models/{match['id']}", json={"description": "touched"})
+    client.patch(f"/api/models/{other['id']}", json={"description": "touched"})
+    changed, deleted, since2 = delta(client, since, folderId=folder, q="gear")
+    full = {m["id"] for m in client.get("/api/models", params={"folderId": folder, "q": "gear"}).json()}
+    assert changed == full == {match["id"]}
+    assert other["id"] in deleted
+
+    # renamed out of the search: gone from this view
+    client.patch(f"/api/models/{match['id']}", json={"name": "sprocket.stl"})
+    changed, deleted, _ = delta(client, since2, folderId=folder, q="gear")
+    assert changed == set()
+    assert match["id"] in deleted
+
+
+def test_delta_scopes_deletes_to_the_folder(client, folder, upload):
+    other = client.post("/api/folders", json={"name": "elsewhere", "parentId": "1"}).json()["id"]
+    mine = upload("mine.stl", stl(seed=5))
+    theirs = client.post("/api/models/upload", files={"file": ("theirs.stl", stl(seed=6))},
+                         data={"folderId": other}).json()
+    since = client.get("/api/models", params={"modifiedSince": 0}).json()["serverTime"]
+
+    client.post("/api/models/bulk-delete", json={"ids": [theirs["id"]]})
+    client.delete(f"/api/models/{mine['id']}")
+
+    _, deleted, _ = delta(client, since, folderId=folder)
+    assert deleted == {mine["id"]}
+    _, deleted, _ = delta(client, since, folderId=other)
+    assert deleted == {theirs["id"]}
+    _, deleted, _ = delta(client, since)
+    assert {mine["id"], theirs["id"]} <= deleted
+
+
+def test_moved_model_looks_deleted_to_its_old_folder(client, folder, upload):
+    other = client.post("/api/folders", json={"name": "target", "parentId": "1"}).json()["id"]
+    model = upload("moving.stl", stl(seed=7))
+    since = client.get("/api/models", params={"modifiedSince": 0}).json()["serverTime"]
+
+    client.post("/api/models/bulk-move", json={"ids": [model["id"]], "folderId": other})
+    assert delta(client, since, folderId=folder)[:2] == (set(), {model["id"]})
+    assert delta(client, since, folderId=other)[:2] == ({model["id"]}, set())
+
+
+def test_folder_delta(client):
+    since = client.get("/api/folders", params={"modifiedSince": 0}).json()["serverTime"]
+    created = client.post("/api/folders", json={"name": "new", "parentId": "1"}).json()
+    doomed = client.post("/api/folders", json={"name": "doomed", "parentId": "1"}).json()
+    client.delete(f"/api/folders/{doomed['id']}")
+    body = client.get("/api/folders", params={"modifiedSince": since}).json()
+    assert body["full"] is False
+    assert created["id"] in {f["id"] for f in body["changed"]}
+    assert doomed["id"] in body["deleted"]
@@ -0,0 +1,51 @@
+"""The load-test harness in benchmarks/, run at a tiny size so a change that
+breaks a benchmarked endpoint (or the harness) fails here first."""
+import json
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+sys.path.insert(0, str(BACKEND_DIR / "benchmarks"))
+import load_test  # noqa: E402
+
+SCENARIOS = {
+    "list_models", "list_models_folder", "list_models_revalidate", "download",
+    "upload", "bulk_tag", "bulk_move", "storage_stats", "bulk_delete",
+}
+
+
+def test_percentile():
+    assert load_test.percentile([], 50) is None
+    assert load_test.percentile([10.0], 99) == 10.0
+    assert load_test.percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+
+
+def test_compare_against_a_baseline():
+    baseline = {"scenarios": [
+        {"scenario": "download", "throughputRps": 100, "p50Ms": 10, "p95Ms": 0, "p99Ms": 40},
+    ]}
+    results = {"scenarios": [
+        {"scenario": "download", "throughputRps": 150, "p50Ms": 5, "p95Ms": 7, "p99Ms": 40},
+        {"scenario": "upload", "throughputRps": 1, "p50Ms": 1, "p95Ms": 1, "p99Ms": 1},
+    ]}
+    # a zero baseline value has no relative change
+    assert load_test.compare(results, baseline) == {
+        "download": {"throughputRps": 50.0, "p50Ms": -50.0, "p99Ms": 0.0},
+    }
+
+
+def test_small_run_reports_every_scenario(tmp_path):
+    output = tmp_path / "report.json"
+    subprocess.run(
+        [sys.executable, "benchmarks/load_test.py", "--folders", "3", "--models", "12",
+         "--min-size", "200", "--max-size", "2000", "--concurrency", "2",
+         "--requests", "6", "--batch", "4", "--output", str(output)],
+        cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL, timeout=120,
+    )
+    report = json.loads(output.read_text())
+    assert report["seed"] == {**report["seed"], "folders": 3, "models": 12}
+    assert {s["scenario"] for s in report["scenarios"]} == SCENARIOS
+    for s in report["scenarios"]:
+        assert s["errors"] == 0, s
+        assert s["p50Ms"] <= s["p95Ms"] <= s["p99Ms"]
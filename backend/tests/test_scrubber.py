@@ -0,0 +1,87 @@
+import os
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import scrubber
+from conftest import stl
+
+
+def test_busy_server_slows_a_run_but_never_stalls_it(app_module, upload):
+    for seed in range(3):
+        upload(f"s{seed}.stl", stl(seed=40 + seed))
+    scrub = scrubber.Scrubber(
+        app_module.get_db_conn,
+        app_module.UPLOAD_DIR,
+        app_module.MANUAL_DIR,
+        io_budget=0,
+        batch_size=2,
+        busy=lambda: True,
+        max_yield=0.05,
+    )
+    started = time.monotonic()
+    assert scrub.start(verify_hashes=True)
+    scrub._thread.join(30)
+    assert not scrub.running
+    status = scrub.status()
+    assert status["status"] == "done"
+    assert status["checked"] >= 3
+    # it did wait before each step
+    assert time.monotonic() - started >= 3 * 0.05
+
+
+def test_failed_import_leaves_no_orphan(app_module, client, folder, monkeypatch):
+    class FakeImporter:
+        def importfromId(self, model_id, parent_id, preview_path, thumbnail_for=None):
+            return SimpleNamespace(content=stl(seed=50)), None
+
+    def broken(*args, **kwargs):
+        raise KeyError("printInfo")
+
+    monkeypatch.setattr(app_module, "importer_for_source", lambda source: (FakeImporter(), "Fake"))
+    monkeypatch.setattr(app_module, "insert_model", broken)
+    before = set(os.listdir(app_module.UPLOAD_DIR))
+    with pytest.raises(KeyError):
+        client.post("/api/import/importid",
+                    json={"id": "1", "name": "part", "folderId": folder, "typeName": "stl"})
+    assert set(os.listdir(app_module.UPLOAD_DIR)) == before
+    assert client.get("/api/models", params={"folderId": folder}).json() == []
+
+
+def scrub_now(app_module):
+    scrub = scrubber.Scrubber(app_module.get_db_conn, app_module.UPLOAD_DIR,
+                              app_module.MANUAL_DIR, io_budget=0, orphan_grace=0)
+    assert scrub.start()
+    scrub._thread.join(30)
+    assert scrub.status()["status"] == "done"
+
+
+def test_every_file_of_an_orphaned_id_is_reported(app_module, conn, upload):
+    model = upload("kept.stl", stl(seed=57))
+    stray = str(uuid.uuid4())
+    for ext in (".stl", ".3mf"):
+        with open(os.path.join(app_module.UPLOAD_DIR, stray + ext), "wb") as fh:
+            fh.write(stl(seed=58))
+    scrub_now(app_module)
+    orphans = {r[0] for r in conn.execute(
+        "SELECT ref FROM scrub_issues WHERE kind=?", (scrubber.ORPHAN_FILE,))}
+    assert {stray + ".stl", stray + ".3mf"} <= orphans
+    assert not any(ref.startswith(model["id"]) for ref in orphans)
+
+
+def test_repair_leaves_the_archive_of_a_running_job(app_module, client, conn):
+    job = str(uuid.uuid4())
+    archive = app_module.INGEST_DIR / f"{job}.zip"
+    app_module.INGEST_DIR.mkdir(parents=True, exist_ok=True)
+    archive.write_bytes(b"PK")
+    # reported while the job was still queued, which it is again by repair time
+    conn.execute(scrubber.UPSERT_ISSUE, (scrubber.ORPHAN_FILE, f".ingest/{job}.zip", None,
+                                         f".ingest/{job}.zip", None, 2, 0))
+    conn.execute("INSERT INTO ingest_jobs(id,status,createdAt) VALUES (?,?,?)",
+                 (job, "running", 0))
+    conn.commit()
+    r = client.post("/api/scrub/repair", json={"kinds": [scrubber.ORPHAN_FILE], "delete": True})
+    r.raise_for_status()
+    assert archive.exists()
@@ -0,0 +1,152 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+import threemf
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 16
+
+SLICE_INFO = """<?xml version="1.0"?>
+<config>
+  <plate>
+    <metadata key="prediction" value="3600"/>
+    <metadata key="weight" value="12.5"/>
+    <metadata key="printer_model_id" value="C11"/>
+    <filament type="PLA"/>
+    <object name="Body"/>
+  </plate>
+  <plate>
+    <metadata key="prediction" value="600"/>
+    <metadata key="weight" value="2.25"/>
+    <filament type="PETG"/>
+    <filament type="PLA"/>
+  </plate>
+</config>"""
+
+MODEL_SETTINGS = """<?xml version="1.0"?>
+<config>
+  <object id="1"><metadata key="name" value="Body"/></object>
+  <object id="2"><metadata key="name" value="Lid"/></object>
+</config>"""
+
+MODEL_HEADER = """<?xml version="1.0"?>
+<model><metadata name="Title">Box</metadata><metadata name="Designer"></metadata>
+<resources/></model>"""
+
+
+def make_3mf(members, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def bambu_3mf(**settings) -> bytes:
+    return make_3mf({
+        "3D/3dmodel.model": MODEL_HEADER,
+        "Metadata/slice_info.config": SLICE_INFO,
+        "Metadata/model_settings.config": MODEL_SETTINGS,
+        "Metadata/project_settings.config": json.dumps({
+            "printer_model": "Bambu Lab X1 Carbon",
+            "layer_height": ["0.2"],
+            **settings,
+        }),
+        "Metadata/plate_1.png": PNG,
+    })
+
+
+def test_bambu_project():
+    info = threemf.inspect_3mf(bambu_3mf())
+    assert info["plates"] == 2
+    assert info["printTime"] == 4200
+    assert info["filamentGrams"] == 14.75
+    assert info["filamentTypes"] == ["PLA", "PETG"]
+    assert info["objects"] == ["Body", "Lid"]
+    assert info["printerModel"] == "Bambu Lab X1 Carbon"
+    assert info["extra"] == {"Title": "Box", "layer_height": "0.2"}
+    assert info["thumbnail"].startswith("data:image/png;base64,")
+
+
+def test_reads_from_a_path_and_skips_the_thumbnail(tmp_path):
+    path = tmp_path / "box.3mf"
+    path.write_bytes(bambu_3mf())
+    info = threemf.inspect_3mf(str(path), with_thumbnail=False)
+    assert info["plates"] == 2 and info["thumbnail"] is None
+
+
+def test_plain_3mf_has_one_plate_and_nothing_else():
+    info = threemf.inspect_3mf(make_3mf({"3D/3dmodel.model": "<model/>"}))
+    assert info["plates"] == 1
+    assert info["printTime"] is None and info["printerModel"] is None
+    assert info["filamentTypes"] == [] and info["objects"] == []
+
+
+@pytest.mark.parametrize("settings", [
+    "[1, 2]",
+    '"a string"',
+    "not json",
+    json.dumps({"printer_model": ["a", "b"], "layer_height": {"x": 1},
+                "filament_type": [1, None, "PLA"]}),
+])
+def test_odd_project_settings(settings):
+    info = threemf.inspect_3mf(make_3mf({
+        "3D/3dmodel.model": "<model/>",
+        "Metadata/project_settings.config": settings,
+    }))
+    assert info is not None
+    assert info["printerModel"] is None or isinstance(info["printerModel"], str)
+    assert all(isinstance(f, str) for f in info["filamentTypes"])
+    assert all(isinstance(v, (str, int, float)) for v in info["extra"].values())
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "nan", "1e400", "soon"])
+def test_non_finite_print_time(value):
+    slice_info = (f'<config><plate><metadata key="prediction" value="{value}"/>'
+                  f'<metadata key="weight" value="{value}"/></plate></config>')
+    info = threemf.inspect_3mf(make_3mf({"Metadata/slice_info.config": slice_info}))
+    assert info["printTime"] is None and info["filamentGrams"] is None
+
+
+def test_not_a_3mf():
+    assert threemf.inspect_3mf(b"solid cube\nendsolid cube\n") is None
+    assert threemf.inspect_3mf(b"") is None
+
+
+def test_corrupt_deflate_data():
+    data = bytearray(make_3mf({"Metadata/project_settings.config": json.dumps({"a": "x" * 5000})}))
+    # the member's compressed bytes start after the 30-byte local header and name
+    start = 30 + len("Metadata/project_settings.config")
+    data[start:start + 20] = b"\xff" * 20
+    assert threemf.inspect_3mf(bytes(data)) is None
+
+
+def test_odd_3mf_uploads(client, folder):
+    body = bambu_3mf(printer_model=["a", "b"], filament_type={"x": 1})
+    r = client.post("/api/models/upload",
+                    files={"file": ("odd.3mf", body)}, data={"folderId": folder})
+    assert r.status_code == 200
+    # the list is dropped; the printer id from slice_info is used instead
+    assert r.json()["printInfo"]["printerModel"] == "C11"
+
+    garbage = b"PK\x03\x04" + os.urandom(256)
+    r = client.post("/api/models/upload",
+                    files={"file": ("garbage.3mf", garbage)}, data={"folderId": folder})
+    assert r.status_code == 200
+    assert r.json()["printInfo"] is None
+
+
+def test_failed_upload_leaves_no_orphan(app_module, client, folder, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("inspect failed")
+
+    monkeypatch.setattr(threemf, "inspect_3mf", broken)
+    before = set(os.listdir(app_module.UPLOAD_DIR))
+    with pytest.raises(RuntimeError):
+        client.post("/api/models/upload",
+                    files={"file": ("box.3mf", bambu_3mf())}, data={"folderId": folder})
+    assert set(os.listdir(app_module.UPLOAD_DIR)) == before
+    assert client.get("/api/models", params={"folderId": folder}).json() == []
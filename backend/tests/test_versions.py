@@ -0,0 +1,125 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+import db
+import dropwatch
+from conftest import stl
+
+
+def replace(client, model_id, body):
+    r = client.put(f"/api/models/{model_id}/file", files={"file": ("part.stl", body)})
+    r.raise_for_status()
+    return r.json()
+
+
+def history(client, model_id):
+    return client.get(f"/api/models/{model_id}/versions").json()
+
+
+def test_replace_keeps_the_old_file(client, upload):
+    first, second = stl(seed=10), stl(seed=11)
+    model = upload("part.stl", first)
+    replace(client, model["id"], second)
+
+    h = history(client, model["id"])
+    assert h["current"]["version"] == 2
+    assert h["current"]["hash"] == hashlib.sha256(second).hexdigest()
+    assert [(v["version"], v["hash"]) for v in h["versions"]] == [
+        (1, hashlib.sha256(first).hexdigest())
+    ]
+    assert client.get(f"/api/models/{model['id']}/download").content == second
+    assert client.get(f"/api/models/{model['id']}/versions/1/download").content == first
+
+
+def test_restore_can_be_undone(client, upload):
+    first, second = stl(seed=12), stl(seed=13)
+    model = upload("part.stl", first)
+    replace(client, model["id"], second)
+
+    r = client.post(f"/api/models/{model['id']}/versions/1/restore")
+    assert r.status_code == 200
+    assert client.get(f"/api/models/{model['id']}/download").content == first
+    h = history(client, model["id"])
+    assert h["current"]["version"] == 3
+    assert [v["version"] for v in h["versions"]] == [2, 1]
+
+    client.post(f"/api/models/{model['id']}/versions/2/restore").raise_for_status()
+    assert client.get(f"/api/models/{model['id']}/download").content == second
+
+
+def test_identical_contents_share_a_blob(app_module, client, upload):
+    body = stl(seed=14)
+    a, b = upload("a.stl", body), upload("b.stl", body)
+    replace(client, a["id"], stl(seed=15))
+    replace(client, b["id"], stl(seed=16))
+    blob = os.path.join(app_module.VERSION_DIR, "blobs")
+    digest = hashlib.sha256(body).hexdigest()
+    assert os.listdir(os.path.join(blob, digest[:2])).count(digest) == 1
+
+
+def test_retention_and_garbage_collection(app_module, client, upload, monkeypatch):
+    model = upload("part.stl", stl(seed=20))
+    for seed in (21, 22, 23):
+        replace(client, model["id"], stl(seed=seed))
+    assert [v["version"] for v in history(client, model["id"])["versions"]] == [3, 2, 1]
+
+    monkeypatch.setattr(app_module, "VERSION_KEEP", 1)
+    assert app_module.collect_versions()["expired"] >= 2
+    assert [v["version"] for v in history(client, model["id"])["versions"]] == [3]
+
+    # unreferenced blobs outlive the grace period only
+    expired = [hashlib.sha256(stl(seed=s)).hexdigest() for s in (20, 21)]
+    paths = [os.path.join(app_module.VERSION_DIR, "blobs", d[:2], d) for d in expired]
+    assert all(os.path.exists(p) for p in paths)
+    for p in paths:
+        os.utime(p, (0, 0))
+    assert app_module.collect_versions()["blobs"] >= 2
+    assert not any(os.path.exists(p) for p in paths)
+    assert client.get(f"/api/models/{model['id']}/versions/3/download").status_code == 200
+
+
+def write_lock_is_free(app_module, wait: float = 2.0) -> bool:
+    """Whether another connection can take the write lock within `wait`
+    seconds. Background writers hold it only briefly; a lock held by the
+    calling request would still be held when the wait runs out."""
+    if db.POSTGRES:
+        conn = app_module.get_db_conn()
+        try:
+            deadline = time.monotonic() + wait
+            while not conn.execute("SELECT pg_try_advisory_lock(?)", (db.WRITE_LOCK,)).fetchone()[0]:
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(0.02)
+            conn.execute("SELECT pg_advisory_unlock(?)", (db.WRITE_LOCK,))
+            return True
+        finally:
+            conn.close()
+    conn = sqlite3.connect(app_module.DB_PATH, timeout=wait)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def test_legacy_file_is_hashed_outside_the_write_lock(app_module, client, conn, upload, monkeypatch):
+    first = stl(seed=30)
+    model = upload("legacy.stl", first)
+    conn.execute("UPDATE models SET hash=NULL WHERE id=?", (model["id"],))
+    conn.commit()
+
+    calls = []
+    file_sha256 = dropwatch.file_sha256
+
+    def recording_sha256(path):
+        calls.append(write_lock_is_free(app_module))
+        return file_sha256(path)
+
+    monkeypatch.setattr(dropwatch, "file_sha256", recording_sha256)
+    replace(client, model["id"], stl(seed=31))
+    assert calls == [True]
+    assert history(client, model["id"])["versions"][0]["hash"] == hashlib.sha256(first).hexdigest()
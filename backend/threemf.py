@@ -0,0 +1,183 @@
+import base64
+import io
+import json
+import math
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Union
+
+# config members are small; anything bigger is not what we are looking for
+MAX_CONFIG_BYTES = 8 * 1024 * 1024
+MAX_THUMBNAIL_BYTES = 512 * 1024
+MODEL_HEADER_BYTES = 64 * 1024
+
+THUMBNAIL_CANDIDATES = (
+    "Metadata/plate_1.png",
+    "Metadata/thumbnail.png",
+    "Auxiliaries/.thumbnails/thumbnail_middle.png",
+    "Auxiliaries/.thumbnails/thumbnail_3mf.png",
+    "Metadata/plate_1_small.png",
+)
+PLATE_RE = re.compile(r"^Metadata/plate_(\d+)\.png$")
+
+
+def _read(zf: zipfile.ZipFile, name: str, limit: int = MAX_CONFIG_BYTES) -> Optional[bytes]:
+    try:
+        info = zf.getinfo(name)
+    except KeyError:
+        return None
+    if info.file_size > limit:
+        return None
+    with zf.open(info) as fh:
+        return fh.read(limit)
+
+
+def _xml(data: Optional[bytes]):
+    if not data:
+        return None
+    try:
+        return ET.fromstring(data)
+    except ET.ParseError:
+        return None
+
+
+def _meta(el) -> Dict[str, str]:
+    """<metadata key=".." value=".."/> children as a dict."""
+    return {
+        m.get("key"): m.get("value")
+        for m in el.findall("metadata")
+        if m.get("key") is not None
+    }
+
+
+def _number(value, cast=float):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return cast(number) if math.isfinite(number) else None
+
+
+def _scalar(value):
+    """`value` if it fits in a column (str or finite number), else None.
+    A one-element list, as Bambu writes most settings, is unwrapped."""
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value if math.isfinite(value) else None
+    return None
+
+
+def _thumbnail(zf: zipfile.ZipFile, names: List[str]) -> Optional[str]:
+    plates = sorted(
+        (n for n in names if PLATE_RE.match(n)),
+        key=lambda n: int(PLATE_RE.match(n).group(1)),
+    )
+    for name in list(THUMBNAIL_CANDIDATES) + plates:
+        data = _read(zf, name, MAX_THUMBNAIL_BYTES)
+        if data and data[:8] == b"\x89PNG\r\n\x1a\n":
+            return "data:image/png;base64," + base64.b64encode(data).decode()
+    return None
+
+
+def _model_header(zf: zipfile.ZipFile, names: List[str]) -> Dict[str, str]:
+    """Title/Designer/etc. from the top of the model part; only the first
+    MODEL_HEADER_BYTES are inflated, never the mesh itself."""
+    part = next((n for n in names if n.lower() == "3d/3dmodel.model"), None)
+    if part is None:
+        return {}
+    with zf.open(part) as fh:
+        head = fh.read(MODEL_HEADER_BYTES).decode("utf-8", "replace")
+    return {
+        k: v
+        for k, v in re.findall(r'<metadata name="([^"]+)"[^>]*>([^<]*)</metadata>', head)
+        if v.strip()
+    }
+
+
+def inspect_3mf(source: Union[str, bytes], with_thumbnail: bool = True) -> Optional[Dict[str, Any]]:
+    """Print metadata from a 3MF, reading only the central directory and the
+    small Metadata/ members. Returns None if this is not a readable 3MF."""
+    try:
+        fh = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        with zipfile.ZipFile(fh) as zf:
+            names = zf.namelist()
+            info: Dict[str, Any] = {
+                "plates": None,
+                "objects": [],
+                "printTime": None,
+                "filamentGrams": None,
+                "filamentTypes": [],
+                "printerModel": None,
+                "extra": {},
+                "thumbnail": _thumbnail(zf, names) if with_thumbnail else None,
+            }
+
+            settings = {}
+            raw = _read(zf, "Metadata/project_settings.config")
+            if raw:
+                try:
+                    settings = json.loads(raw)
+                except ValueError:
+                    settings = {}
+                if not isinstance(settings, dict):
+                    settings = {}
+
+            slice_info = _xml(_read(zf, "Metadata/slice_info.config"))
+            plate_count = 0
+            total_time = 0
+            total_weight = 0.0
+            filaments: List[str] = []
+            sliced_objects: List[str] = []
+            printer_id = None
+            if slice_info is not None:
+                for plate in slice_info.findall("plate"):
+                    plate_count += 1
+                    meta = _meta(plate)
+                    total_time += _number(meta.get("prediction"), int) or 0
+                    total_weight += _number(meta.get("weight")) or 0.0
+                    printer_id = printer_id or meta.get("printer_model_id")
+                    for fil in plate.findall("filament"):
+                        if fil.get("type"):
+                            filaments.append(fil.get("type"))
+                    for obj in plate.findall("object"):
+                        if obj.get("name"):
+                            sliced_objects.append(obj.get("name"))
+
+            model_settings = _xml(_read(zf, "Metadata/model_settings.config"))
+            objects: List[str] = []
+            if model_settings is not None:
+                for obj in model_settings.findall("object"):
+                    name = _meta(obj).get("name")
+                    if name:
+                        objects.append(name)
+                plate_count = plate_count or len(model_settings.findall("plate"))
+
+            plate_count = plate_count or len([n for n in names if PLATE_RE.match(n)])
+            info["plates"] = plate_count or 1
+            info["objects"] = list(dict.fromkeys(objects or sliced_objects))
+            info["printTime"] = total_time or None
+            info["filamentGrams"] = round(total_weight, 2) if total_weight else None
+
+            if not filaments:
+                types = settings.get("filament_type") or []
+                filaments = types if isinstance(types, list) else [types]
+            info["filamentTypes"] = list(dict.fromkeys(f for f in filaments if f and isinstance(f, str)))
+
+            printer = _scalar(settings.get("printer_model")) or _scalar(settings.get("printer_settings_id"))
+            info["printerModel"] = str(printer or printer_id or "") or None
+
+            extra = _model_header(zf, names)
+            for key in ("layer_height", "nozzle_diameter", "print_settings_id"):
+                value = _scalar(settings.get(key))
+                if value:
+                    extra[key] = value
+            info["extra"] = extra
+            return info
+    except Exception:
+        # anything malformed (bad zip, corrupt deflate data, odd metadata)
+        # just means there is no print info
+        return None
@@ -0,0 +1,103 @@
+"""Grid thumbnails, many to a response.
+
+Models keep their thumbnail as the data URL the client rendered (a 300 px
+PNG, base64 encoded). A grid needs a smaller version of each, and fetching
+them one request at a time, or inlined in the model listing, costs either
+hundreds of round trips or a third more bytes than the images themselves.
+
+`encode` turns a stored thumbnail into the bytes served for a size: resized
+and re-encoded as WebP when Pillow is installed, the original PNG
+otherwise. The results are cached per (model, size), so a grid is served
+from pre-encoded bytes. `pack` puts any number of them in one body:
+
+    4 bytes   index length N, big-endian
+    N bytes   JSON index {"items": [{"id", "offset", "length", "type",
+              "updatedAt"}], "missing": [ids]}
+    ...       the images back to back; offsets count from the end of the index
+"""
+import base64
+import binascii
+import functools
+import io
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+import orjson
+
+MEDIA_TYPE = "application/x-stlvault-thumbnails"
+# sizes a request is rounded up to, so the cache holds a few per model
+SIZES = (64, 128, 256, 512)
+WEBP_QUALITY = 80
+
+
+@functools.lru_cache(maxsize=None)
+def _pil():
+    # Pillow is optional and loaded on first use
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def available() -> bool:
+    return _pil() is not None
+
+
+def snap_size(size: int) -> int:
+    for s in SIZES:
+        if size <= s:
+            return s
+    return SIZES[-1]
+
+
+def decode_data_url(url: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """(mime type, bytes) of a base64 data URL, or None if it isn't one."""
+    if not url or not url.startswith("data:"):
+        return None
+    head, _, payload = url.partition(",")
+    if not head.endswith(";base64"):
+        return None
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return head[5:-7] or "application/octet-stream", data
+
+
+def encode(data: bytes, mime: str, size: int) -> Tuple[str, bytes]:
+    """The image scaled to fit `size` x `size`, as WebP. Without Pillow, or
+    for anything Pillow can't read, the original bytes."""
+    Image = _pil()
+    if Image is None:
+        return mime, data
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            im.thumbnail((size, size), Image.LANCZOS)
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA")
+            out = io.BytesIO()
+            im.save(out, "WEBP", quality=WEBP_QUALITY, method=2)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return mime, data
+    return "image/webp", out.getvalue()
+
+
+def pack(items: Iterable[Tuple[str, str, bytes, int]], missing: List[str]) -> bytes:
+    """One body for (id, mime type, bytes, updatedAt) items, as described
+    above."""
+    index = []
+    blobs = []
+    offset = 0
+    for model_id, mime, data, updated in items:
+        index.append({
+            "id": model_id,
+            "offset": offset,
+            "length": len(data),
+            "type": mime,
+            "updatedAt": updated,
+        })
+        blobs.append(data)
+        offset += len(data)
+    head = orjson.dumps({"items": index, "missing": missing})
+    return b"".join([struct.pack(">I", len(head)), head, *blobs])
@@ -0,0 +1,130 @@
+"""Per-model version history on a content-addressed blob store.
+
+Replacing a model file moves the old file into root/blobs/ab/<sha256>,
+which is a rename and not a copy, and records it as a row in
+`model_versions`. Identical contents are stored once, however many versions
+or models refer to them. Restoring hardlinks the blob back into place, or
+copies it where links aren't possible. Rows past the retention limits are
+removed by `prune`, and blobs no row refers to by `collect_garbage`; the
+leader runs both in the background.
+
+Callers archive and collect inside a write transaction (BEGIN IMMEDIATE),
+so a collection can never delete a blob that a concurrent replace has just
+started to refer to.
+"""
+import errno
+import os
+import shutil
+import time
+from typing import Dict, Tuple
+
+# a blob touched this recently is never collected, whatever the rows say
+GC_GRACE_SECONDS = 3600
+
+
+def blob_path(root: str, digest: str) -> str:
+    return os.path.join(root, "blobs", digest[:2], digest)
+
+
+def archive(root: str, path: str, digest: str) -> bool:
+    """Move the file at `path` into the store. Returns False if the content
+    was stored already, in which case the file is just removed."""
+    final = blob_path(root, digest)
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    stored = os.path.exists(final)
+    if stored:
+        os.remove(path)
+    else:
+        try:
+            os.replace(path, final)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(path, final)
+    # marks it as in use for the collector's grace period
+    os.utime(final)
+    return not stored
+
+
+def materialize(root: str, digest: str, dest: str):
+    """Put a stored version at `dest`, replacing whatever is there."""
+    src = blob_path(root, digest)
+    tmp = os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}.restore")
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def prune(cur, keep: int, max_age_days: float, now_ms: int) -> int:
+    """Delete version rows past the retention limits: more than `keep` per
+    model (0 = no limit) or archived more than `max_age_days` ago (0 = no
+    limit). Returns the number of rows deleted."""
+    deleted = 0
+    if keep > 0:
+        deleted += cur.execute(
+            "DELETE FROM model_versions WHERE id IN ("
+            " SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+            "  PARTITION BY modelId ORDER BY version DESC) AS n FROM model_versions) AS ranked"
+            " WHERE n > ?)",
+            (keep,),
+        ).rowcount
+    if max_age_days > 0:
+        horizon = now_ms - int(max_age_days * 86400 * 1000)
+        deleted += cur.execute(
+            "DELETE FROM model_versions WHERE archivedAt < ?", (horizon,)
+        ).rowcount
+    return deleted
+
+
+def collect_garbage(cur, root: str, grace: float = GC_GRACE_SECONDS) -> Tuple[int, int]:
+    """Remove blobs no version row refers to. Returns (blobs, bytes) freed."""
+    blobs = os.path.join(root, "blobs")
+    if not os.path.isdir(blobs):
+        return 0, 0
+    referenced = {r[0] for r in cur.execute("SELECT DISTINCT hash FROM model_versions")}
+    horizon = time.time() - grace
+    removed = freed = 0
+    for prefix in os.listdir(blobs):
+        folder = os.path.join(blobs, prefix)
+        for digest in os.listdir(folder):
+            if digest in referenced:
+                continue
+            path = os.path.join(folder, digest)
+            st = os.stat(path)
+            if st.st_mtime >= horizon:
+                continue
+            os.remove(path)
+            removed += 1
+            freed += st.st_size
+        if not os.listdir(folder):
+            os.rmdir(folder)
+    return removed, freed
+
+
+def usage(cur) -> Dict[str, int]:
+    """Bytes of history as recorded (each distinct content once) and as it
+    would cost without deduplication."""
+    stored, logical = cur.execute(
+        "SELECT (SELECT COALESCE(SUM(size), 0) FROM "
+        "(SELECT hash, MAX(size) AS size FROM model_versions GROUP BY hash) AS h), "
+        "COALESCE(SUM(size), 0) FROM model_versions"
+    ).fetchone()
+    return {"stored": stored, "logical": logical}
+
+
+def row_to_version(row) -> Dict[str, object]:
+    return {
+        "version": row["version"],
+        "name": row["name"],
+        "size": row["size"],
+        "hash": row["hash"],
+        "createdAt": row["createdAt"],
+        "archivedAt": row["archivedAt"],
+        "hasThumbnail": bool(row["thumbnail"]),
+    }
@@ -0,0 +1,93 @@
+import os
+import time
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+EXPORT_CHUNK_SIZE = 1024 * 1024
+
+# formats that are already compressed gain nothing from deflate
+STORED_EXTENSIONS = {
+    ".3mf", ".zip", ".gz", ".7z", ".rar", ".xz", ".zst", ".bz2",
+    ".png", ".jpg", ".jpeg", ".webp", ".gif", ".mp4",
+}
+
+
+class _Pipe:
+    """Write-only, unseekable sink; zipfile then emits data descriptors."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+# (arcname, source) where source is a filesystem path or in-memory bytes
+Entry = Tuple[str, Union[str, bytes]]
+
+# the range a ZIP header's DOS timestamp can hold
+ZIP_MIN_DATE = (1980, 1, 1, 0, 0, 0)
+ZIP_MAX_DATE = (2107, 12, 31, 23, 59, 58)
+
+
+def _zipinfo(arcname: str, size: int, mtime: Optional[float], compress_level: int):
+    date_time = time.localtime(mtime if mtime is not None else time.time())[:6]
+    # files restored from old archives often carry a 1970 mtime, which
+    # zipfile refuses mid-stream; clamp instead of failing the export
+    date_time = min(max(date_time, ZIP_MIN_DATE), ZIP_MAX_DATE)
+    info = zipfile.ZipInfo(arcname, date_time=date_time)
+    info.file_size = size
+    if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS or compress_level == 0:
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info._compresslevel = compress_level
+    return info
+
+
+def stream_zip(entries: Iterable[Entry], compress_level: int = 1) -> Iterator[bytes]:
+    """Build a ZIP on the fly, yielding bytes as soon as they are produced.
+
+    Memory stays around one EXPORT_CHUNK_SIZE per file regardless of archive
+    size; entries over 4 GiB and archives with more than 65535 members use
+    ZIP64 automatically.
+    """
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, mode="w", allowZip64=True) as zf:
+        for arcname, source in entries:
+            if isinstance(source, bytes):
+                info = _zipinfo(arcname, len(source), None, compress_level)
+                with zf.open(info, mode="w") as dest:
+                    dest.write(source)
+                continue
+            try:
+                st = os.stat(source)
+            except OSError:
+                continue
+            info = _zipinfo(arcname, st.st_size, st.st_mtime, compress_level)
+            with open(source, "rb") as src, zf.open(info, mode="w") as dest:
+                while True:
+                    data = pipe.drain()
+                    if data:
+                        yield data
+                    chunk = src.read(EXPORT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+    # data descriptor of the last entry plus the central directory
+    yield pipe.drain()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useMemo } from "react";
 import Sidebar from "./components/Sidebar";
 import ModelList from "./components/ModelList";
 import DetailPanel from "./components/DetailPanel";
@@ -8,6 +8,7 @@ import ManualModal from "./components/ManualModal";
 import { STLModel, Folder, StorageStats, STLModelCollection } from "./types";
 import { generateThumbnail } from "./services/thumbnailGenerator";
 import { api } from "./services/api";
+import { useThumbnails } from "./hooks/useThumbnails";
 import {
   FolderInput,
   Tags,
@@ -93,7 +94,7 @@ const App = () => {
       setIsLoading(true);
       try {
         const [fetchedFolders, fetchedModels, fetchedStats] = await Promise.all(
-          [api.getFolders(), api.getModels("all"), api.getStorageStats()],
+          [api.getFolders(), api.getModels("all", false), api.getStorageStats()],
         );
         setFolders(fetchedFolders);
         setModels(fetchedModels);
@@ -115,11 +116,23 @@ const App = () => {
       .catch((e) => console.error("Failed to refresh storage stats", e));
   }, [models]);
 
+  // Thumbnails are fetched in batches rather than inlined in the listing
+  const thumbnailUrls = useThumbnails(models);
+  const displayModels = useMemo(
+    () =>
+      models.map((m) =>
+        !m.thumbnail && thumbnailUrls[m.id]
+          ? { ...m, thumbnail: thumbnailUrls[m.id] }
+          : m,
+      ),
+    [models, thumbnailUrls],
+  );
+
   // Filter models based on selection
   const filteredModels =
     currentFolderId === "all"
-      ? models
-      : models.filter((m) => m.folderId === currentFolderId);
+      ? displayModels
+      : displayModels.filter((m) => m.folderId === currentFolderId);
 
   // Filter subfolders based on selection
   const filteredFolders =
@@ -182,7 +195,8 @@ const App = () => {
     };
   }, [isMobileSidebarMounted]);
 
-  const selectedModel = models.find((m) => m.id === selectedModelId) || null;
+  const selectedModel =
+    displayModels.find((m) => m.id === selectedModelId) || null;
   const manualModel = models.find((m) => m.id === manualState.id) || null;
 
   const currentFolderName =
@@ -314,10 +328,46 @@ const App = () => {
     setShowImportModal(true);
   };
 
+  // Several links resolve together; options appear as each one arrives
+  const handleImportBatch = async (urls: string[]) => {
+    setFolderOptions(new Set());
+    setModelsOptions([]);
+    setShowImportModal(false);
+    setShowImportOptionsModal(true);
+    const failed: string[] = [];
+    try {
+      await api.retrieveModelOptionsBatch(urls, (result) => {
+        if (result.status === "ok") {
+          setModelsOptions((prev) => [...prev, ...result.options]);
+          setFolderOptions(
+            (prev) => new Set([...prev, ...result.options.map((m) => m.folder)]),
+          );
+        } else if (result.status === "error") {
+          failed.push(result.url);
+        }
+      });
+    } catch (error) {
+      console.error("Import failed:", error);
+      alert("Failed to import from URL");
+      return;
+    }
+    if (failed.length > 0) {
+      alert(
+        `Could not read ${failed.length} of ${urls.length} links:\n${failed.join("\n")}`,
+      );
+    }
+  };
+
   const handleImportSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!importUrl || !importFolderId) return;
 
+    const urls = importUrl.split(/\s+/).filter(Boolean);
+    if (urls.length > 1) {
+      await handleImportBatch(urls);
+      return;
+    }
+
     try {
       const ModelOptions = await api.retrieveModelOptions(importUrl);
       const NewSet = new Set("");
@@ -985,19 +1035,20 @@ const App = () => {
                     <form onSubmit={handleImportSubmit}>
                       <div className="mb-4">
                         <label className="block text-sm font-medium text-slate-400 mb-1">
-                          Model URL
+                          Model URLs
                         </label>
-                        <input
+                        <textarea
                           autoFocus
-                          type="url"
                           required
-                          className="w-full bg-vault-900 border border-vault-700 rounded-md px-3 py-2 text-white focus:border-indigo-500 outline-none placeholder:text-slate-600"
+                          rows={3}
+                          className="w-full bg-vault-900 border border-vault-700 rounded-md px-3 py-2 text-white focus:border-indigo-500 outline-none placeholder:text-slate-600 resize-y"
                           placeholder="https://www.printables.com/model/... or https://makerworld.com/..."
                           value={importUrl}
                           onChange={(e) => setImportUrl(e.target.value)}
                         />
                         <p className="text-xs text-slate-500 mt-1">
-                          Paste a link from Printables or MakerWorld
+                          Paste links from Printables or MakerWorld, one per
+                          line
                         </p>
                       </div>
 
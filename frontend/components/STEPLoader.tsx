@@ -1,9 +1,35 @@
 import * as THREE from "three";
 import { useLoader } from "@react-three/fiber";
+import { STLLoader } from "three/examples/jsm/loaders/STLLoader.js";
 import occtimportjs from "occt-import-js";
 import occtWasmUrl from "occt-import-js/dist/occt-import-js.wasm?url";
 import occtWorkerUrl from "occt-import-js/dist/occt-import-js-worker.js?url";
 
+// Mesh tessellated by the server (GET /api/models/{id}/mesh). Polls while it
+// is being made; null when the server can't provide one.
+export async function LoadServerMesh(meshUrl: string, timeoutMs = 120000) {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    let response: Response;
+    try {
+      response = await fetch(meshUrl);
+    } catch {
+      return null;
+    }
+    if (response.status == 200) {
+      const geometry = new STLLoader().parse(await response.arrayBuffer());
+      geometry.computeVertexNormals();
+      return geometry;
+    }
+    if (response.status != 202) {
+      return null;
+    }
+    const retry = Number(response.headers.get("Retry-After")) || 2;
+    await new Promise((resolve) => setTimeout(resolve, retry * 1000));
+  }
+  return null;
+}
+
 export async function LoadStep(fileUrl) {
   const targetObject = new THREE.Object3D();
 
@@ -28,7 +28,7 @@ import {
   GalleryVerticalEnd,
 } from "lucide-react";
 import * as THREE from "three";
-import { LoadStep } from "./STEPLoader";
+import { LoadServerMesh, LoadStep } from "./STEPLoader";
 import Button from "@mui/material/Button";
 
 let API_BASE_URL = "";
@@ -193,7 +193,10 @@ const StepModel = ({
   useEffect(() => {
     async function load() {
       const urlpath = API_BASE_URL + url;
-      const mainObject = await LoadStep(urlpath);
+      // prefer the server's cached mesh; tessellate in the browser otherwise
+      const mainObject =
+        (await LoadServerMesh(urlpath.replace(/\/download$/, "/mesh"))) ??
+        (await LoadStep(urlpath));
       setObj(mainObject);
     }
     load();
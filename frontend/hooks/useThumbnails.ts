@@ -0,0 +1,71 @@
+import { useEffect, useRef, useState } from 'react';
+import { api } from '../services/api';
+import { STLModel } from '../types';
+
+// ids per request; the server takes up to 500
+const BATCH_SIZE = 200;
+
+const keyOf = (model: STLModel) => `${model.id}:${model.updatedAt ?? 0}`;
+
+/**
+ * Object URLs for the thumbnails of models listed without them, fetched in
+ * batches and kept until the model changes or goes away.
+ */
+export function useThumbnails(models: STLModel[]): Record<string, string> {
+  const urls = useRef(new Map<string, string>());
+  const pending = useRef(new Set<string>());
+  const wanted = useRef<STLModel[]>([]);
+  const [byId, setById] = useState<Record<string, string>>({});
+
+  // the models on hand when a batch arrives, which may be newer than the
+  // ones it was fetched for
+  const publish = () =>
+    setById(
+      Object.fromEntries(
+        wanted.current
+          .filter((m) => urls.current.has(keyOf(m)))
+          .map((m) => [m.id, urls.current.get(keyOf(m))!]),
+      ),
+    );
+
+  useEffect(() => {
+    wanted.current = models.filter((m) => m.hasThumbnail && !m.thumbnail);
+    const keys = new Set(wanted.current.map(keyOf));
+    for (const [key, url] of urls.current) {
+      if (!keys.has(key)) {
+        URL.revokeObjectURL(url);
+        urls.current.delete(key);
+      }
+    }
+    const missing = wanted.current.filter(
+      (m) => !urls.current.has(keyOf(m)) && !pending.current.has(keyOf(m)),
+    );
+    publish();
+
+    for (let i = 0; i < missing.length; i += BATCH_SIZE) {
+      const batch = missing.slice(i, i + BATCH_SIZE);
+      batch.forEach((m) => pending.current.add(keyOf(m)));
+      api
+        .getThumbnails(batch.map((m) => m.id))
+        .then((images) => {
+          for (const m of batch) {
+            const image = images.get(m.id);
+            if (image) urls.current.set(keyOf(m), URL.createObjectURL(image));
+          }
+          publish();
+        })
+        .catch((e) => console.error('Failed to fetch thumbnails', e))
+        .finally(() => batch.forEach((m) => pending.current.delete(keyOf(m))));
+    }
+  }, [models]);
+
+  useEffect(
+    () => () => {
+      urls.current.forEach((url) => URL.revokeObjectURL(url));
+      urls.current.clear();
+    },
+    [],
+  );
+
+  return byId;
+}
@@ -68,6 +68,41 @@ export const setEnabledLaunchSlicers = (slicers: SlicerType[]) => {
   localStorage.setItem("stlvault-slicer", enabled[0] || getSlicerPreference());
 };
 
+// Uploads and imports over the server's admission limits get 429 with
+// Retry-After; wait and send them again instead of failing.
+const fetchAdmitted = async (
+  url: string,
+  init: RequestInit,
+  attempts = 20,
+): Promise<Response> => {
+  for (let attempt = 1; ; attempt++) {
+    const res = await fetch(url, init);
+    if (res.status != 429 || attempt >= attempts) return res;
+    const retry = Number(res.headers.get("Retry-After")) || 1;
+    await new Promise((resolve) => setTimeout(resolve, retry * 1000));
+  }
+};
+
+// One line of /import/options/batch
+export type ImportOptionsResult =
+  | { url: string; status: "ok"; source: string; options: STLModelCollection[] }
+  | { url: string; status: "duplicate"; of: string }
+  | { url: string; status: "error"; detail: string };
+
+// Grid cards are 240 CSS px tall; the server rounds up to its own sizes
+export const THUMBNAIL_SIZE = 256;
+
+interface ThumbnailIndex {
+  items: {
+    id: string;
+    offset: number;
+    length: number;
+    type: string;
+    updatedAt: number;
+  }[];
+  missing: string[];
+}
+
 export const api = {
   // 1. GET Folders
   getFolders: async (): Promise<Folder[]> => {
@@ -110,13 +145,50 @@ export const api = {
   },
 
   // 5. GET Models
-  getModels: async (folderId?: string): Promise<STLModel[]> => {
-    const query = folderId && folderId !== "all" ? `?folderId=${folderId}` : "";
+  // Without thumbnails, models come without them; fetch those with
+  // getThumbnails for the cards on screen.
+  getModels: async (
+    folderId?: string,
+    thumbnails = true,
+  ): Promise<STLModel[]> => {
+    const params = new URLSearchParams();
+    if (folderId && folderId !== "all") params.set("folderId", folderId);
+    if (!thumbnails) params.set("thumbnails", "0");
+    const query = params.toString() ? `?${params}` : "";
     const res = await fetch(`${API_BASE_URL}/models${query}`);
     if (!res.ok) throw new Error("Failed to fetch models");
     return res.json();
   },
 
+  // 5b. GET Thumbnails of many models in one request. The body is a 4-byte
+  // big-endian index length, the JSON index, then the images back to back.
+  getThumbnails: async (
+    ids: string[],
+    size = THUMBNAIL_SIZE,
+  ): Promise<Map<string, Blob>> => {
+    const res = await fetch(`${API_BASE_URL}/thumbnails`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ ids, size }),
+    });
+    if (!res.ok) throw new Error("Failed to fetch thumbnails");
+    const body = await res.arrayBuffer();
+    const indexLength = new DataView(body).getUint32(0);
+    const index: ThumbnailIndex = JSON.parse(
+      new TextDecoder().decode(new Uint8Array(body, 4, indexLength)),
+    );
+    const start = 4 + indexLength;
+    const images = new Map<string, Blob>();
+    for (const item of index.items) {
+      const from = start + item.offset;
+      images.set(
+        item.id,
+        new Blob([body.slice(from, from + item.length)], { type: item.type }),
+      );
+    }
+    return images;
+  },
+
   // 6. UPLOAD Model
   uploadModel: async (
     file: File,
@@ -130,7 +202,7 @@ export const api = {
     if (thumbnail) formData.append("thumbnail", thumbnail); // Send base64 thumbnail
     if (tags.length > 0) formData.append("tags", JSON.stringify(tags));
 
-    const res = await fetch(`${API_BASE_URL}/models/upload`, {
+    const res = await fetchAdmitted(`${API_BASE_URL}/models/upload`, {
       method: "POST",
       body: formData,
     });
@@ -228,6 +300,31 @@ export const api = {
     return res.json();
   },
 
+  // 13b. RETRIEVE MODEL OPTIONS for many URLs; onResult sees each one as
+  // the server resolves it
+  retrieveModelOptionsBatch: async (
+    urls: string[],
+    onResult: (result: ImportOptionsResult) => void,
+  ): Promise<void> => {
+    const res = await fetchAdmitted(`${API_BASE_URL}/import/options/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ urls }),
+    });
+    if (!res.ok || !res.body) throw new Error("Import failed");
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += value;
+      const lines = buffer.split("\n");
+      buffer = lines.pop() ?? "";
+      lines.filter(Boolean).forEach((line) => onResult(JSON.parse(line)));
+    }
+    if (buffer.trim()) onResult(JSON.parse(buffer));
+  },
+
   // 13. IMPORT FROM URL
   importModelFromId: async (
     id: string,
@@ -238,7 +335,7 @@ export const api = {
     typeName: string,
     source: string = "printables",
   ): Promise<STLModel> => {
-    const res = await fetch(`${API_BASE_URL}/import/importid`, {
+    const res = await fetchAdmitted(`${API_BASE_URL}/import/importid`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
@@ -293,7 +390,7 @@ export const api = {
     formData.append("file", file);
     if (thumbnail) formData.append("thumbnail", thumbnail);
 
-    const res = await fetch(`${API_BASE_URL}/models/${id}/file`, {
+    const res = await fetchAdmitted(`${API_BASE_URL}/models/${id}/file`, {
       method: "PUT",
       body: formData,
     });
@@ -28,7 +28,21 @@ export interface STLModel {
   description: string;
   dimensions?: { x: number; y: number; z: number };
   thumbnail?: string;
+  hasThumbnail?: boolean; // listed without thumbnails: one to fetch
+  updatedAt?: number | null;
   manual?: string | null;
+  printInfo?: PrintInfo | null;
+}
+
+// Read by the backend from 3MF packages (Metadata/*.config)
+export interface PrintInfo {
+  plates: number;
+  printTime: number | null; // seconds
+  filamentGrams: number | null;
+  filamentTypes: string[];
+  printerModel: string | null;
+  objects: string[];
+  extra: Record<string, unknown>;
 }
 
 export interface STLModelCollection {